@@ -2,7 +2,15 @@ __version__ = "0.0.1"
 
 import frappe
 
+from maddati_hms.availability import guest_rate_limit
+from maddati_hms.instrumentation import instrument
+from maddati_hms.pagination import decode_cursor, get_keyset_condition, set_response_cursor, split_page
+from maddati_hms.portal_identity import get_portal_identity
+from maddati_hms.room_search import search_rooms
+
 @frappe.whitelist(allow_guest=True)
+@guest_rate_limit
+@instrument
 def custom_room_query_with_status(
     doctype=None,
     txt=None,
@@ -21,81 +29,27 @@ def custom_room_query_with_status(
     if not branch:
         branch = kwargs.get("branch")
 
-    txt = txt or ""
     start = int(start or 0)
     page_len = int(page_len or 10)
 
-    raw_rows = frappe.db.sql(
-        """
-        SELECT
-            name,
-            room_number,
-            COALESCE(status, '') as status,
-            COALESCE(capacity, 0) as capacity,
-            COALESCE(occupied_beds, 0) as occupied_beds,
-            COALESCE(monthly_rent, 0) as monthly_rent
-        FROM `tabRoom`
-        WHERE (%s IS NULL OR branch = %s)
-        AND (
-            room_number LIKE %s OR name LIKE %s
-        )
-        ORDER BY room_number ASC
-        LIMIT %s, %s
-        """,
-        (branch, branch, f"%{txt}%", f"%{txt}%", start, page_len),
-        as_dict=False,
+    # Served from the cached per-branch room index; see maddati_hms.room_search
+    rows, next_cursor = search_rooms(
+        branch=branch, txt=txt, start=start, page_len=page_len, cursor=kwargs.get("cursor")
     )
-
-    desk_rows = []
-    web_rows = []
-    for name, room_number, status, capacity, occupied_beds, monthly_rent in raw_rows:
-        monthly_str = frappe.utils.fmt_money((monthly_rent or 0), currency=None, precision=0)
-        # Plain description (works for Desk)
-        plain_desc = f"({status}) - (Capacity-{capacity}) - (Occupied Beds -{occupied_beds}) - (Monthly Rent - {monthly_str})"
-
-        # Build small badge + muted description for Web
-        status_lower = (status or "").lower()
-        if status_lower == "available":
-            status_fg = "#1e7e34"  # green text
-            status_bg = "#e6f4ea"  # green light bg
-        elif status_lower == "full":
-            status_fg = "#b02a37"  # red text
-            status_bg = "#fdecea"  # red light bg
-        elif status_lower == "maintenance":
-            status_fg = "#b8860b"  # yellow text
-            status_bg = "#fff8e1"  # yellow light bg
-        else:
-            status_fg = "#6c757d"
-            status_bg = "#f1f3f5"
-
-        is_unavailable = status_lower in ("full", "maintenance")
-        muted_style = "color: #6c757d;" if is_unavailable else ""
-
-        esc_status = frappe.utils.escape_html(status or "")
-        esc_details = frappe.utils.escape_html(
-            f"(Capacity-{capacity}) - (Occupied Beds -{occupied_beds}) - (Monthly Rent - {monthly_str})"
-        )
-        badge_html = (
-            f"<span style=\"display:inline-block;margin-right:8px;padding:2px 8px;border-radius:999px;"
-            f"font-size:11px;line-height:1;background-color:{status_bg};color:{status_fg};\">{esc_status}</span>"
-        )
-        web_desc_html = f"<span style=\"{muted_style}\">{badge_html}<span class=\"small\">{esc_details}</span></span>"
-
-        # Desk tuples
-        desk_rows.append([name, room_number, plain_desc])
-        # Web objects
-        web_rows.append({
-            "value": name,
-            "label": room_number,
-            "description": web_desc_html,
-        })
+    set_response_cursor(next_cursor)
 
     if doctype:
-        return desk_rows
+        # Desk tuples
+        return [[row["name"], row["room_number"], row["desk_description"]] for row in rows]
     else:
-        return web_rows
+        # Web objects
+        return [
+            {"value": row["name"], "label": row["room_number"], "description": row["web_description"]}
+            for row in rows
+        ]
 
 @frappe.whitelist(allow_guest=True)
+@instrument
 def customer_invoice_query(
     doctype=None,
     txt=None,
@@ -112,9 +66,7 @@ def customer_invoice_query(
     Query function to get only unpaid invoices for the current logged-in customer
     """
     # Get current user's customer
-    customer = None
-    if frappe.session.user and frappe.session.user != "Guest":
-        customer = frappe.db.get_value("Customer", {"email_id": frappe.session.user}, "name")
+    customer = get_portal_identity().customer
     
     if not customer:
         return []
@@ -123,8 +75,14 @@ def customer_invoice_query(
     start = int(start or 0)
     page_len = int(page_len or 10)
 
+    # Cursor mode: continue after the (due_date, name) of the previous page instead of skipping `start` rows
+    cursor_values = decode_cursor(kwargs.get("cursor"), 2)
+    keyset_condition, keyset_params = get_keyset_condition(("due_date", "name"), cursor_values)
+    if cursor_values:
+        start = 0
+
     raw_rows = frappe.db.sql(
-        """
+        f"""
         SELECT
             name,
             posting_date,
@@ -133,19 +91,22 @@ def customer_invoice_query(
             outstanding_amount,
             status
         FROM `tabSales Invoice`
-        WHERE customer = %s
+        WHERE customer = %(customer)s
         AND docstatus = 1
         AND outstanding_amount > 0
         AND (
-            name LIKE %s OR 
-            CONCAT(name, ' - Outstanding: ', outstanding_amount) LIKE %s
+            name LIKE %(txt)s OR 
+            CONCAT(name, ' - Outstanding: ', outstanding_amount) LIKE %(txt)s
         )
+        AND {keyset_condition}
         ORDER BY due_date ASC, name ASC
-        LIMIT %s, %s
+        LIMIT %(start)s, %(limit)s
         """,
-        (customer, f"%{txt}%", f"%{txt}%", start, page_len),
+        {"customer": customer, "txt": f"%{txt}%", "start": start, "limit": page_len + 1, **keyset_params},
         as_dict=False,
     )
+    raw_rows, next_cursor = split_page(raw_rows, page_len, key=lambda row: (row[2], row[0]))
+    set_response_cursor(next_cursor)
 
     desk_rows = []
     web_rows = []
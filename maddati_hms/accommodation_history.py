@@ -0,0 +1,137 @@
+from itertools import groupby
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, date_diff, getdate
+
+# Rows that record a real stay; Pending/Rejected rows never occupied a bed
+STAY_STATUSES = ("Active", "Left", "Cancelled")
+
+
+def get_stays(from_date, to_date=None, room=None, branch=None, tenant=None):
+    """
+    Stays (Tenant Accommodation History rows) overlapping [from_date, to_date], both inclusive,
+    read straight from the child table. Open stays (no to_date) run until today and beyond.
+    """
+    from_date = getdate(from_date)
+    to_date = getdate(to_date) if to_date else from_date
+    if to_date < from_date:
+        frappe.throw(_("To Date cannot be before From Date"))
+
+    conditions = []
+    if room:
+        conditions.append("h.room = %(room)s")
+    if branch:
+        conditions.append("h.branch = %(branch)s")
+    if tenant:
+        conditions.append("h.parent = %(tenant)s")
+
+    return frappe.db.sql(
+        f"""
+        SELECT
+            h.parent AS tenant,
+            t.tenant_name,
+            h.branch,
+            h.room,
+            h.from_date,
+            h.to_date,
+            h.status,
+            h.remarks
+        FROM `tabTenant Accommodation History` h
+        INNER JOIN `tabTenant` t ON t.name = h.parent
+        WHERE h.parenttype = 'Tenant'
+        AND h.status IN %(statuses)s
+        AND h.from_date <= %(to_date)s
+        AND (h.to_date IS NULL OR h.to_date >= %(from_date)s)
+        {"AND " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY h.from_date, h.parent
+        """,
+        {
+            "statuses": STAY_STATUSES,
+            "from_date": from_date,
+            "to_date": to_date,
+            "room": room,
+            "branch": branch,
+            "tenant": tenant,
+        },
+        as_dict=True,
+    )
+
+
+def get_occupancy_timeline(stays, from_date, to_date):
+    """
+    Sweep-line over stays: list of {from_date, to_date, occupied} segments covering [from_date, to_date].
+    A stay occupies a bed on every night from its from_date up to, not including, its to_date,
+    so a transfer is not counted twice on the moving day.
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    end = add_days(to_date, 1)
+
+    events = []
+    for stay in stays:
+        start = max(getdate(stay.from_date), from_date)
+        stop = min(getdate(stay.to_date), end) if stay.to_date else end
+        if start < stop:
+            events.append((start, 1))
+            events.append((stop, -1))
+    events.sort()
+
+    segments = []
+    occupied = 0
+    cursor = from_date
+    for day, day_events in groupby(events, key=lambda event: event[0]):
+        if day > cursor:
+            segments.append(frappe._dict(from_date=cursor, to_date=add_days(day, -1), occupied=occupied))
+            cursor = day
+        occupied += sum(change for _day, change in day_events)
+    if cursor < end:
+        segments.append(frappe._dict(from_date=cursor, to_date=to_date, occupied=occupied))
+    return segments
+
+
+@frappe.whitelist()
+def get_room_occupants(room, date=None):
+    """Who occupied a room on a date (stays starting or ending that day included)"""
+    frappe.has_permission("Tenant", "read", throw=True)
+    if not room:
+        frappe.throw(_("Room is required"))
+    return get_stays(date or frappe.utils.today(), room=room)
+
+
+@frappe.whitelist()
+def get_overlapping_stays(from_date, to_date, branch=None, room=None, tenant=None):
+    """All stays overlapping [from_date, to_date], optionally limited to a branch, room or tenant"""
+    frappe.has_permission("Tenant", "read", throw=True)
+    return get_stays(from_date, to_date, room=room, branch=branch, tenant=tenant)
+
+
+@frappe.whitelist()
+def get_branch_occupancy(branch, from_date, to_date):
+    """
+    Occupied beds of a branch over [from_date, to_date] as change-point segments,
+    with peak, bed-nights and average utilisation against the branch's current capacity.
+    """
+    frappe.has_permission("Tenant", "read", throw=True)
+    if not branch:
+        frappe.throw(_("Branch is required"))
+
+    stays = get_stays(from_date, to_date, branch=branch)
+    segments = get_occupancy_timeline(stays, from_date, to_date)
+
+    days = date_diff(to_date, from_date) + 1
+    bed_nights = sum(s.occupied * (date_diff(s.to_date, s.from_date) + 1) for s in segments)
+    capacity = frappe.db.sql(
+        "SELECT COALESCE(SUM(capacity), 0) FROM `tabRoom` WHERE branch = %s", branch
+    )[0][0]
+
+    return {
+        "branch": branch,
+        "from_date": getdate(from_date),
+        "to_date": getdate(to_date),
+        "capacity": capacity,
+        "peak": max((s.occupied for s in segments), default=0),
+        "bed_nights": bed_nights,
+        "average_occupied": round(bed_nights / days, 2) if days else 0,
+        "utilisation": round(bed_nights * 100.0 / (capacity * days), 2) if capacity and days else 0,
+        "segments": segments,
+    }
@@ -1,6 +1,12 @@
 import frappe
 
+from maddati_hms.availability import get_room_availability, guest_rate_limit
+from maddati_hms.company_defaults import get_branch_company
+from maddati_hms.instrumentation import instrument
+
+
 @frappe.whitelist()
+@instrument
 def get_tenant_item_amount(tenant, item_code):
     doc = frappe.get_doc("Tenant", tenant)
     if item_code == "Tenant Monthly Fee":
@@ -12,18 +18,23 @@ def get_tenant_item_amount(tenant, item_code):
     return 0
 
 @frappe.whitelist(allow_guest=True)
-def get_room_fees(room: str):
+@guest_rate_limit
+@instrument
+def get_room_fees(room: str, branch: str | None = None):
+    # served from the availability snapshot of the room's branch, never the all-branches one;
+    # without a branch it comes from the cached Room document
     if not room:
         return {}
-    values = frappe.db.get_value(
-        "Room",
-        room,
-        ["status", "monthly_rent", "admission_fee", "security_deposit"],
-        as_dict=True,
-    )
-    return values or {}
+    branch = branch or frappe.get_cached_value("Room", room, "branch")
+    if not branch:
+        return {}
+    values = get_room_availability(room, branch)
+    if not values:
+        return {}
+    return {field: values[field] for field in ("status", "free_beds", "monthly_rent", "admission_fee", "security_deposit")}
 
 @frappe.whitelist()
+@instrument
 def get_customer_company(customer):
     """Get the company associated with a customer"""
     if not customer:
@@ -39,7 +50,7 @@ def get_customer_company(customer):
     if tenant:
         branch = frappe.db.get_value('Tenant', tenant, 'branch')
         if branch:
-            company = frappe.db.get_value('Branch', branch, 'company')
+            company = get_branch_company(branch)
             if company:
                 return company
     
@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, today
+
+ARREARS_KEY = "maddati_hms:arrears:{0}:{1}"
+# bound on staleness from changes no hook below sees, e.g. a reconciliation run in the background
+ARREARS_EXPIRY = 60 * 60
+# (label, lower bound, upper bound) in days past due; invoices not yet due count as 0-30
+AGING_BUCKETS = (
+    ("0-30", None, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+)
+BUCKET_FIELDS = ("bucket_0_30", "bucket_31_60", "bucket_61_90", "bucket_90_plus")
+GROUP_BY_FIELDS = {
+    "Tenant": ("branch", "room", "tenant", "tenant_name"),
+    "Room": ("branch", "room"),
+    "Branch": ("branch",),
+}
+
+
+def get_branch_arrears(branch, as_of=None):
+    """
+    Outstanding hostel invoices of a branch aged into buckets, one row per
+    (tenant, room, invoice type). One grouped query, cached per date until an invoice,
+    payment, journal entry or reconciliation touches the branch, and for an hour at most.
+    """
+    as_of = str(getdate(as_of or today()))
+    key = ARREARS_KEY.format(branch, as_of)
+    rows = frappe.cache().get_value(key)
+    if rows is None:
+        rows = _load_branch_arrears(branch, as_of)
+        frappe.cache().set_value(key, rows, expires_in_sec=ARREARS_EXPIRY)
+    return [frappe._dict(row) for row in rows]
+
+
+def _load_branch_arrears(branch, as_of):
+    age = "DATEDIFF(%(as_of)s, COALESCE(si.due_date, si.posting_date))"
+    buckets = []
+    for (_label, lower, upper), field in zip(AGING_BUCKETS, BUCKET_FIELDS, strict=True):
+        condition = " AND ".join(
+            c for c in (f"{age} >= {lower}" if lower is not None else None,
+                        f"{age} <= {upper}" if upper is not None else None) if c
+        )
+        buckets.append(f"SUM(CASE WHEN {condition} THEN si.outstanding_amount ELSE 0 END) AS {field}")
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            si.custom_branch AS branch,
+            si.custom_room AS room,
+            si.custom_tenant AS tenant,
+            MAX(t.tenant_name) AS tenant_name,
+            si.custom_invoice_type AS invoice_type,
+            COUNT(*) AS invoices,
+            {", ".join(buckets)},
+            SUM(si.outstanding_amount) AS total
+        FROM `tabSales Invoice` si
+        LEFT JOIN `tabTenant` t ON t.name = si.custom_tenant
+        WHERE si.custom_branch = %(branch)s
+        AND si.docstatus = 1
+        AND si.outstanding_amount > 0
+        GROUP BY si.custom_branch, si.custom_room, si.custom_tenant, si.custom_invoice_type
+        """,
+        {"branch": branch, "as_of": as_of},
+        as_dict=True,
+    )
+    return [dict(row) for row in rows]
+
+
+@frappe.whitelist()
+def get_arrears(branch=None, company=None, group_by="Tenant", invoice_type=None, as_of=None):
+    """
+    Aged arrears per tenant, room or branch, split by invoice type.
+    Each row carries bucket_0_30, bucket_31_60, bucket_61_90, bucket_90_plus, total and invoices.
+    """
+    frappe.has_permission("Sales Invoice", "read", throw=True)
+    if group_by not in GROUP_BY_FIELDS:
+        frappe.throw(_("Group By must be one of {0}").format(", ".join(GROUP_BY_FIELDS)))
+
+    if branch:
+        branches = [branch]
+    else:
+        branches = frappe.get_all("Branch", filters={"company": company} if company else None, pluck="name")
+
+    keys = (*GROUP_BY_FIELDS[group_by], "invoice_type")
+    totals = defaultdict(lambda: dict.fromkeys((*BUCKET_FIELDS, "total", "invoices"), 0))
+    for name in branches:
+        for row in get_branch_arrears(name, as_of):
+            if invoice_type and row.invoice_type != invoice_type:
+                continue
+            total = totals[tuple(row.get(key) for key in keys)]
+            for field in (*BUCKET_FIELDS, "total"):
+                total[field] += flt(row.get(field))
+            total["invoices"] += row.invoices
+
+    result = [frappe._dict(zip(keys, key, strict=True), **values) for key, values in totals.items()]
+    result.sort(key=lambda row: (-row.total, *(str(row.get(key) or "") for key in keys)))
+    return result
+
+
+def clear_arrears(branches):
+    """Drop cached aging of the given branches now and again after commit"""
+    branches = {branch for branch in branches if branch}
+    if not branches:
+        return
+
+    def clear():
+        for branch in branches:
+            frappe.cache().delete_keys(ARREARS_KEY.format(branch, ""))
+
+    clear()
+    frappe.db.after_commit.add(clear)
+
+
+def on_sales_invoice_change(doc, method=None, *args):
+    """doc_events hook for Sales Invoice submit/cancel; returns change the original invoice's outstanding"""
+    branches = [doc.get("custom_branch")]
+    if doc.get("return_against"):
+        branches.append(frappe.db.get_value("Sales Invoice", doc.return_against, "custom_branch"))
+    clear_arrears(branches)
+
+
+def on_payment_entry_change(doc, method=None, *args):
+    """doc_events hook for Payment Entry submit/cancel"""
+    _clear_invoice_arrears(
+        ref.reference_name for ref in doc.get("references") or []
+        if ref.reference_doctype == "Sales Invoice"
+    )
+
+
+def on_journal_entry_change(doc, method=None, *args):
+    """doc_events hook for Journal Entry submit/cancel: write-offs and credit notes against invoices"""
+    _clear_invoice_arrears(
+        row.reference_name for row in doc.get("accounts") or []
+        if row.reference_type == "Sales Invoice"
+    )
+
+
+def on_payment_reconciliation(doc, method=None, *args):
+    """doc_events hook for Payment Reconciliation.reconcile; credit notes show up as the reference side"""
+    invoices = []
+    for row in doc.get("allocation") or []:
+        if row.invoice_type == "Sales Invoice":
+            invoices.append(row.invoice_number)
+        if row.reference_type == "Sales Invoice":
+            invoices.append(row.reference_name)
+    _clear_invoice_arrears(invoices)
+
+
+def _clear_invoice_arrears(invoices):
+    invoices = list({name for name in invoices if name})
+    if invoices:
+        clear_arrears(frappe.get_all(
+            "Sales Invoice", filters={"name": ["in", invoices]}, pluck="custom_branch", distinct=True
+        ))
@@ -0,0 +1,160 @@
+"""
+Public room availability for guest pages such as the new_admission web form.
+
+One snapshot per branch (rooms, status, free beds, fees) is kept in Redis and feeds the room
+picker, get_room_fees and get_availability, so guest requests do not query Room. It is dropped
+with the room search index whenever rooms or their occupancy change and the branches involved
+are rebuilt right after commit. get_availability sends an ETag and Cache-Control so browsers
+revalidate with a conditional GET and get a 304 while nothing changed.
+"""
+import hashlib
+from functools import wraps
+
+import frappe
+from frappe.rate_limiter import rate_limit
+from frappe.utils import cint, flt, now
+from werkzeug.wrappers import Response
+
+from maddati_hms.instrumentation import instrument
+
+AVAILABILITY_KEY = "maddati_hms:availability"
+ALL_BRANCHES = "__all__"
+DEFAULT_MAX_AGE = 60
+# guest requests per IP and minute on each public room endpoint
+DEFAULT_GUEST_RATE_LIMIT = 120
+PUBLIC_FIELDS = (
+    "name", "room_number", "branch", "room_type", "status", "capacity", "free_beds",
+    "monthly_rent", "admission_fee", "security_deposit",
+)
+
+
+def get_guest_rate_limit():
+    return cint(frappe.conf.get("hms_guest_rate_limit")) or DEFAULT_GUEST_RATE_LIMIT
+
+
+def guest_rate_limit(fn):
+    """
+    frappe's rate_limit (per IP and method, `hms_guest_rate_limit` calls a minute) for Guest
+    sessions only; logged-in staff behind one office IP would otherwise share a bucket.
+    """
+    limited = rate_limit(limit=get_guest_rate_limit, seconds=60)(fn)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if frappe.session.user == "Guest":
+            return limited(*args, **kwargs)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+@guest_rate_limit
+@instrument
+def get_availability(branch=None):
+    """Availability snapshot of a branch (all branches without one) with conditional GET support"""
+    snapshot = get_availability_snapshot(branch)
+    if frappe.request and frappe.request.if_none_match.contains_weak(snapshot["etag"]):
+        response = Response(status=304)
+    else:
+        response = Response(
+            frappe.as_json({"message": get_public_snapshot(snapshot)}, indent=None),
+            content_type="application/json",
+        )
+    max_age = cint(frappe.conf.get("hms_availability_max_age")) or DEFAULT_MAX_AGE
+    response.set_etag(snapshot["etag"])
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+    return response
+
+
+def get_public_snapshot(snapshot):
+    return {
+        "branch": snapshot["branch"],
+        "generated_at": snapshot["generated_at"],
+        "rooms": [{field: room[field] for field in PUBLIC_FIELDS} for room in snapshot["rooms"]],
+    }
+
+
+def get_room_availability(room, branch=None):
+    """Snapshot row of one room, or None when it is not in the (branch) snapshot"""
+    snapshot = get_availability_snapshot(branch)
+    position = snapshot["index"].get(room)
+    return None if position is None else snapshot["rooms"][position]
+
+
+def get_availability_snapshot(branch=None):
+    return frappe.cache().hget(
+        AVAILABILITY_KEY, branch or ALL_BRANCHES, generator=lambda: build_availability_snapshot(branch)
+    )
+
+
+def build_availability_snapshot(branch=None):
+    rooms = frappe.db.sql(
+        """
+        SELECT
+            name,
+            room_number,
+            branch,
+            room_type,
+            COALESCE(status, '') as status,
+            COALESCE(capacity, 0) as capacity,
+            COALESCE(occupied_beds, 0) as occupied_beds,
+            COALESCE(monthly_rent, 0) as monthly_rent,
+            COALESCE(admission_fee, 0) as admission_fee,
+            COALESCE(security_deposit, 0) as security_deposit
+        FROM `tabRoom`
+        WHERE (%(branch)s IS NULL OR branch = %(branch)s)
+        """,
+        {"branch": branch or None},
+        as_dict=True,
+    )
+    # same order as the room picker
+    rooms.sort(key=lambda room: (room.room_number or "", room.name))
+
+    rows = []
+    for room in rooms:
+        capacity, occupied_beds = cint(room.capacity), cint(room.occupied_beds)
+        rows.append({
+            "name": room.name,
+            "room_number": room.room_number or "",
+            "branch": room.branch,
+            "room_type": room.room_type,
+            "status": room.status,
+            "capacity": capacity,
+            "occupied_beds": occupied_beds,
+            "free_beds": 0 if room.status == "Maintenance" else max(capacity - occupied_beds, 0),
+            "monthly_rent": flt(room.monthly_rent),
+            "admission_fee": flt(room.admission_fee),
+            "security_deposit": flt(room.security_deposit),
+        })
+
+    return {
+        "branch": branch,
+        "generated_at": now(),
+        # content only, so a rebuild without changes keeps the ETag
+        "etag": hashlib.md5(frappe.as_json(rows, indent=None).encode()).hexdigest(),
+        "rooms": rows,
+        "index": {row["name"]: i for i, row in enumerate(rows)},
+    }
+
+
+def clear_availability_snapshot(branches=None):
+    """
+    Drop the snapshots of the given branches (and the all-branches one), or all of them.
+    After commit they are dropped again and the given branches rebuilt, so guests never
+    see rows from before this transaction.
+    """
+    def clear():
+        if branches is None:
+            frappe.cache().delete_value(AVAILABILITY_KEY)
+            return
+        for branch in {*branches, ALL_BRANCHES}:
+            frappe.cache().hdel(AVAILABILITY_KEY, branch or ALL_BRANCHES)
+
+    def rebuild():
+        clear()
+        for branch in {b for b in branches or () if b}:
+            frappe.cache().hset(AVAILABILITY_KEY, branch, build_availability_snapshot(branch))
+
+    clear()
+    frappe.db.after_commit.add(rebuild)
@@ -0,0 +1,167 @@
+"""
+Seedable synthetic HMS data for benchmarks, bulk inserted without running controllers.
+
+    bench --site test.localhost execute maddati_hms.benchmarks.data_generator.generate --kwargs "{'branches': 5}"
+
+Every row is named with PREFIX so cleanup() can remove it. Only use on a test site.
+"""
+import random
+
+import frappe
+from frappe.utils import add_days, add_to_date, now_datetime, today
+
+PREFIX = "BENCH-"
+COMMON_FIELDS = ("creation", "modified", "modified_by", "owner")
+
+
+def generate(
+    branches=5,
+    rooms_per_branch=100,
+    tenants_per_room=3,
+    invoices_per_tenant=6,
+    payments_per_tenant=4,
+    visitors_per_branch=2000,
+    unlinked_tenants=50,
+    company=None,
+    seed=42,
+):
+    """
+    Insert branches, rooms, tenants (with accommodation history and customers), submitted
+    invoices, payments and visitor logs. The last `unlinked_tenants` tenants have no Customer
+    and no invoices, for flows that create them. Returns a summary of what was generated.
+    """
+    if not (frappe.conf.allow_tests or frappe.conf.developer_mode):
+        frappe.throw("Generating benchmark data needs allow_tests or developer_mode in site config")
+
+    rng = random.Random(seed)
+    company = company or frappe.defaults.get_global_default("company")
+    timestamp = now_datetime()
+    stamp = (timestamp, timestamp, "Administrator", "Administrator")
+    data = frappe._dict(branches=[], rooms=[], tenants=[], customers=[], history=[], invoices=[], payments=[], visitors=[])
+
+    for b in range(branches):
+        branch = f"{PREFIX}Branch {b:03d}"
+        data.branches.append((branch, *stamp, company, "Active"))
+
+        for r in range(rooms_per_branch):
+            room = f"{PREFIX}{b:03d}-{r:04d}"
+            capacity = rng.choice((1, 2, 3, 4))
+            active = 0
+            for _t in range(tenants_per_room):
+                index = len(data.tenants)
+                tenant = f"{PREFIX}Tenant {index:07d}"
+                status = "Active" if active < capacity and rng.random() < 0.75 else "Left"
+                active += status == "Active"
+                from_date = add_days(today(), -rng.randint(30, 720))
+                to_date = None if status == "Active" else add_days(from_date, rng.randint(30, 300))
+                email = f"bench{index}@example.com"
+                contact = f"9{index:09d}"
+                customer = f"{PREFIX}Customer {index:07d}"
+                data.tenants.append([tenant, *stamp, tenant, branch, room, customer, status, email, contact, 3000, 1000, 5000])
+                data.history.append((
+                    f"{PREFIX}H-{index:07d}", *stamp, tenant, "Tenant", "accommodation_history", 1,
+                    branch, room, from_date, to_date, status, "Generated",
+                ))
+                data.customers.append((customer, *stamp, customer, "Individual", "Individual", tenant, email, email, company))
+
+                for n in range(invoices_per_tenant):
+                    posting_date = add_days(today(), -30 * n)
+                    outstanding = rng.choice((0, 0, 0, 1500, 3000))
+                    data.invoices.append((
+                        f"{PREFIX}SINV-{index:07d}-{n:02d}", *stamp, customer, customer, company, 1,
+                        posting_date, add_days(posting_date, 7), 3000, 3000, outstanding,
+                        "Unpaid" if outstanding else "Paid", tenant, branch, room, "Monthly Fee",
+                    ))
+                for n in range(payments_per_tenant):
+                    data.payments.append((
+                        f"{PREFIX}PAY-{index:07d}-{n:02d}", *stamp, branch, room, tenant, company, customer, 1,
+                        3000, "Receive", add_days(today(), -30 * n), "Bank Transfer", f"{PREFIX}REF-{index}-{n}",
+                        "Accepted", "Posted",
+                    ))
+            data.rooms.append((room, *stamp, branch, room, "Dormitory", capacity, active, 3000,
+                               "Full" if active >= capacity else "Available"))
+
+        for v in range(visitors_per_branch):
+            data.visitors.append((
+                f"{PREFIX}VIS-{b:03d}-{v:06d}", *stamp, f"Visitor {v}", branch,
+                "Active" if rng.random() < 0.02 else "Left",
+                add_to_date(timestamp, minutes=-rng.randint(0, 60 * 24 * 180)), "Parent Visit",
+            ))
+
+    # the last tenants stay unlinked and uninvoiced
+    unlinked = {row[0] for row in data.tenants[-unlinked_tenants:]} if unlinked_tenants else set()
+    for row in data.tenants:
+        if row[0] in unlinked:
+            row[8] = None
+    data.customers = [row for row in data.customers if row[8] not in unlinked]
+    data.invoices = [row for row in data.invoices if row[-4] not in unlinked]
+    data.payments = [row for row in data.payments if row[7] not in unlinked]
+
+    _insert("Branch", ("company", "status"), data.branches)
+    _insert("Room", ("branch", "room_number", "room_type", "capacity", "occupied_beds", "monthly_rent", "status"), data.rooms)
+    _insert(
+        "Tenant",
+        ("tenant_name", "branch", "room", "customer", "status", "email", "contact_number",
+         "monthly_fee", "admission_fee", "security_deposit"),
+        data.tenants,
+    )
+    _insert(
+        "Tenant Accommodation History",
+        ("parent", "parenttype", "parentfield", "idx", "branch", "room", "from_date", "to_date", "status", "remarks"),
+        data.history,
+    )
+    _insert(
+        "Customer",
+        ("customer_name", "customer_type", "customer_group", "custom_tenant", "email_id",
+         "customer_email_address", "custom_company"),
+        data.customers,
+    )
+    _insert(
+        "Sales Invoice",
+        ("customer", "customer_name", "company", "docstatus", "posting_date", "due_date", "grand_total",
+         "rounded_total", "outstanding_amount", "status", "custom_tenant", "custom_branch", "custom_room",
+         "custom_invoice_type"),
+        data.invoices,
+    )
+    _insert(
+        "Payment",
+        ("branch", "room", "tenant", "company", "linked_customer", "docstatus", "amount", "payment_type",
+         "payment_date", "mode_of_payment", "reference_no", "status", "processing_status"),
+        data.payments,
+    )
+    _insert("Visitor Log", ("visitor_name", "branch", "status", "visit_datetime", "purpose"), data.visitors)
+    frappe.db.commit()
+
+    return {key: len(rows) for key, rows in data.items()}
+
+
+def cleanup():
+    """Delete every generated row"""
+    for doctype in (
+        "Visitor Log", "Payment", "Sales Invoice", "Customer", "Tenant Accommodation History",
+        "Tenant", "Room", "Branch",
+    ):
+        frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE name LIKE %s", f"{PREFIX}%")
+    frappe.db.commit()
+
+
+def get_sample(branch=None):
+    """Names the benchmark cases run against"""
+    branch = branch or frappe.db.get_value("Branch", {"name": ["like", f"{PREFIX}%"]}, "name")
+    linked = frappe.db.get_value(
+        "Tenant",
+        {"branch": branch, "status": "Active", "customer": ["is", "set"], "name": ["like", f"{PREFIX}%"]},
+        ["name", "customer", "email", "room"],
+        as_dict=True,
+    )
+    unlinked = frappe.get_all(
+        "Tenant",
+        filters={"customer": ["is", "not set"], "name": ["like", f"{PREFIX}%"]},
+        fields=["name", "branch", "room"],
+        limit=1,
+    )
+    return frappe._dict(branch=branch, tenant=linked, unlinked_tenant=unlinked[0] if unlinked else None)
+
+
+def _insert(doctype, fields, rows, chunk_size=5000):
+    frappe.db.bulk_insert(doctype, ("name", *COMMON_FIELDS, *fields), rows, ignore_duplicates=True, chunk_size=chunk_size)
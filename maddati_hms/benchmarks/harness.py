@@ -0,0 +1,162 @@
+"""
+Timing and query-count benchmark for the HMS whitelisted entry points at several data scales.
+
+    bench --site test.localhost execute maddati_hms.benchmarks.harness.run --kwargs "{'scales': [1, 5]}"
+
+For every scale the generated data is rebuilt (`scale` branches of data_generator defaults),
+each case runs `repeat` times and p50/p95 latency plus SQL queries per call are recorded.
+Cases that write are rolled back after every call. Results go to a JSON file (path returned)
+so two runs can be diffed with compare().
+"""
+import json
+import statistics
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+from maddati_hms.benchmarks import data_generator
+from maddati_hms.instrumentation import count_queries
+
+
+def run(scales=(1, 5), repeat=20, seed=42, output=None):
+    scales = frappe.parse_json(scales) if isinstance(scales, str) else scales
+    results = {
+        "started": str(now_datetime()),
+        "repeat": repeat,
+        "seed": seed,
+        "scales": {},
+    }
+
+    for scale in scales:
+        data_generator.cleanup()
+        summary = data_generator.generate(branches=scale, seed=seed)
+        sample = data_generator.get_sample()
+        results["scales"][str(scale)] = {
+            "data": summary,
+            "cases": {name: _run_case(case, sample, repeat) for name, case in get_cases().items()},
+        }
+    data_generator.cleanup()
+
+    output = output or frappe.get_site_path("private", "files", f"hms_benchmark_{now_datetime():%Y%m%d_%H%M%S}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=1, default=str)
+    _print_summary(results)
+    return output
+
+
+def get_cases():
+    """name -> (callable(sample), writes)"""
+    from maddati_hms import custom_room_query_with_status
+    from maddati_hms.maddati_hms.doctype.tenant.tenant import (
+        create_or_link_customer,
+        create_single_invoice,
+        get_occupancy_report,
+        recalculate_room_occupancy,
+    )
+    from maddati_hms.maddati_hms.web_form.add_payment.add_payment import get_customer_data
+
+    return {
+        "custom_room_query_with_status": (
+            lambda s: custom_room_query_with_status("Room", "", None, 0, 20, {"branch": s.branch}), False,
+        ),
+        "get_occupancy_report": (lambda s: get_occupancy_report(branch=s.branch), False),
+        "recalculate_room_occupancy": (lambda s: recalculate_room_occupancy(branch=s.branch, dry_run=1), False),
+        "create_or_link_customer": (lambda s: create_or_link_customer(s.unlinked_tenant.name), True),
+        "create_single_invoice": (
+            lambda s: create_single_invoice(s.tenant.name, "Tenant Monthly Fee", 3000, "Monthly Fee"), True,
+        ),
+        "get_customer_data": (_as_user(lambda s: get_customer_data()), False),
+        "payment_submit": (_submit_payment, True),
+    }
+
+
+def _submit_payment(sample):
+    tenant = frappe.db.get_value("Tenant", sample.tenant.name, ["branch", "room", "customer"], as_dict=True)
+    payment = frappe.get_doc({
+        "doctype": "Payment",
+        "branch": tenant.branch,
+        "room": tenant.room,
+        "tenant": sample.tenant.name,
+        "company": frappe.db.get_value("Branch", tenant.branch, "company"),
+        "linked_customer": tenant.customer,
+        "amount": 1000,
+        "payment_type": "Receive",
+        "mode_of_payment": "Cash",
+        "status": "Accepted",
+    })
+    payment.insert()
+    payment.submit()
+
+
+def _as_user(fn):
+    def wrapper(sample):
+        user = frappe.session.user
+        frappe.set_user(sample.tenant.email)
+        try:
+            return fn(sample)
+        finally:
+            frappe.set_user(user)
+    return wrapper
+
+
+def _run_case(case, sample, repeat):
+    fn, writes = case
+    timings, queries = [], []
+    try:
+        for _i in range(repeat):
+            if writes:
+                frappe.db.savepoint("hms_benchmark")
+            with count_queries() as counter:
+                start = time.perf_counter()
+                fn(sample)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(counter["queries"])
+            if writes:
+                frappe.db.rollback(save_point="hms_benchmark")
+            frappe.local.message_log = []
+    except Exception as e:
+        frappe.db.rollback()
+        return {"error": str(e)}
+
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "queries": round(statistics.mean(queries), 1),
+        "max_queries": max(queries),
+    }
+
+
+def compare(baseline, current, threshold=1.2):
+    """Cases whose p95 or query count grew by more than `threshold` times between two result files"""
+    with open(baseline) as f:
+        before = json.load(f)
+    with open(current) as f:
+        after = json.load(f)
+
+    regressions = []
+    for scale, result in after["scales"].items():
+        for name, case in result["cases"].items():
+            old = before["scales"].get(scale, {}).get("cases", {}).get(name)
+            if not old or "error" in old or "error" in case:
+                continue
+            for metric in ("p95_ms", "queries"):
+                if old[metric] and case[metric] > old[metric] * threshold:
+                    regressions.append({"scale": scale, "case": name, "metric": metric, "before": old[metric], "after": case[metric]})
+    return regressions
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _print_summary(results):
+    for scale, result in results["scales"].items():
+        print(f"\nscale {scale}: {result['data']}")
+        for name, case in result["cases"].items():
+            if "error" in case:
+                print(f"  {name:32} error: {case['error']}")
+            else:
+                print(f"  {name:32} p50 {case['p50_ms']:>9} ms  p95 {case['p95_ms']:>9} ms  queries {case['queries']}")
@@ -0,0 +1,110 @@
+"""
+Before/after benchmark for the hot-query indexes (patches/v0_0/add_hot_query_indexes.py).
+
+Run it on a test site, never on production:
+
+    bench --site test.localhost execute maddati_hms.benchmarks.index_benchmark.run --kwargs "{'seed': 1}"
+
+With seed=1, synthetic data from maddati_hms.benchmarks.data_generator is inserted first;
+remove it with data_generator.cleanup(). Every index the queries below rely on is dropped
+(BENCHMARK_INDEXES: the hot-query indexes plus the Customer lookup indexes), every query is
+explained and timed, the indexes are restored and the measurement repeated.
+"""
+import statistics
+import time
+
+import frappe
+
+from maddati_hms.benchmarks.data_generator import generate
+from maddati_hms.patches.v0_0.add_hot_query_indexes import HOT_QUERY_INDEXES
+from maddati_hms.patches.v0_0.add_hot_query_indexes import execute as add_indexes
+
+# Customer indexes from add_customer_match_indexes and the custom_tenant search index of the
+# Custom Field fixture, which the customer lookups below depend on
+CUSTOMER_LOOKUP_INDEXES = (
+    ("Customer", ["email_id"], "email_id_index"),
+    ("Customer", ["custom_tenant"], "custom_tenant"),
+)
+BENCHMARK_INDEXES = HOT_QUERY_INDEXES + CUSTOMER_LOOKUP_INDEXES
+
+QUERIES = {
+    "occupancy by room": "SELECT COUNT(*) FROM `tabTenant` WHERE room = %(room)s AND status = 'Active'",
+    "tenants of customer": "SELECT name FROM `tabTenant` WHERE customer = %(customer)s",
+    "customer by email": "SELECT name FROM `tabCustomer` WHERE email_id = %(email)s",
+    "customer by tenant": "SELECT name FROM `tabCustomer` WHERE custom_tenant = %(tenant)s",
+    "customer_invoice_query": """SELECT name, due_date, outstanding_amount FROM `tabSales Invoice`
+        WHERE customer = %(customer)s AND docstatus = 1 AND outstanding_amount > 0
+        ORDER BY due_date, name LIMIT 20""",
+    "room picker": "SELECT name, room_number FROM `tabRoom` WHERE branch = %(branch)s ORDER BY room_number LIMIT 20",
+    "active visitors": """SELECT name FROM `tabVisitor Log`
+        WHERE branch = %(branch)s AND status = 'Active' ORDER BY visit_datetime DESC LIMIT 50""",
+}
+
+
+def run(seed=False, branches=10, repeat=20):
+    if seed:
+        generate(branches=branches)
+
+    params = _get_params()
+    dropped = [index for index in BENCHMARK_INDEXES if _drop_index(index[0], index[2])]
+    try:
+        before = measure(params, repeat)
+    finally:
+        # restored under their original names, so later schema syncs find them
+        for doctype, columns, index_name in dropped:
+            frappe.db.add_index(doctype, columns, index_name)
+    add_indexes()
+    after = measure(params, repeat)
+
+    dropped_names = [f"{doctype}.{index_name}" for doctype, _columns, index_name in dropped]
+    _print_report(before, after, dropped_names)
+    return {"before": before, "after": after, "dropped_indexes": dropped_names}
+
+
+def measure(params, repeat=20):
+    results = {}
+    for label, sql in QUERIES.items():
+        plan = frappe.db.sql(f"EXPLAIN {sql}", params, as_dict=True)
+        timings = []
+        for _i in range(repeat):
+            start = time.perf_counter()
+            frappe.db.sql(sql, params)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[label] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "plan": [
+                {"table": row.get("table"), "type": row.get("type"), "key": row.get("key"), "rows": row.get("rows")}
+                for row in plan
+            ],
+        }
+    return results
+
+
+def _get_params():
+    tenant = frappe.db.get_value("Tenant", {"customer": ["is", "set"]}, ["name", "customer", "room", "email", "branch"], as_dict=True)
+    if not tenant:
+        frappe.throw("No Tenant with a Customer found; run with seed=1 on a test site")
+    return {
+        "room": tenant.room,
+        "customer": tenant.customer,
+        "email": tenant.email,
+        "tenant": tenant.name,
+        "branch": tenant.branch,
+    }
+
+
+def _drop_index(doctype, index_name):
+    if not frappe.db.has_index(f"tab{doctype}", index_name):
+        return False
+    frappe.db.sql_ddl(f"ALTER TABLE `tab{doctype}` DROP INDEX `{index_name}`")
+    return True
+
+
+def _print_report(before, after, dropped):
+    print(f"before: without {', '.join(dropped) or 'no indexes (none of them existed)'}")
+    print(f"after: with {', '.join(f'{d}.{n}' for d, _c, n in BENCHMARK_INDEXES)}")
+    for label in QUERIES:
+        print(f"\n{label}: {before[label]['median_ms']} ms -> {after[label]['median_ms']} ms")
+        for when, result in (("before", before), ("after", after)):
+            for row in result[label]["plan"]:
+                print(f"  {when:6} {row['table']}: type={row['type']} key={row['key']} rows={row['rows']}")
@@ -0,0 +1,269 @@
+import frappe
+from frappe import _
+from frappe.utils import add_days, formatdate, get_first_day, get_last_day, getdate, today
+
+from maddati_hms.company_defaults import get_branch_defaults
+
+# invoice type -> (item code, Tenant fee field)
+INVOICE_TYPES = {
+    "Monthly Fee": ("Tenant Monthly Fee", "monthly_fee"),
+    "Admission Fee": ("Tenant Admission Fee", "admission_fee"),
+    "Security Deposit": ("Tenant Security Deposit", "security_deposit"),
+}
+# charged once per tenant, so their billing key does not depend on the period
+ONE_OFF_INVOICE_TYPES = ("Admission Fee", "Security Deposit")
+
+BILLING_CHUNK_SIZE = 100
+BILLING_RUN_KEY = "maddati_hms:billing_run:{0}"
+BILLING_RUN_EXPIRY = 7 * 24 * 60 * 60
+MAX_RECORDED_ERRORS = 200
+
+
+def get_billing_period(posting_date=None):
+    return getdate(posting_date or today()).strftime("%Y-%m")
+
+
+def get_billing_key(tenant, period, invoice_type):
+    """Idempotency key stamped on Sales Invoice.custom_billing_key"""
+    if invoice_type in ONE_OFF_INVOICE_TYPES:
+        period = "once"
+    return f"{tenant}|{period}|{invoice_type}"
+
+
+def build_tenant_invoice(tenant, customer_name, defaults, item_code, amount, invoice_type, posting_date=None, billing_key=None):
+    """
+    Unsaved Sales Invoice for one tenant charge; `tenant` only needs name, tenant_name, customer, branch and room.
+    Only billing runs pass a billing_key: ad-hoc invoices (Tenant.create_single_invoice) carry none, so a
+    manual invoice never keeps the tenant out of the run for that period.
+    """
+    posting_date = posting_date or today()
+
+    # Create description based on invoice type
+    if invoice_type == 'Monthly Fee':
+        description = f'Monthly fee for tenant {tenant.name} - {tenant.tenant_name} ({formatdate(posting_date, "MMMM YYYY")})'
+    else:
+        description = f'{invoice_type.lower()} for tenant {tenant.name} - {tenant.tenant_name}'
+
+    return frappe.get_doc({
+        'doctype': 'Sales Invoice',
+        'customer': tenant.customer,
+        'customer_name': customer_name,
+        'company': defaults.company,
+        'posting_date': posting_date,
+        'due_date': add_days(posting_date, 7),  # Due in 7 days
+        'debit_to': defaults.receivable_account,
+        'items': [{
+            'item_code': item_code,
+            'item_name': item_code,
+            'description': description,
+            'qty': 1,
+            'rate': amount,
+            'amount': amount,
+            'income_account': defaults.income_account,
+            'cost_center': defaults.cost_center,
+            'item_group': 'Services'
+        }],
+        'custom_tenant': tenant.name,
+        'custom_branch': tenant.branch,
+        'custom_room': tenant.room,
+        'custom_invoice_type': invoice_type,
+        'custom_billing_key': billing_key
+    })
+
+
+@frappe.whitelist()
+def start_billing_run(branch=None, company=None, period=None, invoice_type="Monthly Fee"):
+    """
+    Queue a billing run that invoices every Active tenant of a branch or company for a period (YYYY-MM).
+    Returns the run state; poll get_billing_run or listen to the `hms_billing_progress` realtime event.
+    """
+    frappe.has_permission("Sales Invoice", "create", throw=True)
+
+    if not branch and not company:
+        frappe.throw(_("Select a Branch or a Company to bill"))
+    if invoice_type not in INVOICE_TYPES:
+        frappe.throw(_("Invalid invoice type {0}").format(invoice_type))
+    period = period or get_billing_period()
+    try:
+        getdate(f"{period}-01")
+    except Exception:
+        frappe.throw(_("Billing period must be in YYYY-MM format"))
+
+    run_id = frappe.generate_hash(length=10)
+    state = frappe._dict({
+        "run_id": run_id,
+        "branch": branch or None,
+        "company": company or None,
+        "period": period,
+        "invoice_type": invoice_type,
+        "status": "Queued",
+        "started_by": frappe.session.user,
+        "total": _count_billable_tenants(branch, company),
+        "processed": 0,
+        "created": 0,
+        "skipped": 0,
+        "failed": 0,
+        "last_tenant": None,
+        "errors": [],
+    })
+    _save_billing_run(state)
+    _enqueue_billing_run(run_id)
+    return state
+
+
+@frappe.whitelist()
+def resume_billing_run(run_id):
+    """Continue a failed or interrupted run after the last fully committed chunk"""
+    frappe.has_permission("Sales Invoice", "create", throw=True)
+    state = _load_billing_run(run_id)
+    if state.status == "Completed":
+        return state
+    state.status = "Queued"
+    _save_billing_run(state)
+    _enqueue_billing_run(run_id)
+    return state
+
+
+@frappe.whitelist()
+def get_billing_run(run_id):
+    frappe.has_permission("Sales Invoice", "read", throw=True)
+    return _load_billing_run(run_id)
+
+
+def _load_billing_run(run_id):
+    state = frappe.cache().get_value(BILLING_RUN_KEY.format(run_id))
+    if not state:
+        frappe.throw(_("Billing run {0} not found").format(run_id), frappe.DoesNotExistError)
+    return frappe._dict(state)
+
+
+def run_billing(run_id):
+    """Background job: invoice tenants in chunks, committing and recording progress after each chunk"""
+    state = _load_billing_run(run_id)
+    state.status = "Running"
+    _save_billing_run(state)
+
+    item_code, fee_field = INVOICE_TYPES[state.invoice_type]
+    period_start = getdate(f"{state.period}-01")
+    posting_date = today()
+    if not (get_first_day(period_start) <= getdate(posting_date) <= get_last_day(period_start)):
+        posting_date = period_start
+    branches = _get_branches(state.branch, state.company)
+
+    try:
+        while True:
+            tenants = _get_tenant_chunk(branches, state.last_tenant)
+            if not tenants:
+                break
+            _bill_tenant_chunk(state, tenants, item_code, fee_field, posting_date)
+            state.last_tenant = tenants[-1].name
+            state.processed += len(tenants)
+            frappe.db.commit()
+            _save_billing_run(state)
+    except Exception:
+        frappe.db.rollback()
+        state.status = "Failed"
+        _save_billing_run(state)
+        frappe.log_error(f"Billing run {run_id} failed after tenant {state.last_tenant}", "Billing Run Failed")
+        raise
+
+    state.status = "Completed"
+    _save_billing_run(state)
+
+
+def _bill_tenant_chunk(state, tenants, item_code, fee_field, posting_date):
+    keys = {t.name: get_billing_key(t.name, state.period, state.invoice_type) for t in tenants}
+    already_billed = set(frappe.get_all(
+        "Sales Invoice",
+        filters={"custom_billing_key": ["in", list(keys.values())], "docstatus": ["<", 2]},
+        pluck="custom_billing_key",
+    ))
+    customer_names = dict(frappe.get_all(
+        "Customer",
+        filters={"name": ["in", list({t.customer for t in tenants})]},
+        fields=["name", "customer_name"],
+        as_list=True,
+    ))
+
+    for tenant in tenants:
+        amount = tenant.get(fee_field)
+        if keys[tenant.name] in already_billed or not amount:
+            state.skipped += 1
+            continue
+
+        defaults = get_branch_defaults(tenant.branch)
+        if not (defaults.company and defaults.receivable_account and defaults.income_account):
+            _record_billing_error(state, tenant.name, _("Company or default accounts not set for branch {0}").format(tenant.branch))
+            continue
+
+        frappe.db.savepoint("hms_billing_tenant")
+        try:
+            invoice = build_tenant_invoice(
+                tenant, customer_names.get(tenant.customer), defaults, item_code, amount,
+                state.invoice_type, posting_date=posting_date, billing_key=keys[tenant.name],
+            )
+            invoice.insert(ignore_permissions=True)
+            invoice.submit()
+            state.created += 1
+        except Exception as e:
+            frappe.db.rollback(save_point="hms_billing_tenant")
+            frappe.log_error(f"Error creating {state.invoice_type} invoice for tenant {tenant.name}: {e!s}", f"{state.invoice_type} Invoice Creation Failed")
+            _record_billing_error(state, tenant.name, str(e))
+
+    frappe.publish_realtime("hms_billing_progress", state, user=state.started_by)
+
+
+def _record_billing_error(state, tenant, error):
+    state.failed += 1
+    if len(state.errors) < MAX_RECORDED_ERRORS:
+        state.errors.append({"tenant": tenant, "error": error})
+
+
+def _get_branches(branch, company):
+    if branch:
+        return [branch]
+    return frappe.get_all("Branch", filters={"company": company}, pluck="name")
+
+
+def _get_tenant_chunk(branches, after):
+    if not branches:
+        return []
+    # Tenant rows are locked until the chunk commits, so two concurrent runs cannot both bill a tenant
+    return frappe.db.sql(
+        """
+        SELECT name, tenant_name, customer, branch, room, monthly_fee, admission_fee, security_deposit
+        FROM `tabTenant`
+        WHERE status = 'Active'
+        AND IFNULL(customer, '') != ''
+        AND branch IN %(branches)s
+        AND (%(after)s IS NULL OR name > %(after)s)
+        ORDER BY name
+        LIMIT %(limit)s
+        FOR UPDATE
+        """,
+        {"branches": tuple(branches), "after": after, "limit": BILLING_CHUNK_SIZE},
+        as_dict=True,
+    )
+
+
+def _count_billable_tenants(branch, company):
+    branches = _get_branches(branch, company)
+    if not branches:
+        return 0
+    return frappe.db.count(
+        "Tenant", {"status": "Active", "customer": ["is", "set"], "branch": ["in", branches]}
+    )
+
+
+def _save_billing_run(state):
+    frappe.cache().set_value(BILLING_RUN_KEY.format(state.run_id), state, expires_in_sec=BILLING_RUN_EXPIRY)
+
+
+def _enqueue_billing_run(run_id):
+    frappe.enqueue(
+        "maddati_hms.billing.run_billing",
+        queue="long",
+        timeout=4 * 60 * 60,
+        enqueue_after_commit=True,
+        run_id=run_id,
+    )
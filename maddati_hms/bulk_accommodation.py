@@ -0,0 +1,381 @@
+"""
+Bulk admissions and room transfers.
+
+Instead of one Tenant save per student, target rooms and tenants are locked and validated
+up front, tenants and accommodation history are written with set-based queries in the
+request transaction, and every room gets a single net occupied_beds change
+(maddati_hms.occupancy). Each input row gets a structured result instead of UI messages.
+"""
+from collections import Counter
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now, sbool, today
+
+from maddati_hms.company_defaults import get_branch_company
+from maddati_hms.customer_sync import (
+    create_tenant_customer,
+    link_tenant_customer,
+    match_customers,
+    sync_customer,
+)
+from maddati_hms.instrumentation import instrument
+from maddati_hms.occupancy import apply_room_occupancy_changes
+from maddati_hms.portal_identity import clear_portal_identity_for_customers
+
+MAX_BULK_ROWS = 2000
+# fields an admission row may set on a new Tenant
+NEW_TENANT_FIELDS = (
+    "tenant_name", "email", "contact_number", "gender", "date_of_birth", "address",
+    "guardian_name", "guardian_contact", "guardian_address",
+    "admission_fee", "monthly_fee", "security_deposit",
+)
+HISTORY_FIELDS = (
+    "name", "creation", "modified", "modified_by", "owner",
+    "parent", "parenttype", "parentfield", "idx",
+    "branch", "room", "from_date", "to_date", "status", "remarks",
+)
+
+
+@frappe.whitelist()
+@instrument
+def bulk_admit(admissions, atomic=False):
+    """
+    Admit many tenants at once. A row either names an existing, non-Active `tenant` or carries
+    the fields of a new Tenant (tenant_name, email, ...), plus the target `room` and optional
+    `branch` and `admission_date`. With `atomic` a single failed row cancels the whole batch.
+    """
+    return _run_bulk("Admission", admissions, atomic)
+
+
+@frappe.whitelist()
+@instrument
+def bulk_transfer(transfers, atomic=False):
+    """
+    Move many Active tenants ({tenant, room, branch}) at once. Beds freed by the batch count
+    towards its arrivals, so tenants can swap between full rooms.
+    """
+    return _run_bulk("Transfer", transfers, atomic)
+
+
+def _run_bulk(action, rows, atomic):
+    rows = frappe.parse_json(rows) if isinstance(rows, str) else rows
+    if not rows:
+        frappe.throw(_("Nothing to process"))
+    if len(rows) > MAX_BULK_ROWS:
+        frappe.throw(_("At most {0} rows can be processed at once").format(MAX_BULK_ROWS))
+    frappe.has_permission("Tenant", "write", throw=True)
+    if action == "Admission" and any(not row.get("tenant") for row in rows):
+        frappe.has_permission("Tenant", "create", throw=True)
+
+    entries = [
+        frappe._dict(
+            row=i, data=frappe._dict(row), tenant=row.get("tenant"), room=row.get("room"),
+            branch=row.get("branch"), from_room=None, new=False, result=None, message=None,
+        )
+        for i, row in enumerate(rows, start=1)
+    ]
+
+    # tenants before rooms, each in name order: a single Tenant save locks its own row
+    # (check_if_latest) before validate locks the rooms through apply_room_occupancy_changes
+    tenants = _lock_tenants({e.tenant for e in entries if e.tenant})
+    rooms = _lock_rooms({e.room for e in entries if e.room})
+
+    seen = set()
+    for entry in entries:
+        tenant = tenants.get(entry.tenant)
+        message = _validate_entry(action, entry, tenant, rooms.get(entry.room), seen)
+        if message:
+            _fail(entry, message)
+            continue
+        seen.add(entry.tenant)
+        entry.branch = rooms[entry.room].branch
+        if tenant and tenant.status == "Active":
+            entry.from_room = tenant.room
+    _check_capacity(entries, rooms)
+
+    atomic = sbool(atomic)
+    if atomic and any(e.result for e in entries):
+        for entry in entries:
+            if not entry.result:
+                entry.result, entry.message = "Skipped", _("Not applied because other rows failed")
+        return _get_summary(entries, {})
+
+    for entry in entries:
+        if not entry.result and not entry.tenant:
+            _insert_tenant(entry, tenants, atomic)
+
+    accepted = [e for e in entries if not e.result]
+    changes = Counter()
+    for entry in accepted:
+        if entry.from_room:
+            changes[entry.from_room] -= 1
+        changes[entry.room] += 1
+    occupancy = apply_room_occupancy_changes({room: change for room, change in changes.items() if change})
+
+    _update_tenants(action, accepted, tenants)
+    _write_history(action, accepted)
+    _sync_customers(action, accepted, tenants)
+
+    for entry in accepted:
+        entry.result = "Admitted" if action == "Admission" else "Transferred"
+    return _get_summary(entries, occupancy)
+
+
+def _lock_rooms(rooms):
+    if not rooms:
+        return {}
+    return {
+        room.name: room
+        for room in frappe.db.sql(
+            """
+            SELECT name, branch, status, capacity, occupied_beds
+            FROM `tabRoom`
+            WHERE name IN %(rooms)s
+            ORDER BY name
+            FOR UPDATE
+            """,
+            {"rooms": tuple(rooms)},
+            as_dict=True,
+        )
+    }
+
+
+def _lock_tenants(tenants):
+    if not tenants:
+        return {}
+    return {
+        tenant.name: tenant
+        for tenant in frappe.db.sql(
+            """
+            SELECT name, tenant_name, email, contact_number, status, branch, room, customer
+            FROM `tabTenant`
+            WHERE name IN %(tenants)s
+            ORDER BY name
+            FOR UPDATE
+            """,
+            {"tenants": tuple(tenants)},
+            as_dict=True,
+        )
+    }
+
+
+def _validate_entry(action, entry, tenant, room, seen):
+    if not entry.room:
+        return _("Room is required")
+    if not room:
+        return _("Room {0} not found").format(entry.room)
+    if room.status == "Maintenance":
+        return _("Room {0} is under maintenance").format(room.name)
+    if entry.branch and entry.branch != room.branch:
+        return _("Room {0} belongs to branch {1}, not {2}").format(room.name, room.branch, entry.branch)
+
+    if action == "Transfer" or entry.tenant:
+        if not tenant:
+            return _("Tenant {0} not found").format(entry.tenant) if entry.tenant else _("Tenant is required")
+        if tenant.name in seen:
+            return _("Tenant {0} appears more than once").format(tenant.name)
+
+    if action == "Transfer":
+        if tenant.status != "Active":
+            return _("Tenant {0} is not Active").format(tenant.name)
+        if tenant.room == room.name:
+            return _("Tenant {0} is already in room {1}").format(tenant.name, room.name)
+    elif tenant:
+        if tenant.status == "Active":
+            return _("Tenant {0} is already Active").format(tenant.name)
+    else:
+        for field in ("tenant_name", "email"):
+            if not entry.data.get(field):
+                return _("{0} is required for a new tenant").format(frappe.unscrub(field))
+
+
+def _check_capacity(entries, rooms):
+    """
+    Fail the arrivals that do not fit, counting beds freed by the batch's own departures.
+    A failed transfer keeps its bed, which can push out a later arrival, so repeat until stable.
+    """
+    while True:
+        accepted = [e for e in entries if not e.result]
+        free = {
+            name: room.capacity - (room.occupied_beds or 0)
+            for name, room in rooms.items()
+            if room.capacity
+        }
+        for entry in accepted:
+            if entry.from_room in free:
+                free[entry.from_room] += 1
+
+        overflow = False
+        for entry in accepted:
+            if entry.room not in free:
+                continue
+            free[entry.room] -= 1
+            if free[entry.room] < 0:
+                _fail(entry, _("Room {0} has no free bed (capacity {1})").format(entry.room, rooms[entry.room].capacity))
+                overflow = True
+        if not overflow:
+            return
+
+
+def _insert_tenant(entry, tenants, atomic):
+    admission_date = entry.data.get("admission_date") or today()
+    doc = frappe.get_doc({
+        "doctype": "Tenant",
+        **{field: entry.data[field] for field in NEW_TENANT_FIELDS if entry.data.get(field) is not None},
+        "status": "Active",
+        "branch": entry.branch,
+        "room": entry.room,
+        "admission_date": admission_date,
+    })
+    doc.append("accommodation_history", {
+        "branch": entry.branch,
+        "room": entry.room,
+        "from_date": admission_date,
+        "status": "Active",
+        "remarks": "Initial accommodation assignment",
+    })
+    # occupancy and the Customer are handled for the whole batch
+    doc.flags.bulk_accommodation = True
+
+    if atomic:
+        doc.insert()
+    else:
+        frappe.db.savepoint("hms_bulk_admission_row")
+        try:
+            doc.insert()
+        except Exception as e:
+            frappe.db.rollback(save_point="hms_bulk_admission_row")
+            _fail(entry, str(e))
+            return
+
+    entry.tenant = doc.name
+    entry.new = True
+    tenants[doc.name] = frappe._dict(
+        name=doc.name, tenant_name=doc.tenant_name, email=doc.email, contact_number=doc.contact_number,
+        status=doc.status, branch=doc.branch, room=doc.room, customer=None,
+    )
+
+
+def _update_tenants(action, entries, tenants):
+    updates = {}
+    for entry in entries:
+        tenant = tenants[entry.tenant]
+        if not entry.new:
+            values = {"status": "Active", "branch": entry.branch, "room": entry.room}
+            if action == "Admission":
+                values["admission_date"] = entry.data.get("admission_date") or today()
+            updates[entry.tenant] = values
+        tenant.update(status="Active", branch=entry.branch, room=entry.room)
+    if updates:
+        frappe.db.bulk_update("Tenant", updates, chunk_size=500)
+
+
+def _write_history(action, entries):
+    """Close the open history row of every existing tenant and append its new Active row"""
+    entries = [e for e in entries if not e.new]
+    if not entries:
+        return
+    tenants = tuple(e.tenant for e in entries)
+    timestamp = now()
+    frappe.db.sql(
+        """
+        UPDATE `tabTenant Accommodation History`
+        SET status = 'Left', to_date = %(today)s, remarks = %(remarks)s,
+            modified = %(modified)s, modified_by = %(user)s
+        WHERE parenttype = 'Tenant' AND parentfield = 'accommodation_history'
+        AND parent IN %(tenants)s AND status = 'Active' AND to_date IS NULL
+        """,
+        {
+            "today": today(),
+            "remarks": "Auto-closed due to branch/room change" if action == "Transfer" else "Auto-closed on re-admission",
+            "modified": timestamp,
+            "user": frappe.session.user,
+            "tenants": tenants,
+        },
+    )
+
+    last_idx = dict(frappe.db.sql(
+        """
+        SELECT parent, MAX(idx)
+        FROM `tabTenant Accommodation History`
+        WHERE parenttype = 'Tenant' AND parentfield = 'accommodation_history' AND parent IN %(tenants)s
+        GROUP BY parent
+        """,
+        {"tenants": tenants},
+    ))
+    if action == "Transfer":
+        remarks, from_date = "Branch/Room changed while status Active", lambda entry: today()
+    else:
+        remarks, from_date = "Admitted", lambda entry: entry.data.get("admission_date") or today()
+    frappe.db.bulk_insert(
+        "Tenant Accommodation History",
+        HISTORY_FIELDS,
+        [
+            (
+                frappe.generate_hash(length=10), timestamp, timestamp, frappe.session.user, frappe.session.user,
+                entry.tenant, "Tenant", "accommodation_history", cint(last_idx.get(entry.tenant)) + 1,
+                entry.branch, entry.room, from_date(entry), None, "Active", remarks,
+            )
+            for entry in entries
+        ],
+    )
+
+
+def _sync_customers(action, entries, tenants):
+    batch = [tenants[e.tenant] for e in entries]
+
+    if action == "Admission":
+        linked = [t.customer for t in batch if t.customer]
+        if linked:
+            frappe.db.set_value("Customer", {"name": ["in", linked]}, "disabled", 0)
+
+        unlinked = [t for t in batch if not t.customer]
+        matches = match_customers(unlinked)
+        links = {}
+        for tenant in unlinked:
+            customer = matches.get(tenant.name)
+            if customer:
+                link_tenant_customer(customer, tenant)
+            else:
+                customer = create_tenant_customer(tenant)
+            tenant.customer = links[tenant.name] = customer
+        if links:
+            frappe.db.bulk_update("Tenant", {t: {"customer": c} for t, c in links.items()}, chunk_size=500)
+    else:
+        # a transfer to another branch may move the Customer to another company
+        for tenant in batch:
+            company = tenant.customer and get_branch_company(tenant.branch)
+            if company:
+                sync_customer(tenant.customer, {"custom_company": company})
+
+    clear_portal_identity_for_customers([t.customer for t in batch])
+
+
+def _fail(entry, message):
+    entry.result = "Failed"
+    entry.message = message
+
+
+def _get_summary(entries, occupancy):
+    results = [
+        {
+            "row": e.row,
+            "tenant": e.tenant,
+            "status": e.result,
+            "message": e.message,
+            "branch": e.branch,
+            "room": e.room,
+            "from_room": e.from_room,
+        }
+        for e in entries
+    ]
+    counts = Counter(e.result for e in entries)
+    return frappe._dict(
+        results=results,
+        processed=len(entries),
+        succeeded=counts["Admitted"] + counts["Transferred"],
+        failed=counts["Failed"],
+        skipped=counts["Skipped"],
+        rooms={room: {"old_occupied_beds": old, "new_occupied_beds": new} for room, (old, new) in occupancy.items()},
+    )
@@ -0,0 +1,19 @@
+import frappe
+
+
+def get_previous_values(doc, fields):
+    """
+    Stored values of `fields` for a document being saved, as a frappe._dict (None for new documents).
+
+    Uses the before-save snapshot the framework loads at the start of every save, so no second
+    copy of the document is fetched. Outside a save (no snapshot) only these columns of the
+    parent row are read, so child tables are never reloaded.
+    """
+    if doc.is_new():
+        return None
+
+    doc_before_save = doc.get_doc_before_save()
+    if doc_before_save:
+        return frappe._dict({field: doc_before_save.get(field) for field in fields})
+    return frappe.db.get_value(doc.doctype, doc.name, list(fields), as_dict=True) or frappe._dict()
+
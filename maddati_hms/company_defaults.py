@@ -0,0 +1,81 @@
+import frappe
+
+BRANCH_DEFAULTS_KEY = "maddati_hms:branch_defaults"
+COMPANY_DEFAULTS_KEY = "maddati_hms:company_defaults"
+
+
+def get_branch_company(branch):
+    """Company of a branch, served from cache"""
+    if not branch:
+        return None
+    return get_branch_defaults(branch).company
+
+
+def get_branch_defaults(branch):
+    """
+    Accounting bundle of a branch's company:
+    {company, receivable_account, income_account, cost_center}
+    Cached in Redis (and for the rest of the request in frappe.local).
+    """
+    if not branch:
+        return _empty_defaults()
+    return frappe._dict(
+        frappe.cache().hget(BRANCH_DEFAULTS_KEY, branch, generator=lambda: _load_branch_defaults(branch))
+        or _empty_defaults()
+    )
+
+
+def get_company_defaults(company):
+    """Same bundle as get_branch_defaults, looked up by company"""
+    if not company:
+        return _empty_defaults()
+    return frappe._dict(
+        frappe.cache().hget(COMPANY_DEFAULTS_KEY, company, generator=lambda: _load_company_defaults(company))
+        or _empty_defaults()
+    )
+
+
+def _load_branch_defaults(branch):
+    rows = frappe.db.sql(
+        """
+        SELECT
+            b.company,
+            c.default_receivable_account AS receivable_account,
+            c.default_income_account AS income_account,
+            c.cost_center
+        FROM `tabBranch` b
+        LEFT JOIN `tabCompany` c ON c.name = b.company
+        WHERE b.name = %s
+        """,
+        branch,
+        as_dict=True,
+    )
+    return dict(rows[0]) if rows else _empty_defaults()
+
+
+def _load_company_defaults(company):
+    values = frappe.db.get_value(
+        "Company",
+        company,
+        ["name as company", "default_receivable_account as receivable_account",
+         "default_income_account as income_account", "cost_center"],
+        as_dict=True,
+    )
+    return dict(values) if values else _empty_defaults()
+
+
+def _empty_defaults():
+    return {"company": None, "receivable_account": None, "income_account": None, "cost_center": None}
+
+
+def clear_branch_defaults(branch=None):
+    if branch:
+        frappe.cache().hdel(BRANCH_DEFAULTS_KEY, branch)
+    else:
+        frappe.cache().delete_value(BRANCH_DEFAULTS_KEY)
+
+
+def clear_company_defaults(doc, method=None, *args):
+    """doc_events hook for Company: branch bundles embed company defaults, so drop them all"""
+    frappe.cache().hdel(COMPANY_DEFAULTS_KEY, doc.name)
+    frappe.cache().delete_value(BRANCH_DEFAULTS_KEY)
@@ -0,0 +1,152 @@
+import frappe
+
+from maddati_hms.company_defaults import get_branch_company
+from maddati_hms.portal_identity import clear_portal_identity
+
+# Branch-wide syncs touching more customers than this are moved to a background job
+DEFAULT_ASYNC_SYNC_THRESHOLD = 500
+
+
+def get_tenant_customer_values(tenant):
+    """Customer fields mirrored from a Tenant; fields without a source value are left alone"""
+    values = {"custom_tenant": tenant.name}
+    if tenant.tenant_name:
+        values["customer_name"] = tenant.tenant_name
+    if tenant.email:
+        values["email_id"] = tenant.email
+        values["customer_email_address"] = tenant.email
+    company = get_branch_company(tenant.branch)
+    if company:
+        values["custom_company"] = company
+    return values
+
+
+def match_customers(tenants):
+    """
+    Existing Customer for each tenant ({name, tenant_name, email}) in one query.
+    Match priority: custom_tenant, customer name, customer_email_address, email_id;
+    the most recently modified Customer wins within a priority.
+    Returns {tenant: customer} for the tenants that matched.
+    """
+    tenant_names = {t.name for t in tenants if t.name}
+    names = {t.tenant_name for t in tenants if t.tenant_name}
+    emails = {t.email for t in tenants if t.email}
+
+    probes = []
+    for priority, column, values in (
+        (1, "custom_tenant", tenant_names),
+        (2, "customer_name", names),
+        (3, "customer_email_address", emails),
+        (4, "email_id", emails),
+    ):
+        if values:
+            probes.append(
+                f"SELECT {priority} AS priority, name, `{column}` AS match_value, modified "
+                f"FROM `tabCustomer` WHERE `{column}` IN %(p{priority})s"
+            )
+    if not probes:
+        return {}
+
+    rows = frappe.db.sql(
+        " UNION ALL ".join(probes) + " ORDER BY priority, modified DESC",
+        {"p1": tuple(tenant_names), "p2": tuple(names), "p3": tuple(emails), "p4": tuple(emails)},
+        as_dict=True,
+    )
+    best = {}
+    for row in rows:
+        best.setdefault((row.priority, row.match_value), row.name)
+
+    matches = {}
+    for tenant in tenants:
+        for priority, value in ((1, tenant.name), (2, tenant.tenant_name), (3, tenant.email), (4, tenant.email)):
+            customer = value and best.get((priority, value))
+            if customer:
+                matches[tenant.name] = customer
+                break
+    return matches
+
+
+def create_tenant_customer(tenant):
+    """Insert an enabled Customer for a Tenant, named after the tenant ID; returns its name"""
+    return frappe.get_doc({
+        "doctype": "Customer",
+        # tenant ID instead of tenant_name for easier identification
+        "customer_name": tenant.name,
+        "customer_type": "Individual",
+        "customer_group": "Individual",
+        "email_id": tenant.email,
+        "mobile_no": tenant.contact_number,
+        "custom_tenant": tenant.name,
+        "customer_email_address": tenant.email,
+        "custom_company": get_branch_company(tenant.branch),
+        "disabled": 0,
+    }).insert(ignore_permissions=True).name
+
+
+def link_tenant_customer(customer, tenant):
+    """Point an existing Customer at a Tenant and re-enable it"""
+    values = {"custom_tenant": tenant.name, "disabled": 0}
+    if tenant.email:
+        values["customer_email_address"] = tenant.email
+    company = get_branch_company(tenant.branch)
+    if company:
+        values["custom_company"] = company
+    frappe.db.set_value("Customer", customer, values)
+
+
+def sync_customer(customer, values):
+    """Write only the fields of `values` that differ from the stored Customer; returns the written fields"""
+    if not customer or not values:
+        return {}
+    current = frappe.db.get_value("Customer", customer, list(values), as_dict=True)
+    if not current:
+        return {}
+    changed = {field: value for field, value in values.items() if current.get(field) != value}
+    if changed:
+        frappe.db.set_value("Customer", customer, changed)
+    if "email_id" in changed:
+        # set_value skips the Customer hooks; portal identities are keyed by this address
+        clear_portal_identity([current.email_id, changed["email_id"]])
+    return changed
+
+
+def sync_branch_customer_company(branch):
+    """
+    Point custom_company of every customer linked to the branch's tenants at the branch company.
+    Small branches are updated in place; larger ones (see `hms_customer_sync_async_threshold`
+    in site config) are handed to a background job after commit.
+    """
+    threshold = frappe.conf.get("hms_customer_sync_async_threshold") or DEFAULT_ASYNC_SYNC_THRESHOLD
+    linked = frappe.db.count("Tenant", {"branch": branch, "customer": ["is", "set"]})
+    if not linked:
+        return
+    if linked > threshold:
+        frappe.enqueue(
+            "maddati_hms.customer_sync.update_branch_customer_company",
+            queue="long",
+            job_id=f"hms_branch_customer_sync::{branch}",
+            deduplicate=True,
+            enqueue_after_commit=True,
+            branch=branch,
+        )
+    else:
+        update_branch_customer_company(branch)
+
+
+def update_branch_customer_company(branch):
+    """One UPDATE for all customers of the branch whose company differs; reads the company at run time"""
+    company = frappe.db.get_value("Branch", branch, "company")
+    if not company:
+        return
+    frappe.db.sql(
+        """
+        UPDATE `tabCustomer` c
+        INNER JOIN (
+            SELECT DISTINCT customer FROM `tabTenant`
+            WHERE branch = %(branch)s AND IFNULL(customer, '') != ''
+        ) t ON t.customer = c.name
+        SET c.custom_company = %(company)s, c.modified = %(modified)s, c.modified_by = %(user)s
+        WHERE IFNULL(c.custom_company, '') != %(company)s
+        """,
+        {"branch": branch, "company": company, "modified": frappe.utils.now(), "user": frappe.session.user},
+    )
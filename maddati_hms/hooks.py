@@ -28,6 +28,7 @@ fixtures = [
                 "Customer-custom_tenant",
                 "Customer-custom_company",
                 "Customer-customer_email_address",
+                "Sales Invoice-custom_billing_key",
                 
             ]]]},
     {"dt": "Email Template", "filters": [["name", "in", [
@@ -153,6 +154,34 @@ doctype_js = {"Sales Invoice" : "public/js/sales_invoice.js"}
 # ---------------
 # Hook on document methods and events
 
+doc_events = {
+    "Company": {
+        "on_update": "maddati_hms.company_defaults.clear_company_defaults",
+        "on_trash": "maddati_hms.company_defaults.clear_company_defaults",
+        "after_rename": "maddati_hms.company_defaults.clear_company_defaults",
+    },
+    "Customer": {
+        "on_update": "maddati_hms.portal_identity.on_customer_change",
+        "on_trash": "maddati_hms.portal_identity.on_customer_change",
+    },
+    "Sales Invoice": {
+        "on_submit": "maddati_hms.arrears.on_sales_invoice_change",
+        "on_cancel": "maddati_hms.arrears.on_sales_invoice_change",
+        "on_update_after_submit": "maddati_hms.arrears.on_sales_invoice_change",
+    },
+    "Payment Entry": {
+        "on_submit": "maddati_hms.arrears.on_payment_entry_change",
+        "on_cancel": "maddati_hms.arrears.on_payment_entry_change",
+    },
+    "Journal Entry": {
+        "on_submit": "maddati_hms.arrears.on_journal_entry_change",
+        "on_cancel": "maddati_hms.arrears.on_journal_entry_change",
+    },
+    "Payment Reconciliation": {
+        "reconcile": "maddati_hms.arrears.on_payment_reconciliation",
+    },
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -164,6 +193,16 @@ doctype_js = {"Sales Invoice" : "public/js/sales_invoice.js"}
 #     ]
 # }
 
+scheduler_events = {
+    "all": [
+        "maddati_hms.maddati_hms.doctype.payment.payment.retry_queued_payment_entries",
+    ],
+    "daily": [
+        "maddati_hms.occupancy_snapshot.take_occupancy_snapshot",
+        "maddati_hms.visitor_archive.archive_visitor_logs",
+    ]
+}
+
 # Testing
 # -------
 
@@ -0,0 +1,206 @@
+"""
+Per-call wall time, SQL query count and SQL time for HMS endpoints and controller hooks.
+
+Switched on with `hms_instrumentation: 1` in site config; while it is off `instrument`
+adds one config lookup per call. Calls are aggregated into hourly Redis histograms kept for
+STATS_RETENTION_HOURS, and calls slower than `hms_instrumentation_slow_ms` (default 1000)
+are kept in a short slow-call log. Read both with get_endpoint_stats.
+
+Place @instrument below @frappe.whitelist() so the whitelisted object is the wrapper.
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import frappe
+from frappe.utils import now_datetime
+
+STATS_KEY = "maddati_hms:instrumentation:{0}"
+SLOW_CALLS_KEY = "maddati_hms:instrumentation:slow"
+STATS_RETENTION_HOURS = 48
+MAX_SLOW_CALLS = 200
+DEFAULT_SLOW_MS = 1000
+# upper bounds (ms / queries) of the histogram buckets; larger values fall in "inf"
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+
+
+def instrument(fn):
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not frappe.conf.get("hms_instrumentation"):
+            return fn(*args, **kwargs)
+        return _call_instrumented(name, fn, args, kwargs)
+
+    return wrapper
+
+
+def _call_instrumented(name, fn, args, kwargs):
+    with count_queries() as frame:
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            try:
+                _record(name, wall_ms, frame["queries"], frame["sql_ms"])
+            except Exception:
+                # statistics must never break the call they measure
+                frappe.logger("hms_instrumentation").exception(f"Could not record stats for {name}")
+
+
+@contextmanager
+def count_queries():
+    """Count frappe.db.sql calls and their time (ms) inside the block, whether or not instrumentation is on"""
+    _install_sql_counter()
+    frame = {"queries": 0, "sql_ms": 0.0}
+    stack = getattr(frappe.local, "hms_instrumentation_stack", None)
+    if stack is None:
+        stack = frappe.local.hms_instrumentation_stack = []
+    stack.append(frame)
+    try:
+        yield frame
+    finally:
+        stack.pop()
+
+
+def _install_sql_counter():
+    """Wrap this connection's frappe.db.sql once; every open instrumented call is charged"""
+    db = frappe.db
+    if getattr(db, "_hms_sql_counter", False):
+        return
+    sql = db.sql
+
+    def counting_sql(*args, **kwargs):
+        stack = getattr(frappe.local, "hms_instrumentation_stack", None)
+        if not stack:
+            return sql(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return sql(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            for frame in stack:
+                frame["queries"] += 1
+                frame["sql_ms"] += elapsed
+
+    db.sql = counting_sql
+    db._hms_sql_counter = True
+
+
+def _record(name, wall_ms, queries, sql_ms):
+    cache = frappe.cache()
+    key = cache.make_key(STATS_KEY.format(now_datetime().strftime("%Y%m%d%H")))
+    pipe = cache.pipeline()
+    pipe.hincrby(key, f"{name}|count", 1)
+    pipe.hincrbyfloat(key, f"{name}|wall_ms", wall_ms)
+    pipe.hincrbyfloat(key, f"{name}|sql_ms", sql_ms)
+    pipe.hincrby(key, f"{name}|queries", queries)
+    pipe.hincrby(key, f"{name}|lat|{_bucket(wall_ms, LATENCY_BUCKETS)}", 1)
+    pipe.hincrby(key, f"{name}|qry|{_bucket(queries, QUERY_BUCKETS)}", 1)
+    pipe.expire(key, STATS_RETENTION_HOURS * 60 * 60)
+
+    if wall_ms >= (frappe.conf.get("hms_instrumentation_slow_ms") or DEFAULT_SLOW_MS):
+        entry = {
+            "method": name,
+            "wall_ms": round(wall_ms, 1),
+            "queries": queries,
+            "sql_ms": round(sql_ms, 1),
+            "user": frappe.session.user if getattr(frappe.local, "session", None) else None,
+            "at": str(now_datetime()),
+        }
+        slow_key = cache.make_key(SLOW_CALLS_KEY)
+        pipe.lpush(slow_key, frappe.as_json(entry, indent=None))
+        pipe.ltrim(slow_key, 0, MAX_SLOW_CALLS - 1)
+        frappe.logger("hms_instrumentation").warning(entry)
+
+    pipe.execute()
+
+
+def _bucket(value, bounds):
+    for bound in bounds:
+        if value <= bound:
+            return str(bound)
+    return "inf"
+
+
+@frappe.whitelist()
+def get_endpoint_stats(hours=24, method=None):
+    """
+    Aggregated stats of the last `hours` hourly windows, slowest total time first:
+    count, avg/p50/p95 wall ms (bucket upper bounds), avg queries, p95 queries, avg SQL ms,
+    plus the most recent slow calls.
+    """
+    frappe.only_for("System Manager")
+    hours = max(1, min(frappe.utils.cint(hours) or 24, STATS_RETENTION_HOURS))
+    # raw pipeline commands: make_key is applied here and values are plain numbers, not pickles
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    for key in _get_window_keys(hours):
+        pipe.hgetall(key)
+    pipe.lrange(cache.make_key(SLOW_CALLS_KEY), 0, MAX_SLOW_CALLS - 1)
+    *windows, slow_entries = pipe.execute()
+
+    totals = {}
+    for window in windows:
+        for field, value in (window or {}).items():
+            name, metric = frappe.safe_decode(field).split("|", 1)
+            if method and name != method:
+                continue
+            stats = totals.setdefault(name, {})
+            stats[metric] = stats.get(metric, 0) + float(value)
+
+    result = []
+    for name, stats in totals.items():
+        count = stats.get("count") or 0
+        if not count:
+            continue
+        result.append({
+            "method": name,
+            "count": int(count),
+            "total_ms": round(stats.get("wall_ms", 0), 1),
+            "avg_ms": round(stats.get("wall_ms", 0) / count, 1),
+            "p50_ms": _histogram_percentile(stats, "lat", LATENCY_BUCKETS, count, 50),
+            "p95_ms": _histogram_percentile(stats, "lat", LATENCY_BUCKETS, count, 95),
+            "avg_queries": round(stats.get("queries", 0) / count, 1),
+            "p95_queries": _histogram_percentile(stats, "qry", QUERY_BUCKETS, count, 95),
+            "avg_sql_ms": round(stats.get("sql_ms", 0) / count, 1),
+        })
+    result.sort(key=lambda row: row["total_ms"], reverse=True)
+
+    slow_calls = [frappe.parse_json(frappe.safe_decode(entry)) for entry in slow_entries]
+    if method:
+        slow_calls = [call for call in slow_calls if call.get("method") == method]
+
+    return {"enabled": bool(frappe.conf.get("hms_instrumentation")), "hours": hours, "endpoints": result, "slow_calls": slow_calls}
+
+
+def _histogram_percentile(stats, prefix, bounds, count, percent):
+    seen = 0
+    for bound in (*[str(b) for b in bounds], "inf"):
+        seen += stats.get(f"{prefix}|{bound}", 0)
+        if seen >= count * percent / 100:
+            return bound if bound == "inf" else int(bound)
+    return "inf"
+
+
+def _get_window_keys(hours):
+    cache = frappe.cache()
+    now = now_datetime()
+    return [
+        cache.make_key(STATS_KEY.format(frappe.utils.add_to_date(now, hours=-offset).strftime("%Y%m%d%H")))
+        for offset in range(hours)
+    ]
+
+
+@frappe.whitelist()
+def reset_endpoint_stats():
+    frappe.only_for("System Manager")
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    for key in _get_window_keys(STATS_RETENTION_HOURS):
+        pipe.delete(key)
+    pipe.delete(cache.make_key(SLOW_CALLS_KEY))
+    pipe.execute()
@@ -48,6 +48,28 @@ frappe.ui.form.on("Payment", {
         suppressCustomerValidationError();
     },
 
+    refresh: function(frm) {
+        // Queued mode: Payment Entry is posted by a background job
+        if (frm.doc.docstatus === 1 && frm.doc.processing_status === "Queued") {
+            frm.dashboard.set_headline_alert("Payment Entry is being posted in the background.", "orange");
+            frappe.realtime.off("hms_payment_processed");
+            frappe.realtime.on("hms_payment_processed", data => {
+                if (data && data.payment === frm.doc.name) {
+                    frm.reload_doc();
+                }
+            });
+        } else if (frm.doc.docstatus === 1 && frm.doc.processing_status === "Failed") {
+            frm.dashboard.set_headline_alert(`Payment Entry could not be posted: ${frappe.utils.escape_html(frm.doc.processing_error || "")}`, "red");
+            frm.add_custom_button("Retry Payment Entry", () => {
+                frappe.call({
+                    method: "maddati_hms.maddati_hms.doctype.payment.payment.retry_payment_entry",
+                    args: { payment: frm.doc.name },
+                    callback: () => frm.reload_doc()
+                });
+            });
+        }
+    },
+
     branch: function(frm) {
         frm.set_value("room", "");
         frm.set_value("tenant", "");
@@ -229,14 +251,13 @@ function updatePaymentReferences(frm) {
         return;
     }
 
-    const paymentAmount = frm.doc.amount;
+    let remaining = frm.doc.amount;
 
-    // Update each payment reference
+    // Fill references in table order (oldest due date first when allocated by the server)
     frm.doc.payment_references.forEach((ref, index) => {
         if (ref.outstanding_amount > 0) {
-            // For partial payments, allocate exactly the payment amount
-            // This ensures the difference amount is zero
-            ref.allocated_amount = Math.min(paymentAmount, ref.outstanding_amount);
+            ref.allocated_amount = Math.min(remaining, ref.outstanding_amount);
+            remaining -= ref.allocated_amount;
         } else {
             // For already paid invoices, set allocated amount to 0
             ref.allocated_amount = 0;
@@ -363,56 +384,36 @@ function populatePaymentReferencesOnAccept(frm) {
             frappe.msgprint(`❌ Error loading invoice details: ${err.message}`);
         });
     } else {
-        // If no invoice is selected, check if we can get invoice from tenant's recent invoices
+        // If no invoice is selected, spread the amount over the customer's open invoices, oldest due first
         if (frm.doc.linked_customer) {
-            frappe.db.get_list("Sales Invoice", {
-                filters: {
+            if (!frm.doc.amount) {
+                frappe.msgprint("ℹ️ Enter the received amount to allocate it across unpaid invoices.");
+                return;
+            }
+            frappe.call({
+                method: "maddati_hms.maddati_hms.doctype.payment.payment.get_fifo_allocation",
+                args: {
                     customer: frm.doc.linked_customer,
-                    docstatus: 1,
-                    outstanding_amount: [">", 0]
+                    amount: frm.doc.amount,
+                    company: frm.doc.company
                 },
-                order_by: "due_date asc",
-                limit: 1
-            }).then(invoices => {
-                if (invoices && invoices.length > 0) {
-                    const invoice = invoices[0];
-                    
-                    // Set the invoice field
-                    frm.set_value("invoice", invoice.name);
-                    
-                    // Now populate payment references
-                    frappe.db.get_doc("Sales Invoice", invoice.name).then(invoiceDoc => {
-                        // Clear existing payment references
-                        frm.clear_table("payment_references");
-
-                        // Add payment reference
-                        frm.add_child("payment_references", {
-                            reference_doctype: "Sales Invoice",
-                            reference_name: invoiceDoc.name,
-                            total_amount: invoiceDoc.grand_total,
-                            outstanding_amount: invoiceDoc.outstanding_amount,
-                            allocated_amount: frm.doc.amount || 0  // Use customer's entered amount
-                        });
-                        frm.refresh_field("payment_references");
-                        
-                        // Set amount based on outstanding amount if not already set
-                        if (!frm.doc.amount) {
-                            frm.set_value("amount", invoiceDoc.outstanding_amount);
-                            // Update allocated amount to match the newly set amount
-                            frm.doc.payment_references[0].allocated_amount = invoiceDoc.outstanding_amount;
-                            frm.refresh_field("payment_references");
-                        }
-                        
-                        frappe.msgprint(`✅ Auto-populated Payment References with invoice ${invoiceDoc.name} (due: ${invoiceDoc.due_date}).`);
-                        
-                    }).catch(err => {
-                        frappe.msgprint(`❌ Error loading invoice details: ${err.message}`);
-                    });
-                } else {
-                    frappe.msgprint("ℹ️ No unpaid invoices found for this customer. Please select an invoice manually.");
+                callback: function(r) {
+                    const allocation = r.message;
+                    if (!allocation || !allocation.references.length) {
+                        frappe.msgprint("ℹ️ No unpaid invoices found for this customer. Please select an invoice manually.");
+                        return;
+                    }
+
+                    frm.clear_table("payment_references");
+                    allocation.references.forEach(ref => frm.add_child("payment_references", ref));
+                    frm.refresh_field("payment_references");
+
+                    let message = `✅ Allocated across ${allocation.references.length} unpaid invoice(s), oldest due date first.`;
+                    if (allocation.unallocated_amount > 0) {
+                        message += ` ${frappe.format(allocation.unallocated_amount, {fieldtype: "Currency"})} will be recorded as an advance.`;
+                    }
+                    frappe.msgprint(message);
                 }
-            }).catch(err => {
-                frappe.msgprint(`❌ Error fetching invoices: ${err.message}`);
             });
         } else {
             frappe.msgprint("ℹ️ Please select an invoice to populate Payment References.");
@@ -422,7 +423,8 @@ function populatePaymentReferencesOnAccept(frm) {
 
 // Function to update allocated amount to match payment amount
 function updateAllocatedAmountToMatchPayment(frm) {
-    if (frm.doc.amount && frm.doc.payment_references && frm.doc.payment_references.length > 0) {
+    // Multi-invoice allocations are spread server-side (oldest due date first)
+    if (frm.doc.amount && frm.doc.payment_references && frm.doc.payment_references.length === 1) {
         frm.doc.payment_references.forEach(ref => {
             ref.allocated_amount = frm.doc.amount;
         });
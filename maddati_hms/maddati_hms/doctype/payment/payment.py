@@ -1,9 +1,18 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import nowdate
+from frappe.utils import add_to_date, flt, now_datetime, nowdate
+
+from maddati_hms.company_defaults import get_company_defaults
+from maddati_hms.instrumentation import instrument
+
+# queued mode (site config `hms_queue_payment_entries`): attempts before a Payment is marked Failed
+PAYMENT_ENTRY_MAX_ATTEMPTS = 3
+# seconds between a failed attempt and the next one, doubled for every further attempt
+PAYMENT_ENTRY_RETRY_DELAY = 60
 
 class Payment(Document):
 
+    @instrument
     def on_update(self):
         """
         Handle updates to the document (but don't create Payment Entry here).
@@ -14,6 +23,7 @@ class Payment(Document):
         # Don't create Payment Entry on update - only on submit
         # This prevents duplicate Payment Entry creation
 
+    @instrument
     def on_submit(self):
         """
         Trigger Payment Entry creation when document is submitted.
@@ -47,14 +57,25 @@ class Payment(Document):
             return
 
         # frappe.msgprint("All validations passed, creating Payment Entry...")
-        self.create_payment_entry()
+        if self.flags.defer_payment_entry:
+            # the caller posts it (see maddati_hms.payment_import)
+            return
+        if frappe.conf.get("hms_queue_payment_entries"):
+            # GL posting happens in a background job; see process_payment_entry
+            self.queue_payment_entry()
+        else:
+            self.create_payment_entry()
 
+    @instrument
     def after_submit(self):
         """
         Verify Payment Entry linking after submit.
         """
         # frappe.msgprint(f"after_submit called - Linked Payment Entry: {self.linked_payment_entry}")
         
+        if self.processing_status == "Queued":
+            return
+
         if self.linked_payment_entry:
             # Verify the Payment Entry exists and is submitted
             if frappe.db.exists("Payment Entry", self.linked_payment_entry):
@@ -69,141 +90,152 @@ class Payment(Document):
             frappe.msgprint("❌ No Payment Entry linked after submit.")
 
     def create_payment_entry(self):
-        # frappe.msgprint("create_payment_entry method called")
-        
-        # Get the default receivable account for the company
-        paid_to_account = frappe.db.get_value("Company", self.company, "default_receivable_account")
-        if not paid_to_account:
-            frappe.msgprint(f"Default Receivable Account not set for Company {self.company}")
+        """
+        Create and submit the Payment Entry now, reporting problems as messages.
+        When insert or submit fails nothing is kept and the Payment is marked Failed, so it can be retried.
+        """
+        try:
+            pe_doc, invoice_already_paid = self.build_payment_entry()
+        except frappe.ValidationError as e:
+            frappe.msgprint(str(e))
             return
 
-        # frappe.msgprint(f"Using paid_to_account: {paid_to_account}")
+        frappe.db.savepoint("hms_payment_entry")
+        try:
+            pe_doc.insert(ignore_permissions=True)
+            pe_doc.submit()
+        except Exception as e:
+            # no draft Payment Entry is left linked to a Payment reported as posted
+            frappe.db.rollback(save_point="hms_payment_entry")
+            self.db_set({"processing_status": "Failed", "processing_error": str(e)})
+            frappe.msgprint(f"❌ Failed to create Payment Entry: {e!s}")
+            frappe.log_error(f"Payment Entry Creation Error: {e!s}", "Payment Entry Creation Failed")
+
+            # If the error is about customer validation, try to provide more specific guidance
+            if "Customer is required" in str(e):
+                frappe.msgprint("💡 Tip: This error usually occurs when the customer field is not properly set. Please ensure the tenant has a customer linked.")
+            return
+
+        # Update the linked payment entry field
+        self.db_set({"linked_payment_entry": pe_doc.name, "processing_status": "Posted", "processing_error": None})
+
+        # Log the linking for debugging
+        frappe.logger().info(f"Payment Entry {pe_doc.name} linked to Payment {self.name}")
+
+        if invoice_already_paid:
+            frappe.msgprint(f"✅ Payment Entry {pe_doc.name} created successfully for customer {self.linked_customer}. Note: This payment includes overpayment for already settled invoices.")
+        else:
+            frappe.msgprint(f"✅ Payment Entry {pe_doc.name} created successfully for customer {self.linked_customer}.")
+
+    def queue_payment_entry(self):
+        """Record the Payment as Queued and create the Payment Entry in a background job"""
+        self.db_set({"processing_status": "Queued", "processing_error": None, "processing_attempts": 0})
+        enqueue_payment_entry(self.name)
+        frappe.msgprint(f"Payment Entry for {self.name} has been queued and will be posted in the background.")
+
+    def build_payment_entry(self):
+        """
+        Unsaved Payment Entry for this Payment with its invoice allocations.
+        Raises frappe.ValidationError when it cannot be created; it is shared with the background
+        job and the bank import, so reporting is left to the interactive caller.
+        Returns (payment_entry, includes_overpayment).
+        """
+        if not self.company:
+            raise frappe.ValidationError("Company is not set. Cannot create Payment Entry.")
+        if flt(self.amount) <= 0:
+            raise frappe.ValidationError("Received Amount is mandatory and must be greater than 0.")
+
+        # Get the default receivable account for the company
+        paid_to_account = get_company_defaults(self.company).receivable_account
+        if not paid_to_account:
+            raise frappe.ValidationError(f"Default Receivable Account not set for Company {self.company}")
 
         # Ensure customer is properly set
         if not self.linked_customer:
-            frappe.msgprint("Customer is not set. Cannot create Payment Entry.")
-            return
+            raise frappe.ValidationError("Customer is not set. Cannot create Payment Entry.")
 
         # Verify customer exists
         if not frappe.db.exists("Customer", self.linked_customer):
-            frappe.msgprint(f"Customer {self.linked_customer} does not exist.")
-            return
+            raise frappe.ValidationError(f"Customer {self.linked_customer} does not exist.")
 
-        try:
-            # Prepare references data for ERPNext Payment Entry
-            references = []
-            invoice_already_paid = False
-            
-            # If payment_references table has data, use it
-            if hasattr(self, 'payment_references') and self.payment_references:
-                for ref in self.payment_references:
-                    # Check if the referenced document is already fully paid
-                    if ref.reference_doctype == "Sales Invoice":
-                        invoice_doc = frappe.get_doc("Sales Invoice", ref.reference_name)
-                        if invoice_doc.outstanding_amount <= 0:
-                            invoice_already_paid = True
-                            frappe.msgprint(f"⚠️ Warning: Invoice {ref.reference_name} is already fully paid. This will be recorded as an overpayment.")
-                    
-                    references.append({
-                        "reference_doctype": ref.reference_doctype,
-                        "reference_name": ref.reference_name,
-                        "total_amount": ref.total_amount,
-                        "outstanding_amount": ref.outstanding_amount,
-                        "allocated_amount": ref.allocated_amount
-                    })
-            
-            # If no references from payment_references table but invoice is selected, create a reference
-            if not references and self.invoice:
-                # Get invoice details and verify customer matches
-                invoice_doc = frappe.get_doc("Sales Invoice", self.invoice)
-                
-                # Verify that the invoice belongs to the same customer
-                if invoice_doc.customer != self.linked_customer:
-                    frappe.msgprint(f"❌ Invoice {self.invoice} belongs to customer {invoice_doc.customer}, but payment is for customer {self.linked_customer}. Please select the correct invoice.")
-                    return
-                
-                # Check if invoice is already fully paid
-                if invoice_doc.outstanding_amount <= 0:
-                    invoice_already_paid = True
-                    frappe.msgprint(f"⚠️ Warning: Invoice {self.invoice} is already fully paid. This will be recorded as an overpayment.")
-                    # For already paid invoices, set allocated amount to 0
-                    allocated_amount = 0
-                else:
-                    # For partial payments, allocate exactly the payment amount
-                    allocated_amount = min(self.amount, invoice_doc.outstanding_amount)
-                
+        # Prepare references data for ERPNext Payment Entry
+        references = []
+        invoice_already_paid = False
+        amount_to_allocate = flt(self.amount)
+        unallocated = 0
+
+        # Invoices to settle: the reference table, else the selected invoice,
+        # else every open invoice of the customer (oldest due date first)
+        invoice_rows = []
+        for ref in (self.get("payment_references") or []):
+            if ref.reference_doctype == "Sales Invoice":
+                invoice_rows.append(ref)
+            else:
+                # Non-invoice references are passed through as entered
                 references.append({
-                    "reference_doctype": "Sales Invoice",
-                    "reference_name": self.invoice,
-                    "total_amount": invoice_doc.grand_total,
-                    "outstanding_amount": invoice_doc.outstanding_amount,
-                    "allocated_amount": allocated_amount
+                    "reference_doctype": ref.reference_doctype,
+                    "reference_name": ref.reference_name,
+                    "total_amount": ref.total_amount,
+                    "outstanding_amount": ref.outstanding_amount,
+                    "allocated_amount": ref.allocated_amount
                 })
+                amount_to_allocate -= flt(ref.allocated_amount)
+        if not invoice_rows and not references and self.invoice:
+            invoice_rows = [frappe._dict(reference_name=self.invoice, allocated_amount=0)]
 
-            # frappe.msgprint(f"References prepared: {references}")
-
-            # Validate that total allocated amount equals payment amount
-            total_allocated = sum(ref.get("allocated_amount", 0) for ref in references)
-            if total_allocated != self.amount:
-                # frappe.msgprint(f"⚠️ Warning: Total allocated amount ({total_allocated}) does not match payment amount ({self.amount}). Adjusting allocated amounts...")
-                
-                # Adjust allocated amounts to match payment amount
-                for ref in references:
-                    if ref.get("outstanding_amount", 0) > 0:
-                        ref["allocated_amount"] = min(self.amount, ref["outstanding_amount"])
-                        break
-
-            # Create Payment Entry document with proper customer handling
-            pe_data = {
-                "doctype": "Payment Entry",
-                "payment_type": "Receive",
-                "party_type": "Customer",
-                "party": self.linked_customer,
-                "paid_to": paid_to_account,
-                "mode_of_payment": self.mode_of_payment or "Cash",
-                "posting_date": self.payment_date or nowdate(),
-                "reference_no": self.reference_no,
-                "paid_amount": self.amount,
-                "received_amount": self.amount,
-                "company": self.company,
-                "references": references
-            }
-
-            # frappe.msgprint(f"Payment Entry data: {pe_data}")
-
-            # Create and insert Payment Entry
-            pe_doc = frappe.get_doc(pe_data)
-            # frappe.msgprint("Payment Entry document created, inserting...")
-            pe_doc.insert(ignore_permissions=True)
-            # frappe.msgprint("Payment Entry inserted, submitting...")
-            
-            # Submit the Payment Entry with proper error handling
-            try:
-                pe_doc.submit()
-                # frappe.msgprint("Payment Entry submitted successfully")
-            except Exception as submit_error:
-                frappe.msgprint(f"⚠️ Warning: Payment Entry created but could not submit: {str(submit_error)}")
-                # Continue anyway as the Payment Entry exists
-
-            # Update the linked payment entry field
-            # frappe.msgprint(f"Updating linked_payment_entry field to: {pe_doc.name}")
-            self.db_set("linked_payment_entry", pe_doc.name)
-            
-            # Log the linking for debugging
-            frappe.logger().info(f"Payment Entry {pe_doc.name} linked to Payment {self.name}")
-            
-            if invoice_already_paid:
-                frappe.msgprint(f"✅ Payment Entry {pe_doc.name} created successfully for customer {self.linked_customer}. Note: This payment includes overpayment for already settled invoices.")
-            else:
-                frappe.msgprint(f"✅ Payment Entry {pe_doc.name} created successfully for customer {self.linked_customer}.")
+        if invoice_rows:
+            # One query for all referenced invoices
+            invoices = frappe.get_all(
+                "Sales Invoice",
+                filters={"name": ["in", [ref.reference_name for ref in invoice_rows]]},
+                fields=["name", "customer", "grand_total", "outstanding_amount", "due_date", "posting_date"],
+            )
+            for invoice in invoices:
+                # Verify that the invoice belongs to the same customer
+                if invoice.customer != self.linked_customer:
+                    raise frappe.ValidationError(f"❌ Invoice {invoice.name} belongs to customer {invoice.customer}, but payment is for customer {self.linked_customer}. Please select the correct invoice.")
+                # An already fully paid invoice turns the payment into an overpayment
+                if invoice.outstanding_amount <= 0:
+                    invoice_already_paid = True
+            invoice_references, unallocated = allocate_invoice_references(amount_to_allocate, invoice_rows, invoices)
+            references.extend(invoice_references)
+        elif not references:
+            # No invoice chosen: spread over all open invoices of the customer
+            allocations, unallocated = allocate_fifo(
+                amount_to_allocate, get_open_invoices(self.linked_customer, self.company)
+            )
+            references.extend(ref for ref in allocations if ref["allocated_amount"] > 0)
 
-        except Exception as e:
-            frappe.msgprint(f"❌ Failed to create Payment Entry: {str(e)}")
-            frappe.log_error(f"Payment Entry Creation Error: {str(e)}", "Payment Entry Creation Failed")
-            
-            # If the error is about customer validation, try to provide more specific guidance
-            if "Customer is required" in str(e):
-                frappe.msgprint("💡 Tip: This error usually occurs when the customer field is not properly set. Please ensure the tenant has a customer linked.")
+        # Anything left over stays unallocated on the Payment Entry as an advance
+        if references and unallocated > 0:
+            invoice_already_paid = True
+
+        # Create Payment Entry document with proper customer handling
+        pe_data = {
+            "doctype": "Payment Entry",
+            "payment_type": "Receive",
+            "party_type": "Customer",
+            "party": self.linked_customer,
+            "paid_to": paid_to_account,
+            "mode_of_payment": self.mode_of_payment or "Cash",
+            "posting_date": self.payment_date or nowdate(),
+            "reference_no": self.reference_no,
+            "paid_amount": self.amount,
+            "received_amount": self.amount,
+            "company": self.company,
+            "references": references
+        }
+
+        return frappe.get_doc(pe_data), invoice_already_paid
+
+    def post_payment_entry(self):
+        """Create, submit and link the Payment Entry; raises on any failure"""
+        pe_doc = self.build_payment_entry()[0]
+        pe_doc.insert(ignore_permissions=True)
+        pe_doc.submit()
+        self.db_set({"linked_payment_entry": pe_doc.name, "processing_status": "Posted", "processing_error": None})
+        frappe.logger().info(f"Payment Entry {pe_doc.name} linked to Payment {self.name}")
+        return pe_doc
 
     def suppress_customer_validation_error(self):
         """
@@ -213,3 +245,156 @@ class Payment(Document):
         # This is a placeholder method to suppress the error message
         # The actual suppression happens in the JavaScript
         pass
+
+
+def process_payment_entry(payment, attempt=1):
+    """
+    Background job for queued Payments: create and submit the Payment Entry.
+    Failures other than validation errors (deadlocks, lock timeouts) leave the Payment Queued for
+    retry_queued_payment_entries, up to PAYMENT_ENTRY_MAX_ATTEMPTS attempts; then it is marked Failed.
+    """
+    doc = frappe.get_doc("Payment", payment)
+    if doc.docstatus != 1 or doc.linked_payment_entry:
+        return
+
+    try:
+        doc.post_payment_entry()
+        doc.db_set("processing_attempts", attempt)
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        will_retry = not isinstance(e, frappe.ValidationError) and attempt < PAYMENT_ENTRY_MAX_ATTEMPTS
+        doc.db_set({
+            "processing_status": "Queued" if will_retry else "Failed",
+            "processing_error": str(e),
+            "processing_attempts": attempt,
+        })
+        frappe.db.commit()
+        if not will_retry:
+            frappe.log_error(f"Payment Entry Creation Error for {payment}: {e!s}", "Payment Entry Creation Failed")
+
+    frappe.publish_realtime("hms_payment_processed", {"payment": payment}, doctype="Payment", docname=payment)
+
+
+def enqueue_payment_entry(payment, attempt=1):
+    frappe.enqueue(
+        "maddati_hms.maddati_hms.doctype.payment.payment.process_payment_entry",
+        queue="default",
+        enqueue_after_commit=True,
+        job_id=f"hms_payment_entry::{payment}",
+        deduplicate=True,
+        payment=payment,
+        attempt=attempt,
+    )
+
+
+def retry_queued_payment_entries():
+    """
+    Scheduler job: enqueue the next attempt of Payments whose last attempt failed transiently,
+    once PAYMENT_ENTRY_RETRY_DELAY * 2 ** (attempts - 1) seconds have passed since it failed.
+    """
+    now = now_datetime()
+    for payment in frappe.get_all(
+        "Payment",
+        filters={
+            "docstatus": 1,
+            "processing_status": "Queued",
+            "processing_attempts": [">", 0],
+            "linked_payment_entry": ["is", "not set"],
+        },
+        fields=["name", "processing_attempts", "modified"],
+    ):
+        delay = PAYMENT_ENTRY_RETRY_DELAY * 2 ** (payment.processing_attempts - 1)
+        if add_to_date(payment.modified, seconds=delay) <= now:
+            enqueue_payment_entry(payment.name, payment.processing_attempts + 1)
+
+
+@frappe.whitelist()
+def retry_payment_entry(payment):
+    """Queue a Failed Payment for Payment Entry creation again"""
+    doc = frappe.get_doc("Payment", payment)
+    doc.check_permission("submit")
+    if doc.docstatus != 1 or doc.linked_payment_entry or doc.processing_status != "Failed":
+        frappe.throw("Only submitted Payments whose Payment Entry failed can be retried.")
+    doc.queue_payment_entry()
+
+
+def get_open_invoices(customer, company=None):
+    """Submitted Sales Invoices of a customer that still have an outstanding amount"""
+    filters = {"customer": customer, "docstatus": 1, "outstanding_amount": [">", 0]}
+    if company:
+        filters["company"] = company
+    return frappe.get_all(
+        "Sales Invoice",
+        filters=filters,
+        fields=["name", "grand_total", "outstanding_amount", "due_date", "posting_date"],
+        order_by="due_date asc, name asc",
+    )
+
+
+def allocate_fifo(amount, invoices):
+    """
+    Allocate `amount` across invoices in one pass, oldest due date (then posting date, name) first.
+    Each invoice receives at most its outstanding amount; fully paid invoices get 0.
+    Returns (Payment Entry reference rows, unallocated remainder).
+    """
+    remaining = flt(amount)
+    references = []
+    for invoice in sorted(
+        invoices, key=lambda i: (str(i.get("due_date") or i.get("posting_date") or ""), i.get("name"))
+    ):
+        outstanding = flt(invoice.get("outstanding_amount"))
+        allocated = min(remaining, outstanding) if outstanding > 0 and remaining > 0 else 0
+        remaining -= allocated
+        references.append({
+            "reference_doctype": "Sales Invoice",
+            "reference_name": invoice.get("name"),
+            "total_amount": invoice.get("grand_total"),
+            "outstanding_amount": outstanding,
+            "allocated_amount": allocated
+        })
+    return references, max(remaining, 0)
+
+
+def allocate_invoice_references(amount, rows, invoices):
+    """
+    Allocate `amount` over the Sales Invoice reference rows of a Payment.
+    Rows with an allocated_amount keep it, capped at the invoice's outstanding amount and at
+    what is left of `amount`; the remainder is spread FIFO over the rows without one.
+    Returns (Payment Entry reference rows, unallocated remainder).
+    """
+    by_name = {invoice.get("name"): invoice for invoice in invoices}
+    remaining = flt(amount)
+    references = []
+    fifo_invoices = []
+    for row in rows:
+        invoice = by_name.get(row.get("reference_name"))
+        if not invoice:
+            continue
+        if flt(row.get("allocated_amount")) <= 0:
+            fifo_invoices.append(invoice)
+            continue
+        outstanding = flt(invoice.get("outstanding_amount"))
+        allocated = max(min(flt(row.get("allocated_amount")), outstanding, remaining), 0)
+        remaining -= allocated
+        references.append({
+            "reference_doctype": "Sales Invoice",
+            "reference_name": invoice.get("name"),
+            "total_amount": invoice.get("grand_total"),
+            "outstanding_amount": outstanding,
+            "allocated_amount": allocated
+        })
+
+    allocations, unallocated = allocate_fifo(remaining, fifo_invoices)
+    return references + allocations, unallocated
+
+
+@frappe.whitelist()
+def get_fifo_allocation(customer, amount, company=None):
+    """Preview how `amount` would be spread over the customer's open invoices"""
+    frappe.has_permission("Sales Invoice", "read", throw=True)
+    references, unallocated = allocate_fifo(amount, get_open_invoices(customer, company))
+    return {
+        "references": [ref for ref in references if ref["allocated_amount"] > 0],
+        "unallocated_amount": unallocated
+    }
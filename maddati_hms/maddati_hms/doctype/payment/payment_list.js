@@ -0,0 +1,10 @@
+frappe.listview_settings['Payment'] = {
+    add_fields: ["processing_status"],
+    get_indicator: function(doc) {
+        if (doc.docstatus === 1 && doc.processing_status === "Queued") {
+            return ["Posting", "orange", "processing_status,=,Queued"];
+        } else if (doc.docstatus === 1 && doc.processing_status === "Failed") {
+            return ["Posting Failed", "red", "processing_status,=,Failed"];
+        }
+    }
+};
@@ -1,9 +1,128 @@
 # Copyright (c) 2025, Maddati Tech Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+import frappe
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
 from frappe.tests.utils import FrappeTestCase
 
+from maddati_hms.maddati_hms.doctype.payment.payment import allocate_fifo, allocate_invoice_references
+
+INVOICES = [
+	frappe._dict(name="SINV-1", customer="CUST-1", grand_total=100, outstanding_amount=100, due_date="2025-01-07"),
+	frappe._dict(name="SINV-2", customer="CUST-1", grand_total=100, outstanding_amount=100, due_date="2025-02-07"),
+	frappe._dict(name="SINV-3", customer="CUST-1", grand_total=100, outstanding_amount=60, due_date="2025-03-07"),
+]
+
 
 class TestPayment(FrappeTestCase):
-	pass
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		# a customer of its own, so its open invoices are exactly these; rolled back with the class
+		cls.customer = frappe.get_doc({
+			"doctype": "Customer",
+			"customer_name": f"_Test HMS Payment Customer {frappe.generate_hash(length=6)}",
+			"customer_group": "_Test Customer Group",
+			"territory": "_Test Territory",
+		}).insert(ignore_permissions=True).name
+		cls.invoices = [
+			create_sales_invoice(customer=cls.customer, posting_date=posting_date, rate=100).name
+			for posting_date in ("2025-01-07", "2025-02-07", "2025-03-07")
+		]
+		# the newest invoice is partly paid
+		frappe.db.set_value("Sales Invoice", cls.invoices[2], "outstanding_amount", 60)
+
+	def test_allocate_fifo_oldest_due_first(self):
+		invoices = [
+			{"name": "SINV-3", "grand_total": 100, "outstanding_amount": 100, "due_date": "2025-03-07"},
+			{"name": "SINV-1", "grand_total": 100, "outstanding_amount": 40, "due_date": "2025-01-07"},
+			{"name": "SINV-2", "grand_total": 100, "outstanding_amount": 100, "due_date": "2025-02-07"},
+		]
+		references, unallocated = allocate_fifo(190, invoices)
+
+		self.assertEqual(
+			[(ref["reference_name"], ref["allocated_amount"]) for ref in references],
+			[("SINV-1", 40), ("SINV-2", 100), ("SINV-3", 50)],
+		)
+		self.assertEqual(unallocated, 0)
+
+	def test_allocate_fifo_overpayment(self):
+		invoices = [
+			{"name": "SINV-1", "grand_total": 100, "outstanding_amount": 0, "due_date": "2025-01-07"},
+			{"name": "SINV-2", "grand_total": 100, "outstanding_amount": 100, "due_date": "2025-02-07"},
+		]
+		references, unallocated = allocate_fifo(150, invoices)
+
+		self.assertEqual([ref["allocated_amount"] for ref in references], [0, 100])
+		self.assertEqual(unallocated, 50)
+
+	def test_explicit_allocations_are_kept(self):
+		rows = [{"reference_name": "SINV-3", "allocated_amount": 50}, {"reference_name": "SINV-1", "allocated_amount": 20}]
+		references, unallocated = allocate_invoice_references(100, rows, INVOICES)
+
+		self.assertEqual(
+			[(ref["reference_name"], ref["allocated_amount"]) for ref in references],
+			[("SINV-3", 50), ("SINV-1", 20)],
+		)
+		self.assertEqual(unallocated, 30)
+
+	def test_explicit_allocation_capped_at_outstanding(self):
+		references, unallocated = allocate_invoice_references(100, [{"reference_name": "SINV-3", "allocated_amount": 90}], INVOICES)
+
+		self.assertEqual(references[0]["allocated_amount"], 60)
+		self.assertEqual(unallocated, 40)
+
+	def test_rows_without_allocation_share_the_rest_fifo(self):
+		rows = [
+			{"reference_name": "SINV-2", "allocated_amount": 0},
+			{"reference_name": "SINV-3", "allocated_amount": 60},
+			{"reference_name": "SINV-1", "allocated_amount": 0},
+		]
+		references, unallocated = allocate_invoice_references(150, rows, INVOICES)
+
+		self.assertEqual(
+			[(ref["reference_name"], ref["allocated_amount"]) for ref in references],
+			[("SINV-3", 60), ("SINV-1", 90), ("SINV-2", 0)],
+		)
+		self.assertEqual(unallocated, 0)
+
+	def build_payment_entry(self, **values):
+		payment = frappe.get_doc({
+			"doctype": "Payment",
+			"company": "_Test Company",
+			"linked_customer": self.customer,
+			"amount": 150,
+			"status": "Accepted",
+			**values,
+		})
+		payment_entry, _overpayment = payment.build_payment_entry()
+		return [(ref.reference_name, ref.allocated_amount) for ref in payment_entry.references]
+
+	def test_payment_entry_keeps_reference_table_allocations(self):
+		first, _second, third = self.invoices
+		references = self.build_payment_entry(
+			payment_references=[
+				{"reference_doctype": "Sales Invoice", "reference_name": third, "allocated_amount": 60},
+				{"reference_doctype": "Sales Invoice", "reference_name": first},
+			],
+		)
+		self.assertEqual(references, [(third, 60), (first, 90)])
+
+	def test_payment_entry_for_selected_invoice(self):
+		references = self.build_payment_entry(invoice=self.invoices[1], amount=80)
+		self.assertEqual(references, [(self.invoices[1], 80)])
+
+	def test_payment_entry_without_invoice_uses_open_invoices(self):
+		first, second, _third = self.invoices
+		references = self.build_payment_entry()
+		self.assertEqual(references, [(first, 100), (second, 50)])
+
+	def test_payment_entry_rejects_invoices_of_other_customers(self):
+		other = create_sales_invoice(customer="_Test Customer", rate=100)
+		with self.assertRaises(frappe.ValidationError):
+			self.build_payment_entry(invoice=other.name)
+
+	def test_payment_entry_validation_raises(self):
+		for values in ({"linked_customer": None}, {"company": None}, {"amount": 0}):
+			with self.assertRaises(frappe.ValidationError):
+				self.build_payment_entry(**values)
@@ -4,7 +4,12 @@
 import frappe
 from frappe.model.document import Document
 
+from maddati_hms.instrumentation import instrument
+from maddati_hms.portal_identity import clear_portal_identity
+from maddati_hms.room_search import clear_room_search_index
+
 class Room(Document):
+    @instrument
     def validate(self):
         if self.room_type == "Single":
             if self.capacity != 1:
@@ -29,3 +34,25 @@ class Room(Document):
                     self.status = "Full"
                 else:
                     self.status = "Available"
+
+    @instrument
+    def on_update(self):
+        self._clear_room_search_index()
+
+    @instrument
+    def after_rename(self, old_name, new_name, merge=False):
+        self._clear_room_search_index()
+
+    @instrument
+    def on_trash(self):
+        self._clear_room_search_index()
+
+    def _clear_room_search_index(self):
+        branches = {self.branch}
+        doc_before_save = self.get_doc_before_save()
+        if doc_before_save:
+            branches.add(doc_before_save.branch)
+        clear_room_search_index(branches)
+        if len(branches) > 1:
+            # portal identities carry the room's branch and company
+            clear_portal_identity()
@@ -1,9 +1,14 @@
 # Copyright (c) 2025, Maddati Tech and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import MagicMock, patch
+
+import frappe
 from frappe.tests import IntegrationTestCase
 
+from maddati_hms.api import get_room_fees
+from maddati_hms.availability import ALL_BRANCHES, AVAILABILITY_KEY, guest_rate_limit
+from maddati_hms.occupancy import apply_room_occupancy_changes
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -11,6 +16,8 @@ from frappe.tests import IntegrationTestCase
 EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
 
+OCCUPANCY_BRANCH = "_Test Occupancy Branch"
+
 
 
 class IntegrationTestRoom(IntegrationTestCase):
@@ -19,4 +26,105 @@ class IntegrationTestRoom(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def setUp(self):
+		self.cleanup()
+		frappe.get_doc({"doctype": "Branch", "branch_name": OCCUPANCY_BRANCH, "abbr": "_TOB"}).insert(ignore_permissions=True)
+		for room_number, room_type, capacity in (("_Test Single", "Single", 1), ("_Test Double", "Double", 2)):
+			frappe.get_doc({
+				"doctype": "Room",
+				"room_number": room_number,
+				"branch": OCCUPANCY_BRANCH,
+				"room_type": room_type,
+				"capacity": capacity,
+				"occupied_beds": 0,
+				"monthly_rent": 100,
+			}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		frappe.db.delete("Room", {"branch": OCCUPANCY_BRANCH})
+		frappe.db.delete("Branch", OCCUPANCY_BRANCH)
+		frappe.db.commit()
+
+	def get_occupancy(self, room):
+		return frappe.db.get_value("Room", room, ["occupied_beds", "status"])
+
+	def test_occupancy_change_over_capacity_throws(self):
+		apply_room_occupancy_changes({"_Test Single": 1, "_Test Double": 1})
+		frappe.db.commit()
+
+		with self.assertRaises(frappe.ValidationError):
+			apply_room_occupancy_changes({"_Test Single": 1})
+		# the room locked first is already written when the second one fails; the
+		# request's rollback takes both back
+		with self.assertRaises(frappe.ValidationError):
+			apply_room_occupancy_changes({"_Test Double": -1, "_Test Single": 1})
+		frappe.db.rollback()
+
+		self.assertEqual(self.get_occupancy("_Test Single"), (1, "Full"))
+		self.assertEqual(self.get_occupancy("_Test Double"), (1, "Available"))
+
+	def test_occupancy_change_sets_status_and_beds(self):
+		self.assertEqual(apply_room_occupancy_changes({"_Test Double": 1}), {"_Test Double": (0, 1)})
+		self.assertEqual(self.get_occupancy("_Test Double"), (1, "Available"))
+
+		apply_room_occupancy_changes({"_Test Double": 1})
+		self.assertEqual(self.get_occupancy("_Test Double"), (2, "Full"))
+
+		# a transfer frees a bed in one room and fills the other
+		self.assertEqual(
+			apply_room_occupancy_changes({"_Test Double": -1, "_Test Single": 1}),
+			{"_Test Double": (2, 1), "_Test Single": (0, 1)},
+		)
+		self.assertEqual(self.get_occupancy("_Test Double"), (1, "Available"))
+		self.assertEqual(self.get_occupancy("_Test Single"), (1, "Full"))
+
+		# never below zero
+		apply_room_occupancy_changes({"_Test Double": -5})
+		self.assertEqual(self.get_occupancy("_Test Double"), (0, "Available"))
+
+	def test_occupancy_change_keeps_maintenance(self):
+		frappe.db.set_value("Room", "_Test Double", "status", "Maintenance")
+		apply_room_occupancy_changes({"_Test Double": 2})
+		self.assertEqual(self.get_occupancy("_Test Double"), (2, "Maintenance"))
+
+	def call_rate_limited(self, user, calls):
+		"""Call a guest_rate_limit-ed function `calls` times as `user` from one IP; returns the successful calls"""
+		done = []
+		fn = guest_rate_limit(lambda: done.append(1))
+		old_request, old_ip = getattr(frappe.local, "request", None), getattr(frappe.local, "request_ip", None)
+		frappe.local.request = MagicMock(method="GET")
+		frappe.local.request_ip = "203.0.113.7"
+		# a fresh method name per test, so buckets of earlier runs do not count
+		frappe.form_dict.cmd = f"maddati_hms.test_rate_limit_{frappe.generate_hash(length=8)}"
+		frappe.set_user(user)
+		try:
+			with patch.dict(frappe.conf, {"hms_guest_rate_limit": 2}):
+				for _i in range(calls):
+					fn()
+		finally:
+			frappe.set_user("Administrator")
+			frappe.local.request, frappe.local.request_ip = old_request, old_ip
+			frappe.form_dict.pop("cmd", None)
+		return len(done)
+
+	def test_guest_rate_limit_limits_guests_per_ip(self):
+		with self.assertRaises(frappe.RateLimitExceededError):
+			self.call_rate_limited("Guest", 3)
+
+	def test_guest_rate_limit_skips_logged_in_users(self):
+		self.assertEqual(self.call_rate_limited("Administrator", 5), 5)
+
+	def test_room_fees_without_branch_use_the_room_branch_snapshot(self):
+		frappe.cache().hdel(AVAILABILITY_KEY, ALL_BRANCHES)
+
+		fees = get_room_fees("_Test Double")
+
+		self.assertEqual((fees["status"], fees["free_beds"], fees["monthly_rent"]), ("Available", 2, 100))
+		self.assertEqual(get_room_fees("_Test Double", "_Test Branch"), {})
+		self.assertEqual(get_room_fees("_Test Missing Room"), {})
+		self.assertIsNone(frappe.cache().hget(AVAILABILITY_KEY, ALL_BRANCHES))
+		self.assertIsNotNone(frappe.cache().hget(AVAILABILITY_KEY, OCCUPANCY_BRANCH))
@@ -0,0 +1,191 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, getdate, now, today
+
+from maddati_hms.accommodation_history import get_occupancy_timeline
+from maddati_hms.occupancy_snapshot import (
+	LAST_RUN_KEY,
+	SNAPSHOT_DOCTYPE,
+	_write_snapshot_rows,
+	run_backfill,
+	take_occupancy_snapshot,
+)
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+BRANCH = "_Test Snapshot Branch"
+ROOM = "_Test Snapshot Room"
+EMPTY_ROOM = "_Test Snapshot Room No Beds"
+
+
+def timeline_by_day(segments):
+	days = {}
+	for segment in segments:
+		day = segment.from_date
+		while day <= segment.to_date:
+			days[str(day)] = segment.occupied
+			day = add_days(day, 1)
+	return days
+
+
+class IntegrationTestRoomOccupancySnapshot(IntegrationTestCase):
+	"""
+	Integration tests for RoomOccupancySnapshot.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def setUp(self):
+		self.cleanup()
+		frappe.get_doc({"doctype": "Branch", "branch_name": BRANCH, "abbr": "_TSB"}).insert(ignore_permissions=True)
+		frappe.get_doc({
+			"doctype": "Room",
+			"room_number": ROOM,
+			"branch": BRANCH,
+			"room_type": "Double",
+			"capacity": 2,
+			"occupied_beds": 0,
+			"monthly_rent": 100,
+		}).insert(ignore_permissions=True)
+		# Room.validate rejects a capacity of 0, but older rows can still have one
+		frappe.get_doc({
+			"doctype": "Room",
+			"name": EMPTY_ROOM,
+			"room_number": EMPTY_ROOM,
+			"branch": BRANCH,
+			"room_type": "Dormitory",
+			"capacity": 0,
+			"occupied_beds": 0,
+			"status": "Available",
+		}).db_insert()
+		# the snapshot table is only written by the job under test
+		frappe.db.delete(SNAPSHOT_DOCTYPE)
+		frappe.db.set_global(LAST_RUN_KEY, None)
+		frappe.db.commit()
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		frappe.db.delete(SNAPSHOT_DOCTYPE, {"branch": BRANCH})
+		frappe.db.delete("Tenant Accommodation History", {"branch": BRANCH})
+		frappe.db.delete("Tenant", {"branch": BRANCH})
+		frappe.db.delete("Room", {"branch": BRANCH})
+		frappe.db.delete("Branch", BRANCH)
+		frappe.db.commit()
+
+	def add_tenant(self, name, status="Active", room=ROOM, stay=None):
+		"""Tenant row without the controller, so occupancy and Customer hooks stay out of the test"""
+		frappe.get_doc({
+			"doctype": "Tenant",
+			"name": name,
+			"tenant_name": name,
+			"email": f"{frappe.scrub(name)}@example.com",
+			"branch": BRANCH,
+			"room": room,
+			"status": status,
+		}).db_insert()
+		if stay:
+			frappe.get_doc({
+				"doctype": "Tenant Accommodation History",
+				"parent": name,
+				"parenttype": "Tenant",
+				"parentfield": "accommodation_history",
+				"idx": 1,
+				"branch": BRANCH,
+				"room": room,
+				"from_date": stay[0],
+				"to_date": stay[1],
+				"status": "Left" if stay[1] else "Active",
+			}).db_insert()
+
+	def get_snapshot(self, room=ROOM, snapshot_date=None):
+		return frappe.db.get_value(
+			SNAPSHOT_DOCTYPE,
+			{"room": room, "snapshot_date": snapshot_date or today()},
+			["capacity", "occupied_beds", "status"],
+			as_dict=True,
+		)
+
+	def test_timeline_counts_nights(self):
+		stays = [
+			frappe._dict(from_date="2025-01-01", to_date="2025-01-03"),
+			frappe._dict(from_date="2025-01-02", to_date="2025-01-04"),
+			frappe._dict(from_date="2025-01-03", to_date=None),
+		]
+		self.assertEqual(
+			timeline_by_day(get_occupancy_timeline(stays, "2025-01-01", "2025-01-05")),
+			{"2025-01-01": 1, "2025-01-02": 2, "2025-01-03": 2, "2025-01-04": 1, "2025-01-05": 1},
+		)
+
+	def test_timeline_without_stays_is_one_empty_segment(self):
+		segments = get_occupancy_timeline([], "2025-01-01", "2025-01-03")
+		self.assertEqual(
+			[(str(s.from_date), str(s.to_date), s.occupied) for s in segments], [("2025-01-01", "2025-01-03", 0)]
+		)
+
+	def test_daily_capture_counts_active_tenants(self):
+		self.add_tenant("_Test Snapshot Tenant 1")
+		self.add_tenant("_Test Snapshot Tenant 2")
+		self.add_tenant("_Test Snapshot Tenant 3", status="Left")
+
+		take_occupancy_snapshot()
+
+		self.assertEqual(self.get_snapshot(), {"capacity": 2, "occupied_beds": 2, "status": "Full"})
+
+	def test_room_without_capacity_is_not_reported_full(self):
+		take_occupancy_snapshot()
+
+		self.assertIsNone(self.get_snapshot(EMPTY_ROOM))
+		self.assertEqual(self.get_snapshot().status, "Available")
+
+	def test_rerun_on_same_date_is_idempotent(self):
+		self.add_tenant("_Test Snapshot Tenant 1")
+		take_occupancy_snapshot()
+		take_occupancy_snapshot()
+		self.assertEqual(frappe.db.count(SNAPSHOT_DOCTYPE, {"room": ROOM, "snapshot_date": today()}), 1)
+
+		# a change after the last run is picked up by the next run of the same day
+		frappe.db.set_value("Tenant", "_Test Snapshot Tenant 1", "status", "Left")
+		take_occupancy_snapshot()
+		self.assertEqual(frappe.db.count(SNAPSHOT_DOCTYPE, {"room": ROOM, "snapshot_date": today()}), 1)
+		self.assertEqual(self.get_snapshot().occupied_beds, 0)
+
+	def test_unchanged_rooms_are_carried_forward_over_missing_days(self):
+		self.add_tenant("_Test Snapshot Tenant 1")
+		three_days_ago = add_days(today(), -3)
+		_write_snapshot_rows(
+			three_days_ago,
+			[frappe._dict(room=ROOM, branch=BRANCH, capacity=2, occupied_beds=1, status="Available")],
+		)
+		# nothing changed since the last run, so the last snapshot is copied, not recomputed
+		frappe.db.set_global(LAST_RUN_KEY, now())
+		frappe.db.commit()
+
+		take_occupancy_snapshot()
+
+		self.assertEqual(self.get_snapshot(), {"capacity": 2, "occupied_beds": 1, "status": "Available"})
+
+	def test_backfill_rebuilds_days_from_history(self):
+		start = add_days(today(), -5)
+		self.add_tenant("_Test Snapshot Tenant 1", status="Left", stay=(start, add_days(start, 3)))
+
+		run_backfill(start, add_days(today(), -1), branch=BRANCH)
+
+		occupied = {
+			str(row.snapshot_date): row.occupied_beds
+			for row in frappe.get_all(
+				SNAPSHOT_DOCTYPE, filters={"room": ROOM}, fields=["snapshot_date", "occupied_beds"]
+			)
+		}
+		self.assertEqual(
+			occupied,
+			{str(getdate(add_days(start, offset))): 1 if offset < 3 else 0 for offset in range(5)},
+		)
+		self.assertFalse(frappe.db.exists(SNAPSHOT_DOCTYPE, {"room": EMPTY_ROOM}))
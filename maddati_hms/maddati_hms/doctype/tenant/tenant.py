@@ -5,9 +5,26 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import sbool
 from datetime import date
 
+from maddati_hms.billing import build_tenant_invoice
+from maddati_hms.change_tracking import get_previous_values
+from maddati_hms.company_defaults import get_branch_defaults
+from maddati_hms.customer_sync import (
+    create_tenant_customer,
+    get_tenant_customer_values,
+    link_tenant_customer,
+    match_customers,
+    sync_customer,
+)
+from maddati_hms.instrumentation import instrument
+from maddati_hms.occupancy import apply_room_occupancy_changes, reconcile_room_occupancy
+from maddati_hms.pagination import decode_cursor, get_keyset_condition, get_page_len, split_page
+from maddati_hms.portal_identity import clear_portal_identity, clear_portal_identity_for_customers
+
 class Tenant(Document):
+    @instrument
     def validate(self):
         """
         - Create new row in accommodation history child table when status, branch, or room is changed
@@ -17,7 +34,8 @@ class Tenant(Document):
         - Don't allow branch/room change when status is Active
         """
         if not self.is_new():
-            old_doc = frappe.get_doc(self.doctype, self.name)
+            # Only the tracked fields of the stored Tenant are needed, not its child tables
+            old_doc = get_previous_values(self, ("status", "branch", "room"))
             status_changed = old_doc.status != self.status
             branch_changed = old_doc.branch != self.branch
             room_changed = old_doc.room != self.room
@@ -65,16 +83,16 @@ class Tenant(Document):
                     if not updated:
                         self._add_accommodation_history_row(from_date=date.today(), to_date=date.today(), status="Left", remarks="Auto-closed due to branch/room change")
                     
-                    # Decrement occupied_beds in old room
-                    if old_doc.room:
-                        self._update_room_occupancy(old_doc.room, -1)
-                    
                     # Create new active row for new branch/room
                     self._add_accommodation_history_row(from_date=date.today(), to_date=None, status="Active", remarks="Branch/Room changed while status Active")
                     
-                    # Increment occupied_beds in new room
+                    # Move one occupied bed from the old room to the new room in a single locked step
+                    changes = {}
+                    if old_doc.room:
+                        changes[old_doc.room] = changes.get(old_doc.room, 0) - 1
                     if self.room:
-                        self._update_room_occupancy(self.room, 1)
+                        changes[self.room] = changes.get(self.room, 0) + 1
+                    self._apply_room_occupancy_changes(changes)
                 # If status is Left/Cancelled, update last Left/Cancelled row
                 elif self.status in ["Left", "Cancelled"]:
                     updated = False
@@ -111,7 +129,8 @@ class Tenant(Document):
 
         else:
             # New tenant: create initial row if branch and room are set
-            if self.branch and self.room:
+            # bulk admissions bring their own history row and apply occupancy per room in one step
+            if self.branch and self.room and not self.flags.bulk_accommodation:
                 self._add_accommodation_history_row(from_date=date.today(), to_date=None, status=self.status or "Active", remarks="Initial accommodation assignment")
                 # Increment occupied_beds for new active tenant
                 if (self.status or "").lower() == "active":
@@ -123,8 +142,22 @@ class Tenant(Document):
         if self.customer:
             self._sync_customer_fields()
 
+    @instrument
+    def on_update(self):
+        # Portal identities resolve email -> customer -> tenant -> room -> branch; drop them when those links move
+        doc_before_save = self.get_doc_before_save()
+        if not doc_before_save or any(
+            doc_before_save.get(field) != self.get(field)
+            for field in ("customer", "room", "branch", "status", "email")
+        ):
+            clear_portal_identity_for_customers([self.customer, doc_before_save and doc_before_save.customer])
+            # the customer's email is already the new one here, the old address is only on the tenant
+            clear_portal_identity([self.email, doc_before_save and doc_before_save.email])
+
+    @instrument
     def after_rename(self, old_name, new_name, merge=False):
         """Handle tenant rename - update customer name to match new tenant ID"""
+        clear_portal_identity_for_customers([self.customer])
         if self.customer:
             # Update customer name to match the new tenant ID
             frappe.db.set_value('Customer', self.customer, 'customer_name', new_name)
@@ -132,11 +165,13 @@ class Tenant(Document):
             frappe.db.set_value('Customer', self.customer, 'custom_tenant', new_name)
             frappe.msgprint(_('Customer "{0}" name updated to match new tenant ID "{1}"').format(self.customer, new_name), indicator='green')
 
+    @instrument
     def after_insert(self):
         # Auto-create/link Customer only if new Tenant is Active and customer not set
-        if (self.status or "").lower() == "active" and not self.customer:
+        if (self.status or "").lower() == "active" and not self.customer and not self.flags.bulk_accommodation:
             create_or_link_customer(self.name)
 
+    @instrument
     def before_delete(self):
         # Prevent deletion when Tenant is Active or linked to Customer
         if (self.status or "").lower() == "active":
@@ -144,6 +179,7 @@ class Tenant(Document):
         if self.customer:
             frappe.throw(_("Tenant linked to Customer cannot be deleted. Unlink the Customer first."))
 
+    @instrument
     def before_trash(self):
         # Extra safety: some flows call before_trash
         if (self.status or "").lower() == "active":
@@ -151,6 +187,7 @@ class Tenant(Document):
         if self.customer:
             frappe.throw(_("Tenant linked to Customer cannot be deleted. Unlink the Customer first."))
 
+    @instrument
     def on_trash(self):
         # Final guard on deletion
         if (self.status or "").lower() == "active":
@@ -164,30 +201,20 @@ class Tenant(Document):
 
     def _update_room_occupancy(self, room_name, change):
         """Update room occupied_beds by the specified change amount"""
+        if room_name:
+            self._apply_room_occupancy_changes({room_name: change})
+
+    def _apply_room_occupancy_changes(self, changes):
+        """Atomically apply occupied_beds changes per room (see maddati_hms.occupancy)"""
         try:
-            if room_name:
-                room_doc = frappe.get_doc("Room", room_name)
-                current_occupied = room_doc.occupied_beds or 0
-                new_occupied = current_occupied + change
-                
-                # Ensure occupied_beds doesn't go below 0
-                if new_occupied < 0:
-                    new_occupied = 0
-                
-                # Ensure occupied_beds doesn't exceed capacity
-                if room_doc.capacity and new_occupied > room_doc.capacity:
-                    frappe.throw(_("Cannot assign tenant to room {0}. Room capacity is {1} but would have {2} occupied beds.").format(
-                        room_name, room_doc.capacity, new_occupied
-                    ))
-                
-                room_doc.occupied_beds = new_occupied
-                room_doc.save(ignore_permissions=True)
-                
-                frappe.msgprint(_(f"Room {room_name} occupancy updated: {current_occupied} → {new_occupied}"), indicator='blue')
+            results = apply_room_occupancy_changes(changes)
         except Exception as e:
-            frappe.log_error(f"Error updating room occupancy for {room_name}: {str(e)}", "Room Occupancy Update Failed")
+            frappe.log_error(f"Error updating room occupancy for {', '.join(changes)}: {str(e)}", "Room Occupancy Update Failed")
             raise e
 
+        for room_name, (current_occupied, new_occupied) in results.items():
+            frappe.msgprint(_(f"Room {room_name} occupancy updated: {current_occupied} → {new_occupied}"), indicator='blue')
+
     def _add_accommodation_history_row(self, from_date, to_date, status, remarks):
         self.append("accommodation_history", {
             "branch": self.branch,
@@ -199,35 +226,10 @@ class Tenant(Document):
         })
 
     def _sync_customer_fields(self):
-        """Sync tenant fields to linked customer"""
+        """Sync tenant fields to linked customer, writing only the fields that changed"""
         if not self.customer:
             return
-            
-        customer_updates = {}
-        
-        # Sync tenant name to customer name
-        if self.tenant_name:
-            customer_updates['customer_name'] = self.tenant_name
-            
-        # Sync email
-        if self.email:
-            customer_updates['email_id'] = self.email
-            customer_updates['customer_email_address'] = self.email
-            
-
-            
-        # Sync custom_tenant field
-        customer_updates['custom_tenant'] = self.name
-        
-        # Sync company from branch
-        if self.branch:
-            company = frappe.db.get_value('Branch', self.branch, 'company')
-            if company:
-                customer_updates['custom_company'] = company
-        
-        # Update customer if there are changes
-        if customer_updates:
-            frappe.db.set_value('Customer', self.customer, customer_updates)
+        sync_customer(self.customer, get_tenant_customer_values(self))
 
     def _validate_accommodation_history(self):
         # Only one active entry (status = "Active" and no to_date) allowed
@@ -248,6 +250,7 @@ class Tenant(Document):
                 frappe.throw(_("Left/Cancelled status entries must have a To Date."))
 
 @frappe.whitelist()
+@instrument
 def create_or_link_customer(tenant: str):
     doc = frappe.get_doc('Tenant', tenant)
     if doc.customer:
@@ -255,45 +258,32 @@ def create_or_link_customer(tenant: str):
         return { 'customer': doc.customer }
 
     # Try matching existing Customer by custom fields or name/email
-    customer = frappe.db.get_value('Customer', { 'custom_tenant': doc.name }, 'name')
-    if not customer:
-        customer = frappe.db.get_value('Customer', { 'customer_name': doc.tenant_name }, 'name')  # Look for customer with tenant name
-    if not customer and doc.email:
-        customer = frappe.db.get_value('Customer', { 'customer_email_address': doc.email }, 'name')
-    if not customer and doc.email:
-        customer = frappe.db.get_value('Customer', { 'email_id': doc.email }, 'name')
+    customer = match_customers([doc]).get(doc.name)
 
     if not customer:
-        # Create new Customer
-        customer = frappe.get_doc({
-            'doctype': 'Customer',
-            'customer_name': doc.name,  # Use tenant ID instead of tenant_name for easier identification
-            'customer_type': 'Individual',
-            'customer_group': 'Individual',
-            'email_id': doc.email,
-            'mobile_no': doc.contact_number,
-            'custom_tenant': doc.name,
-            'customer_email_address': doc.email,
-            'custom_company': frappe.db.get_value('Branch', doc.branch, 'company') if doc.branch else None,
-            'disabled': 0,
-        }).insert(ignore_permissions=True).name
+        customer = create_tenant_customer(doc)
         frappe.msgprint(_('New Customer created and linked: {0}').format(customer), indicator='green')
     else:
         # Update custom mappings and re-enable customer if it was disabled
-        frappe.db.set_value('Customer', customer, 'custom_tenant', doc.name)
-        frappe.db.set_value('Customer', customer, 'disabled', 0)  # Re-enable the customer
-        if doc.email:
-            frappe.db.set_value('Customer', customer, 'customer_email_address', doc.email)
-        if doc.branch:
-            company = frappe.db.get_value('Branch', doc.branch, 'company')
-            if company:
-                frappe.db.set_value('Customer', customer, 'custom_company', company)
+        link_tenant_customer(customer, doc)
         frappe.msgprint(_('Existing Customer re-enabled and linked: {0}').format(customer), indicator='green')
 
     # Don't modify the tenant document here - let the client handle it
     return { 'customer': customer }
 
 @frappe.whitelist()
+@instrument
+def match_tenant_customers(tenants):
+    """Existing Customer match for many tenants at once (e.g. bulk admissions): {tenant: customer}"""
+    tenants = frappe.parse_json(tenants) if isinstance(tenants, str) else tenants
+    if not tenants:
+        return {}
+    frappe.has_permission('Tenant', 'read', throw=True)
+    docs = frappe.get_all('Tenant', filters={'name': ['in', tenants]}, fields=['name', 'tenant_name', 'email'])
+    return match_customers(docs)
+
+@frappe.whitelist()
+@instrument
 def unlink_customer(tenant: str):
     doc = frappe.get_doc('Tenant', tenant)
     if not doc.customer:
@@ -305,11 +295,13 @@ def unlink_customer(tenant: str):
     # Clear custom_tenant field in customer and disable it
     frappe.db.set_value('Customer', customer_name, 'custom_tenant', '')
     frappe.db.set_value('Customer', customer_name, 'disabled', 1)
+    clear_portal_identity_for_customers([customer_name])
     
     frappe.msgprint(_('Customer "{0}" unlinked and disabled successfully').format(customer_name), indicator='green')
     return { 'success': True, 'customer': customer_name }
 
 @frappe.whitelist()
+@instrument
 def create_single_invoice(tenant_name: str, item_code: str, amount: float, invoice_type: str):
     """
     Create a single Sales Invoice for a specific item type
@@ -329,8 +321,9 @@ def create_single_invoice(tenant_name: str, item_code: str, amount: float, invoi
                 'message': f'No branch assigned to tenant {tenant_name}. Cannot create invoice.'
             }
             
-        # Get company from branch
-        company = frappe.db.get_value('Branch', tenant_doc.branch, 'company')
+        # Get company and its accounting defaults from branch (cached)
+        defaults = get_branch_defaults(tenant_doc.branch)
+        company = defaults.company
         if not company:
             return {
                 'success': False,
@@ -338,7 +331,7 @@ def create_single_invoice(tenant_name: str, item_code: str, amount: float, invoi
             }
             
         # Get default receivable account for the company
-        receivable_account = frappe.db.get_value('Company', company, 'default_receivable_account')
+        receivable_account = defaults.receivable_account
         if not receivable_account:
             return {
                 'success': False,
@@ -346,7 +339,7 @@ def create_single_invoice(tenant_name: str, item_code: str, amount: float, invoi
             }
             
         # Get default income account for the company
-        income_account = frappe.db.get_value('Company', company, 'default_income_account')
+        income_account = defaults.income_account
         if not income_account:
             return {
                 'success': False,
@@ -356,40 +349,8 @@ def create_single_invoice(tenant_name: str, item_code: str, amount: float, invoi
         # Get customer name
         customer_name = frappe.db.get_value('Customer', tenant_doc.customer, 'customer_name')
         
-        # Get cost center from company
-        cost_center = frappe.db.get_value('Company', company, 'cost_center')
-        
-        # Create description based on invoice type
-        if invoice_type == 'Monthly Fee':
-            description = f'Monthly fee for tenant {tenant_doc.name} - {tenant_doc.tenant_name} ({frappe.utils.formatdate(frappe.utils.today(), "MMMM YYYY")})'
-        else:
-            description = f'{invoice_type.lower()} for tenant {tenant_doc.name} - {tenant_doc.tenant_name}'
-        
         # Create Sales Invoice
-        invoice = frappe.get_doc({
-            'doctype': 'Sales Invoice',
-            'customer': tenant_doc.customer,
-            'customer_name': customer_name,
-            'company': company,
-            'posting_date': frappe.utils.today(),
-            'due_date': frappe.utils.add_days(frappe.utils.today(), 7),  # Due in 7 days
-            'debit_to': receivable_account,
-            'items': [{
-                'item_code': item_code,
-                'item_name': item_code,
-                'description': description,
-                'qty': 1,
-                'rate': amount,
-                'amount': amount,
-                'income_account': income_account,
-                'cost_center': cost_center,
-                'item_group': 'Services'
-            }],
-            'custom_tenant': tenant_doc.name,
-            'custom_branch': tenant_doc.branch,
-            'custom_room': tenant_doc.room,
-            'custom_invoice_type': invoice_type
-        })
+        invoice = build_tenant_invoice(tenant_doc, customer_name, defaults, item_code, amount, invoice_type)
         
         invoice.insert(ignore_permissions=True)
         invoice.submit()
@@ -408,30 +369,27 @@ def create_single_invoice(tenant_name: str, item_code: str, amount: float, invoi
         }
 
 @frappe.whitelist()
-def recalculate_room_occupancy():
-    """Recalculate occupied_beds for all rooms based on active tenants"""
+@instrument
+def recalculate_room_occupancy(branch=None, dry_run=False):
+    """Recalculate occupied_beds and status for all rooms (or one branch) based on active tenants"""
     try:
-        # Get all rooms
-        rooms = frappe.get_all("Room", fields=["name", "room_number"])
-        
-        for room in rooms:
-            # Count active tenants in this room
-            active_tenants = frappe.db.count("Tenant", {
-                "room": room.name,
-                "status": "Active"
-            })
-            
-            # Update room occupancy
-            frappe.db.set_value("Room", room.name, "occupied_beds", active_tenants)
-        
-        frappe.msgprint(_("Room occupancy recalculated successfully for {0} rooms").format(len(rooms)), indicator='green')
-        return {"success": True, "message": f"Recalculated occupancy for {len(rooms)} rooms"}
+        result = reconcile_room_occupancy(branch=branch, dry_run=sbool(dry_run))
+        total_rooms = result.total_rooms
+
+        if result.dry_run:
+            message = f"{len(result.changes)} out of {total_rooms} rooms would be updated"
+        else:
+            message = f"Recalculated occupancy for {total_rooms} rooms"
+            frappe.msgprint(_("Room occupancy recalculated successfully for {0} rooms").format(total_rooms), indicator='green')
+
+        return {"success": True, "message": message, "changes": result.changes, "dry_run": result.dry_run}
         
     except Exception as e:
         frappe.log_error(f"Error recalculating room occupancy: {str(e)}", "Room Occupancy Recalculation Failed")
         return {"success": False, "message": f"Error: {str(e)}"}
 
 @frappe.whitelist()
+@instrument
 def get_room_occupancy_status(room_name):
     """Get current occupancy status for a specific room"""
     try:
@@ -456,38 +414,27 @@ def get_room_occupancy_status(room_name):
         return {"error": str(e)}
 
 @frappe.whitelist()
-def fix_room_occupancy_inconsistencies():
+@instrument
+def fix_room_occupancy_inconsistencies(branch=None, dry_run=False):
     """Fix any inconsistencies in room occupancy data"""
     try:
-        # Get all rooms
-        rooms = frappe.get_all("Room", fields=["name", "room_number", "occupied_beds"])
-        
-        fixed_count = 0
-        total_rooms = len(rooms)
-        
-        for room in rooms:
-            # Count actual active tenants in this room
-            actual_active_tenants = frappe.db.count("Tenant", {
-                "room": room.name,
-                "status": "Active"
-            })
-            
-            # If there's a mismatch, fix it
-            if room.occupied_beds != actual_active_tenants:
-                frappe.db.set_value("Room", room.name, "occupied_beds", actual_active_tenants)
-                fixed_count += 1
-                
-                # Log the fix
-                frappe.logger().info(f"Fixed room {room.room_number}: occupied_beds changed from {room.occupied_beds} to {actual_active_tenants}")
-        
-        message = f"Fixed occupancy inconsistencies in {fixed_count} out of {total_rooms} rooms"
-        frappe.msgprint(_(message), indicator='green' if fixed_count == 0 else 'yellow')
+        result = reconcile_room_occupancy(branch=branch, dry_run=sbool(dry_run))
+        fixed_count = len(result.changes)
+        total_rooms = result.total_rooms
+
+        if result.dry_run:
+            message = f"Found occupancy inconsistencies in {fixed_count} out of {total_rooms} rooms"
+        else:
+            message = f"Fixed occupancy inconsistencies in {fixed_count} out of {total_rooms} rooms"
+            frappe.msgprint(_(message), indicator='green' if fixed_count == 0 else 'yellow')
         
         return {
             "success": True, 
             "message": message,
             "fixed_count": fixed_count,
-            "total_rooms": total_rooms
+            "total_rooms": total_rooms,
+            "changes": result.changes,
+            "dry_run": result.dry_run
         }
         
     except Exception as e:
@@ -495,55 +442,134 @@ def fix_room_occupancy_inconsistencies():
         return {"success": False, "message": f"Error: {str(e)}"}
 
 @frappe.whitelist()
-def get_occupancy_report():
-    """Get a detailed report of room occupancy"""
+@instrument
+def get_occupancy_report(branch=None, status=None, cursor=None, page_len=50):
+    """
+    Get a detailed report of room occupancy.
+    Rooms are paginated by (room_number, name); pass back `next_cursor` to get the next page.
+    Summary and per-branch/per-company rollups cover every room matching the filters and are
+    only computed for the first page (no cursor); later pages return them as None.
+    """
+    # an invalid cursor is a validation error for the caller, not a report failure
+    cursor_values = decode_cursor(cursor, 2)
     try:
-        # Get all rooms with their occupancy details
-        rooms = frappe.get_all("Room", fields=["name", "room_number", "capacity", "occupied_beds", "status"])
-        
+        page_len = get_page_len(page_len, default=50)
+        filters = {"branch": branch or None, "status": status or None}
+        keyset_condition, keyset_params = get_keyset_condition(["r.room_number", "r.name"], cursor_values)
+
+        # One grouped query for the page: stored occupancy vs actual active tenants
+        rooms = frappe.db.sql(
+            f"""
+            SELECT
+                r.name,
+                r.room_number,
+                r.branch,
+                r.capacity,
+                r.occupied_beds,
+                r.status,
+                COUNT(t.name) AS actual_active_tenants
+            FROM `tabRoom` r
+            LEFT JOIN `tabTenant` t ON t.room = r.name AND t.status = 'Active'
+            WHERE (%(branch)s IS NULL OR r.branch = %(branch)s)
+            AND (%(status)s IS NULL OR r.status = %(status)s)
+            AND {keyset_condition}
+            GROUP BY r.name, r.room_number, r.branch, r.capacity, r.occupied_beds, r.status
+            ORDER BY r.room_number ASC, r.name ASC
+            LIMIT %(limit)s
+            """,
+            {**filters, **keyset_params, "limit": page_len + 1},
+            as_dict=True,
+        )
+        rooms, next_cursor = split_page(rooms, page_len, key=lambda room: (room.room_number, room.name))
+
+        # Occupant names only for the rooms on this page
+        tenants_by_room = {}
+        if rooms:
+            for t in frappe.get_all(
+                "Tenant",
+                filters={"room": ["in", [room.name for room in rooms]], "status": "Active"},
+                fields=["name", "tenant_name", "room"],
+                order_by="name asc",
+            ):
+                tenants_by_room.setdefault(t.room, []).append(f"{t.tenant_name} ({t.name})")
+
         report_data = []
-        total_capacity = 0
-        total_occupied = 0
-        
         for room in rooms:
-            # Get active tenants in this room
-            active_tenants = frappe.get_all("Tenant", {
-                "room": room.name,
-                "status": "Active"
-            }, fields=["name", "tenant_name"])
-            
-            actual_occupied = len(active_tenants)
-            available = room.capacity - actual_occupied if room.capacity else 0
-            
-            # Check for inconsistencies
-            inconsistency = room.occupied_beds != actual_occupied
-            
+            actual_occupied = room.actual_active_tenants
             report_data.append({
+                "room": room.name,
                 "room_number": room.room_number,
+                "branch": room.branch,
                 "capacity": room.capacity,
                 "occupied_beds_field": room.occupied_beds,
                 "actual_active_tenants": actual_occupied,
-                "available": available,
+                "available": room.capacity - actual_occupied if room.capacity else 0,
                 "status": room.status,
-                "inconsistency": inconsistency,
-                "tenants": [f"{t.tenant_name} ({t.name})" for t in active_tenants]
+                "inconsistency": (room.occupied_beds or 0) != actual_occupied,
+                "tenants": tenants_by_room.get(room.name, [])
             })
-            
-            total_capacity += room.capacity or 0
-            total_occupied += actual_occupied
-        
+
+        branches = companies = summary = None
+        if not cursor_values:
+            branches, companies, summary = _get_occupancy_rollups(filters)
+
         return {
             "success": True,
             "report_data": report_data,
-            "summary": {
-                "total_rooms": len(rooms),
-                "total_capacity": total_capacity,
-                "total_occupied": total_occupied,
-                "total_available": total_capacity - total_occupied,
-                "inconsistencies": len([r for r in report_data if r["inconsistency"]])
-            }
+            "summary": summary,
+            "branches": branches,
+            "companies": companies,
+            "has_more": bool(next_cursor),
+            "next_cursor": next_cursor
         }
         
     except Exception as e:
         frappe.log_error(f"Error generating occupancy report: {str(e)}", "Occupancy Report Failed")
-        return {"success": False, "message": f"Error: {str(e)}"}
\ No newline at end of file
+        return {"success": False, "message": f"Error: {str(e)}"}
+
+def _get_occupancy_rollups(filters):
+    """Per-branch totals from one grouped query; company and overall totals are folded from them"""
+    branch_rows = frappe.db.sql(
+        """
+        SELECT
+            r.branch,
+            b.company,
+            COUNT(*) AS total_rooms,
+            SUM(COALESCE(r.capacity, 0)) AS total_capacity,
+            SUM(COALESCE(t.active_tenants, 0)) AS total_occupied,
+            SUM(CASE WHEN COALESCE(r.occupied_beds, 0) != COALESCE(t.active_tenants, 0) THEN 1 ELSE 0 END) AS inconsistencies
+        FROM `tabRoom` r
+        LEFT JOIN `tabBranch` b ON b.name = r.branch
+        LEFT JOIN (
+            SELECT room, COUNT(*) AS active_tenants
+            FROM `tabTenant`
+            WHERE status = 'Active'
+            GROUP BY room
+        ) t ON t.room = r.name
+        WHERE (%(branch)s IS NULL OR r.branch = %(branch)s)
+        AND (%(status)s IS NULL OR r.status = %(status)s)
+        GROUP BY r.branch, b.company
+        ORDER BY r.branch
+        """,
+        filters,
+        as_dict=True,
+    )
+
+    totals_keys = ("total_rooms", "total_capacity", "total_occupied", "inconsistencies")
+    summary = dict.fromkeys(totals_keys, 0)
+    companies = {}
+    for row in branch_rows:
+        for key in totals_keys:
+            row[key] = int(row[key] or 0)
+        row["total_available"] = row["total_capacity"] - row["total_occupied"]
+
+        company = companies.setdefault(row.company, {"company": row.company, **dict.fromkeys(totals_keys, 0)})
+        for key in totals_keys:
+            company[key] += row[key]
+            summary[key] += row[key]
+
+    for company in companies.values():
+        company["total_available"] = company["total_capacity"] - company["total_occupied"]
+    summary["total_available"] = summary["total_capacity"] - summary["total_occupied"]
+
+    return branch_rows, list(companies.values()), summary
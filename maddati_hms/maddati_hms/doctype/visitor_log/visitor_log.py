@@ -2,7 +2,9 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
+from frappe.utils import get_datetime, now, now_datetime
 
 
 class VisitorLog(Document):
@@ -10,3 +12,80 @@ class VisitorLog(Document):
 		if self.check_out and self.visit_datetime:
 			if self.check_out < self.visit_datetime:
 				frappe.throw("Check Out cannot be before Check In.")
+
+
+@frappe.whitelist()
+def get_live_visitors(branch=None, room=None):
+	"""
+	Visitors currently inside (status Active), newest first, with a per branch/room count.
+	Served by the (branch, status, visit_datetime) index.
+	"""
+	frappe.has_permission("Visitor Log", "read", throw=True)
+
+	conditions = ["status = 'Active'"]
+	if branch:
+		conditions.append("branch = %(branch)s")
+	if room:
+		conditions.append("room = %(room)s")
+
+	visitors = frappe.db.sql(
+		f"""
+		SELECT name, visitor_name, branch, room, contact_number, purpose,
+			related_person_type, related_person, visit_datetime
+		FROM `tabVisitor Log`
+		WHERE {" AND ".join(conditions)}
+		ORDER BY visit_datetime DESC
+		""",
+		{"branch": branch, "room": room},
+		as_dict=True,
+	)
+
+	counts = {}
+	for visitor in visitors:
+		key = (visitor.branch, visitor.room)
+		counts[key] = counts.get(key, 0) + 1
+
+	return {
+		"total": len(visitors),
+		"by_room": [
+			{"branch": key[0], "room": key[1], "count": count}
+			for key, count in sorted(counts.items(), key=lambda item: (item[0][0] or "", item[0][1] or ""))
+		],
+		"visitors": visitors,
+	}
+
+
+@frappe.whitelist()
+def bulk_checkout(branch, check_out=None):
+	"""
+	Close every Active visit of a branch with one shared check_out time (default now).
+	Visits that started after check_out are left open. Returns the number of visits closed.
+	"""
+	frappe.has_permission("Visitor Log", "write", throw=True)
+	if not branch:
+		frappe.throw(_("Branch is required"))
+
+	check_out = get_datetime(check_out) if check_out else now_datetime()
+	values = {"branch": branch, "check_out": check_out, "modified": now(), "user": frappe.session.user}
+
+	# lock the rows first so the count matches what the update closes
+	closed = frappe.db.sql(
+		"""
+		SELECT COUNT(*) FROM `tabVisitor Log`
+		WHERE branch = %(branch)s AND status = 'Active' AND visit_datetime <= %(check_out)s
+		FOR UPDATE
+		""",
+		values,
+	)[0][0]
+	if closed:
+		frappe.db.sql(
+			"""
+			UPDATE `tabVisitor Log`
+			SET status = 'Left', check_out = %(check_out)s, modified = %(modified)s, modified_by = %(user)s
+			WHERE branch = %(branch)s AND status = 'Active' AND visit_datetime <= %(check_out)s
+			""",
+			values,
+		)
+
+	frappe.msgprint(_("{0} visitors checked out of {1}").format(closed, branch), indicator="green")
+	return {"closed": closed, "check_out": check_out}
@@ -0,0 +1,39 @@
+frappe.listview_settings['Visitor Log'] = {
+    add_fields: ["status", "check_out"],
+    get_indicator: function(doc) {
+        if (doc.status === "Active") {
+            return ["Inside", "green", "status,=,Active"];
+        } else if (doc.status === "Left") {
+            return ["Left", "gray", "status,=,Left"];
+        }
+    },
+    onload: function(listview) {
+        listview.page.add_inner_button(__("End of Day Checkout"), function() {
+            frappe.prompt([
+                {
+                    fieldname: "branch",
+                    fieldtype: "Link",
+                    options: "Branch",
+                    label: __("Branch"),
+                    reqd: 1
+                },
+                {
+                    fieldname: "check_out",
+                    fieldtype: "Datetime",
+                    label: __("Check Out"),
+                    default: frappe.datetime.now_datetime(),
+                    reqd: 1
+                }
+            ], function(values) {
+                frappe.call({
+                    method: "maddati_hms.maddati_hms.doctype.visitor_log.visitor_log.bulk_checkout",
+                    args: values,
+                    freeze: true,
+                    callback: function() {
+                        listview.refresh();
+                    }
+                });
+            }, __("Check Out All Active Visitors"), __("Check Out"));
+        });
+    }
+};
@@ -0,0 +1,178 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+import gzip
+import json
+import os
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import now_datetime
+
+from maddati_hms.visitor_archive import (
+	ARCHIVE_DOCTYPE,
+	ARCHIVE_FOLDER,
+	_get_archive_path,
+	archive_month,
+	archive_visitor_logs,
+	search_archived_visitors,
+)
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+BRANCH_A = "_Test Archive Branch A"
+BRANCH_B = "_Test Archive Branch B"
+# scrubs to the same file name prefix as BRANCH_A
+BRANCH_C = "_Test Archive-Branch A"
+
+
+class IntegrationTestVisitorLogArchive(IntegrationTestCase):
+	"""
+	Integration tests for VisitorLogArchive.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def setUp(self):
+		self.cleanup()
+		for branch, abbr in ((BRANCH_A, "_TAA"), (BRANCH_B, "_TAB"), (BRANCH_C, "_TAC")):
+			frappe.get_doc({"doctype": "Branch", "branch_name": branch, "abbr": abbr}).insert(ignore_permissions=True)
+		self.visits = 0
+		frappe.db.commit()
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		branches = [BRANCH_A, BRANCH_B, BRANCH_C]
+		for archive in frappe.get_all(ARCHIVE_DOCTYPE, filters={"branch": ["in", branches]}, fields=["name", "archive_file"]):
+			if archive.archive_file and os.path.exists(_get_archive_path(archive)):
+				os.remove(_get_archive_path(archive))
+			frappe.db.delete("File", {"attached_to_doctype": ARCHIVE_DOCTYPE, "attached_to_name": archive.name})
+			frappe.db.delete(ARCHIVE_DOCTYPE, archive.name)
+		# files left by an archive whose transaction was rolled back
+		folder = frappe.get_site_path("private", "files", ARCHIVE_FOLDER)
+		if os.path.isdir(folder):
+			for file_name in os.listdir(folder):
+				if file_name.startswith(tuple(frappe.scrub(branch) for branch in branches)):
+					os.remove(os.path.join(folder, file_name))
+		frappe.db.delete("Visitor Log", {"branch": ["in", branches]})
+		frappe.db.delete("Branch", {"name": ["in", branches]})
+		frappe.db.commit()
+
+	def add_visit(self, branch, visit_datetime, status="Left"):
+		"""Visitor Log row without the controller; returns its name"""
+		self.visits += 1
+		name = f"_TVL-{frappe.scrub(branch)}-{self.visits:04d}"
+		frappe.get_doc({
+			"doctype": "Visitor Log",
+			"name": name,
+			"visitor_name": f"Visitor {self.visits}",
+			"branch": branch,
+			"visit_datetime": visit_datetime,
+			"check_out": visit_datetime if status == "Left" else None,
+			"status": status,
+			"purpose": "Parent Visit",
+		}).db_insert()
+		frappe.db.commit()
+		return name
+
+	def read_archive(self, branch, month):
+		archive = frappe.get_doc(ARCHIVE_DOCTYPE, {"branch": branch, "month": month})
+		with gzip.open(_get_archive_path(archive), "rt", encoding="utf-8") as f:
+			return archive, [json.loads(line) for line in f]
+
+	def test_only_closed_visits_before_cutoff_are_archived(self):
+		old = self.add_visit(BRANCH_A, "2020-01-10 10:00:00")
+		still_inside = self.add_visit(BRANCH_A, "2020-01-11 10:00:00", status="Active")
+		recent = self.add_visit(BRANCH_A, now_datetime())
+
+		with patch.dict(frappe.conf, {"hms_visitor_log_retention_days": 30}):
+			archive_visitor_logs()
+
+		self.assertFalse(frappe.db.exists("Visitor Log", old))
+		self.assertTrue(frappe.db.exists("Visitor Log", still_inside))
+		self.assertTrue(frappe.db.exists("Visitor Log", recent))
+		_archive, rows = self.read_archive(BRANCH_A, "2020-01")
+		self.assertEqual([row["name"] for row in rows], [old])
+
+	def test_each_branch_and_month_gets_its_own_file(self):
+		january_a = [self.add_visit(BRANCH_A, "2020-01-10 10:00:00"), self.add_visit(BRANCH_A, "2020-01-20 18:30:00")]
+		february_a = [self.add_visit(BRANCH_A, "2020-02-05 09:15:00")]
+		january_b = [self.add_visit(BRANCH_B, "2020-01-15 12:00:00")]
+		expected = {name: frappe.db.get_value("Visitor Log", name, "visitor_name") for name in january_a + february_a + january_b}
+
+		for branch, month in ((BRANCH_A, "2020-01"), (BRANCH_A, "2020-02"), (BRANCH_B, "2020-01")):
+			archive_month(branch, month)
+
+		files = set()
+		for branch, month, names in (
+			(BRANCH_A, "2020-01", january_a),
+			(BRANCH_A, "2020-02", february_a),
+			(BRANCH_B, "2020-01", january_b),
+		):
+			archive, rows = self.read_archive(branch, month)
+			files.add(archive.archive_file)
+			self.assertEqual([row["name"] for row in rows], names)
+			self.assertEqual({row["name"]: row["visitor_name"] for row in rows}, {name: expected[name] for name in names})
+			self.assertEqual(archive.record_count, len(names))
+		self.assertEqual(len(files), 3)
+		self.assertFalse(frappe.db.exists("Visitor Log", {"name": ["in", list(expected)]}))
+
+	def test_branches_with_the_same_scrubbed_name_keep_separate_files(self):
+		visit_a = self.add_visit(BRANCH_A, "2020-01-10 10:00:00")
+		visit_c = self.add_visit(BRANCH_C, "2020-01-12 10:00:00")
+
+		archive_month(BRANCH_A, "2020-01")
+		archive_month(BRANCH_C, "2020-01")
+
+		archive_a, rows_a = self.read_archive(BRANCH_A, "2020-01")
+		archive_c, rows_c = self.read_archive(BRANCH_C, "2020-01")
+		self.assertNotEqual(archive_a.archive_file, archive_c.archive_file)
+		self.assertEqual([row["name"] for row in rows_a], [visit_a])
+		self.assertEqual([row["name"] for row in rows_c], [visit_c])
+		self.assertEqual([row["name"] for row in search_archived_visitors(branch=BRANCH_C)], [visit_c])
+
+	def test_search_skips_rows_of_other_branches_in_a_shared_file(self):
+		visit_a = self.add_visit(BRANCH_A, "2020-01-10 10:00:00")
+		visit_c = self.add_visit(BRANCH_C, "2020-01-12 10:00:00")
+		archive_month(BRANCH_A, "2020-01")
+		archive_month(BRANCH_C, "2020-01")
+		# an older archive that was written into the other branch's file
+		archive_c = frappe.get_doc(ARCHIVE_DOCTYPE, {"branch": BRANCH_C, "month": "2020-01"})
+		with open(_get_archive_path(archive_c), "rb") as f:
+			shared = f.read()
+		archive_a = frappe.get_doc(ARCHIVE_DOCTYPE, {"branch": BRANCH_A, "month": "2020-01"})
+		with open(_get_archive_path(archive_a), "ab") as f:
+			f.write(shared)
+
+		self.assertEqual([row["name"] for row in search_archived_visitors(branch=BRANCH_A)], [visit_a])
+		self.assertEqual([row["name"] for row in search_archived_visitors(branch=BRANCH_C)], [visit_c])
+
+	def test_rerun_appends_without_duplicates(self):
+		first = self.add_visit(BRANCH_A, "2020-01-10 10:00:00")
+		archive_month(BRANCH_A, "2020-01")
+		# nothing left to archive: the file is not touched
+		archive_month(BRANCH_A, "2020-01")
+		second = self.add_visit(BRANCH_A, "2020-01-25 10:00:00")
+		archive_month(BRANCH_A, "2020-01")
+
+		archive, rows = self.read_archive(BRANCH_A, "2020-01")
+		self.assertEqual([row["name"] for row in rows], [first, second])
+		self.assertEqual(archive.record_count, 2)
+		self.assertEqual(frappe.db.count(ARCHIVE_DOCTYPE, {"branch": BRANCH_A, "month": "2020-01"}), 1)
+
+	def test_failed_write_deletes_nothing(self):
+		names = [self.add_visit(BRANCH_A, "2020-01-10 10:00:00"), self.add_visit(BRANCH_A, "2020-01-11 10:00:00")]
+
+		with patch("maddati_hms.visitor_archive.gzip.open", side_effect=OSError("disk full")):
+			with self.assertRaises(OSError):
+				archive_month(BRANCH_A, "2020-01")
+		frappe.db.rollback()
+
+		self.assertEqual(frappe.db.count("Visitor Log", {"name": ["in", names]}), 2)
+		self.assertFalse(frappe.db.get_value(ARCHIVE_DOCTYPE, {"branch": BRANCH_A, "month": "2020-01"}, "record_count"))
@@ -0,0 +1,43 @@
+// Copyright (c) 2026, Maddati Tech and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Tenant Arrears Aging"] = {
+	filters: [
+		{
+			fieldname: "company",
+			label: __("Company"),
+			fieldtype: "Link",
+			options: "Company",
+		},
+		{
+			fieldname: "branch",
+			label: __("Branch"),
+			fieldtype: "Link",
+			options: "Branch",
+			get_query: function () {
+				const company = frappe.query_report.get_filter_value("company");
+				return company ? { filters: { company: company } } : {};
+			},
+		},
+		{
+			fieldname: "group_by",
+			label: __("Group By"),
+			fieldtype: "Select",
+			options: "Tenant\nRoom\nBranch",
+			default: "Tenant",
+			reqd: 1,
+		},
+		{
+			fieldname: "invoice_type",
+			label: __("Invoice Type"),
+			fieldtype: "Select",
+			options: "\nMonthly Fee\nAdmission Fee\nSecurity Deposit",
+		},
+		{
+			fieldname: "as_of",
+			label: __("As Of"),
+			fieldtype: "Date",
+			default: frappe.datetime.get_today(),
+		},
+	],
+};
@@ -0,0 +1,38 @@
+# Copyright (c) 2026, Maddati Tech and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+
+from maddati_hms.arrears import GROUP_BY_FIELDS, get_arrears
+
+
+def execute(filters=None):
+	filters = frappe._dict(filters or {})
+	group_by = filters.group_by or "Tenant"
+	data = get_arrears(
+		branch=filters.branch,
+		company=filters.company,
+		group_by=group_by,
+		invoice_type=filters.invoice_type,
+		as_of=filters.as_of,
+	)
+	return get_columns(group_by), data
+
+
+def get_columns(group_by):
+	columns = {
+		"branch": {"label": _("Branch"), "fieldname": "branch", "fieldtype": "Link", "options": "Branch", "width": 140},
+		"room": {"label": _("Room"), "fieldname": "room", "fieldtype": "Link", "options": "Room", "width": 100},
+		"tenant": {"label": _("Tenant"), "fieldname": "tenant", "fieldtype": "Link", "options": "Tenant", "width": 140},
+		"tenant_name": {"label": _("Tenant Name"), "fieldname": "tenant_name", "fieldtype": "Data", "width": 160},
+	}
+	return [columns[field] for field in GROUP_BY_FIELDS[group_by]] + [
+		{"label": _("Invoice Type"), "fieldname": "invoice_type", "fieldtype": "Data", "width": 130},
+		{"label": _("0-30"), "fieldname": "bucket_0_30", "fieldtype": "Currency", "width": 110},
+		{"label": _("31-60"), "fieldname": "bucket_31_60", "fieldtype": "Currency", "width": 110},
+		{"label": _("61-90"), "fieldname": "bucket_61_90", "fieldtype": "Currency", "width": 110},
+		{"label": _("90+"), "fieldname": "bucket_90_plus", "fieldtype": "Currency", "width": 110},
+		{"label": _("Total Outstanding"), "fieldname": "total", "fieldtype": "Currency", "width": 130},
+		{"label": _("Invoices"), "fieldname": "invoices", "fieldtype": "Int", "width": 80},
+	]
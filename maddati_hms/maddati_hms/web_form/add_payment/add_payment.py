@@ -1,6 +1,9 @@
 import frappe
 from frappe import _
 
+from maddati_hms.instrumentation import instrument
+from maddati_hms.portal_identity import get_portal_identity
+
 def get_context(context):
     """
     Set up context for add payment web form
@@ -15,6 +18,7 @@ def get_context(context):
     })
 
 @frappe.whitelist()
+@instrument
 def get_customer_data():
     """
     Get customer data for JavaScript auto-population
@@ -22,68 +26,29 @@ def get_customer_data():
     if not frappe.session.user or frappe.session.user == "Guest":
         return {"error": "Please login"}
     
-    # Get customer linked to current user
-    customer = frappe.db.get_value("Customer", {"email_id": frappe.session.user}, "name")
-    if not customer:
+    # Customer, tenant, room, branch and company of the current user in one (cached) lookup
+    identity = get_portal_identity()
+    if not identity.customer:
         return {"error": "No customer record found for your account"}
     
-    print(f"Found customer: {customer}")  # Debug log
-    
-    # Get tenant information
-    tenant = frappe.db.get_value("Tenant", {"customer": customer}, "name")
-    if not tenant:
+    if not identity.tenant:
         return {"error": "No tenant record found for your account"}
     
-    print(f"Found tenant: {tenant}")  # Debug log
-    
-    # Get tenant details
-    tenant_doc = frappe.get_doc("Tenant", tenant)
-    room = tenant_doc.room
-    branch = frappe.db.get_value("Room", room, "branch") if room else None
-    
-    print(f"Room: {room}, Branch: {branch}")  # Debug log
-    
-    # Get company from branch doctype
-    company = None
-    if branch:
-        company = frappe.db.get_value("Branch", branch, "company")
-        print(f"Company from branch {branch}: {company}")  # Debug log
-    
-    # Get linked customer from tenant record
-    linked_customer = None
-    if hasattr(tenant_doc, 'customer') and tenant_doc.customer:
-        linked_customer = tenant_doc.customer
-    else:
-        linked_customer = customer  # Fallback to current customer
-    
-    print(f"Linked customer: {linked_customer}")  # Debug log
-    
-    # Additional fallback for company if not found from branch
-    if not company and branch:
-        # Try to get company from tenant's company field if it exists
-        if hasattr(tenant_doc, 'company') and tenant_doc.company:
-            company = tenant_doc.company
-            print(f"Company from tenant: {company}")  # Debug log
-    
     # Final fallback for company - get from system settings or default
-    if not company:
-        company = frappe.defaults.get_global_default('company')
-        print(f"Company from defaults: {company}")  # Debug log
+    company = identity.company or frappe.defaults.get_global_default('company')
     
-    result = {
-        "customer": customer,
-        "customer_name": frappe.db.get_value("Customer", customer, "customer_name"),
-        "tenant": tenant,
-        "room": room,
-        "branch": branch,
+    return {
+        "customer": identity.customer,
+        "customer_name": identity.customer_name,
+        "tenant": identity.tenant,
+        "room": identity.room,
+        "branch": identity.branch,
         "company": company,
-        "linked_customer": linked_customer
+        "linked_customer": identity.customer
     }
-    
-    print(f"Final result: {result}")  # Debug log
-    return result
 
 @frappe.whitelist()
+@instrument
 def get_invoice_details(invoice_name):
     """
     Get invoice details for auto-populating amount field
@@ -95,7 +60,7 @@ def get_invoice_details(invoice_name):
         return {"error": "Invoice name is required"}
     
     # Get customer linked to current user
-    customer = frappe.db.get_value("Customer", {"email_id": frappe.session.user}, "name")
+    customer = get_portal_identity().customer
     if not customer:
         return {"error": "No customer record found for your account"}
     
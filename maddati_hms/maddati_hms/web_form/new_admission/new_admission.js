@@ -22,6 +22,49 @@ frappe.ready(function() {
         }
     }
     
+    // Rooms of the selected branch, from the cached availability snapshot (HTTP cache + ETag)
+    let availableRooms = {};
+    function loadAvailability(branchValue) {
+        availableRooms = {};
+        if (!branchValue) {
+            return;
+        }
+        fetch(`/api/method/maddati_hms.availability.get_availability?branch=${encodeURIComponent(branchValue)}`, {
+            headers: { Accept: 'application/json' },
+            credentials: 'same-origin'
+        })
+            .then((response) => (response.ok ? response.json() : null))
+            .then((data) => {
+                if (data && data.message && frappe.web_form.get_value('branch') === branchValue) {
+                    data.message.rooms.forEach((room) => {
+                        availableRooms[room.name] = room;
+                    });
+                }
+            })
+            .catch(() => {
+                // no-op: room selection falls back to get_room_fees
+            });
+    }
+
+    function setRoomFees(m) {
+        const status = (m.status || '').toLowerCase();
+        if (status === 'full' || status === 'maintenance') {
+            frappe.msgprint({
+                message: __('Selected room is not available (Status: {0}). Please choose another room.', [m.status || 'N/A']),
+                indicator: 'red'
+            });
+            // Clear selection and fees
+            frappe.web_form.set_value('room', '');
+            frappe.web_form.set_value('monthly_fee', '');
+            frappe.web_form.set_value('admission_fee', '');
+            frappe.web_form.set_value('security_deposit', '');
+            return;
+        }
+        frappe.web_form.set_value('monthly_fee', m.monthly_rent || '');
+        frappe.web_form.set_value('admission_fee', m.admission_fee || '');
+        frappe.web_form.set_value('security_deposit', m.security_deposit || '');
+    }
+
     // Ensure query is applied on load
     if (frappe.web_form?.events?.on) {
         frappe.web_form.events.on('after_load', () => {
@@ -41,34 +84,19 @@ frappe.ready(function() {
 
         // Limit built-in Room link field to selected branch via custom server query
         applyRoomQuery(value);
+        loadAvailability(value);
     });
 
     // Handle room selection for monthly fee,
     frappe.web_form.on('room', (field, value) => {
-        if (value) {
+        if (value && availableRooms[value]) {
+            setRoomFees(availableRooms[value]);
+        } else if (value) {
             frappe.call({
                 method: 'maddati_hms.api.get_room_fees',
-                args: { room: value },
+                args: { room: value, branch: frappe.web_form.get_value('branch') || null },
                 callback: function(r) {
-                    const m = r && r.message ? r.message : {};
-                    const status = (m.status || '').toLowerCase();
-                    if (status === 'full' || status === 'maintenance') {
-                        frappe.msgprint({
-                            message: __('Selected room is not available (Status: {0}). Please choose another room.', [m.status || 'N/A']),
-                            indicator: 'red'
-                        });
-                        // Clear selection and fees
-                        frappe.web_form.set_value('room', '');
-                        frappe.web_form.set_value('monthly_fee', '');
-                        frappe.web_form.set_value('admission_fee', '');
-                        frappe.web_form.set_value('security_deposit', '');
-                        return;
-                    }
-                    if (m) {
-                        frappe.web_form.set_value('monthly_fee', m.monthly_rent || '');
-                        frappe.web_form.set_value('admission_fee', m.admission_fee || '');
-                        frappe.web_form.set_value('security_deposit', m.security_deposit || '');
-                    }
+                    setRoomFees(r && r.message ? r.message : {});
                 }
             });
         } else {
@@ -0,0 +1,162 @@
+import frappe
+from frappe import _
+
+from maddati_hms.room_search import clear_room_search_index
+
+
+def get_expected_room_status(status, capacity, occupied_beds):
+    """Mirror of the status rule in Room.validate: Maintenance is preserved, otherwise Full/Available"""
+    if status == "Maintenance":
+        return status
+    if capacity is None or occupied_beds is None:
+        return status
+    return "Full" if int(occupied_beds) >= int(capacity) else "Available"
+
+
+def get_room_occupancy_diff(branch=None):
+    """
+    Compare stored occupied_beds/status with the actual number of Active tenants
+    for every room (optionally limited to a branch) using a single grouped query.
+    Returns only the rooms that need to change.
+    """
+    rooms = frappe.db.sql(
+        """
+        SELECT
+            r.name,
+            r.room_number,
+            r.branch,
+            r.status,
+            COALESCE(r.capacity, 0) AS capacity,
+            COALESCE(r.occupied_beds, 0) AS occupied_beds,
+            COALESCE(t.active_tenants, 0) AS active_tenants
+        FROM `tabRoom` r
+        LEFT JOIN (
+            SELECT room, COUNT(*) AS active_tenants
+            FROM `tabTenant`
+            WHERE status = 'Active'
+            GROUP BY room
+        ) t ON t.room = r.name
+        WHERE (%(branch)s IS NULL OR r.branch = %(branch)s)
+        ORDER BY r.name
+        """,
+        {"branch": branch or None},
+        as_dict=True,
+    )
+
+    changes = []
+    for room in rooms:
+        expected_status = get_expected_room_status(room.status, room.capacity, room.active_tenants)
+        if room.occupied_beds == room.active_tenants and room.status == expected_status:
+            continue
+        changes.append(frappe._dict({
+            "room": room.name,
+            "room_number": room.room_number,
+            "branch": room.branch,
+            "capacity": room.capacity,
+            "old_occupied_beds": room.occupied_beds,
+            "new_occupied_beds": room.active_tenants,
+            "old_status": room.status,
+            "new_status": expected_status,
+        }))
+
+    return rooms, changes
+
+
+def apply_room_occupancy_diff(changes):
+    """Write the changed rooms back as one bulk (CASE-based) update"""
+    if not changes:
+        return
+    frappe.db.bulk_update(
+        "Room",
+        {
+            change.room: {"occupied_beds": change.new_occupied_beds, "status": change.new_status}
+            for change in changes
+        },
+        chunk_size=500,
+    )
+    clear_room_search_index({change.branch for change in changes})
+
+
+def reconcile_room_occupancy(branch=None, dry_run=False):
+    """
+    Reconcile Room.occupied_beds and Room.status against Active tenants.
+    With dry_run the diff is returned without touching the database.
+    """
+    rooms, changes = get_room_occupancy_diff(branch)
+    if not dry_run:
+        apply_room_occupancy_diff(changes)
+        for change in changes:
+            frappe.logger().info(
+                f"Fixed room {change.room_number}: occupied_beds changed from "
+                f"{change.old_occupied_beds} to {change.new_occupied_beds}"
+            )
+
+    return frappe._dict({
+        "total_rooms": len(rooms),
+        "changes": changes,
+        "dry_run": bool(dry_run),
+    })
+
+
+def apply_room_occupancy_changes(changes):
+    """
+    Atomically apply occupied_beds deltas, e.g. {"A-101": -1, "B-204": 1} for a transfer.
+
+    Each room row is locked with SELECT ... FOR UPDATE before the capacity check, so two
+    concurrent admissions for the last bed are serialised and the second one fails.
+    Rooms are locked in name order so concurrent transfers between the same rooms
+    cannot deadlock. occupied_beds and status (same rule as Room.validate) are written
+    in one UPDATE without loading or saving the Room document.
+
+    Returns {room: (old_occupied_beds, new_occupied_beds)}.
+    """
+    results = {}
+    branches = set()
+    for room in sorted(r for r, change in changes.items() if r and change):
+        change = changes[room]
+        current = frappe.db.get_value(
+            "Room", room, ["branch", "capacity", "occupied_beds"], as_dict=True, for_update=True
+        )
+        if not current:
+            frappe.throw(_("Room {0} not found").format(room))
+
+        old_occupied = current.occupied_beds or 0
+        new_occupied = max(old_occupied + change, 0)
+        if change > 0 and current.capacity and new_occupied > current.capacity:
+            frappe.throw(_("Cannot assign tenant to room {0}. Room capacity is {1} but would have {2} occupied beds.").format(
+                room, current.capacity, new_occupied
+            ))
+
+        # status is assigned first: MariaDB evaluates SET clauses left to right
+        frappe.db.sql(
+            """
+            UPDATE `tabRoom`
+            SET
+                status = CASE
+                    WHEN status = 'Maintenance' OR capacity IS NULL THEN status
+                    WHEN GREATEST(COALESCE(occupied_beds, 0) + %(change)s, 0) >= capacity THEN 'Full'
+                    ELSE 'Available'
+                END,
+                occupied_beds = GREATEST(COALESCE(occupied_beds, 0) + %(change)s, 0),
+                modified = %(modified)s,
+                modified_by = %(modified_by)s
+            WHERE name = %(room)s
+            """,
+            {
+                "room": room,
+                "change": change,
+                "modified": frappe.utils.now(),
+                "modified_by": frappe.session.user,
+            },
+        )
+        results[room] = (old_occupied, new_occupied)
+        branches.add(current.branch)
+
+    if results:
+        clear_room_search_index(branches)
+    return results
+
+
+def update_room_occupancy(room, change):
+    """Atomically change occupied_beds of a single room; returns (old, new)"""
+    return apply_room_occupancy_changes({room: change}).get(room)
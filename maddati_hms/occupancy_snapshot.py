@@ -0,0 +1,222 @@
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, date_diff, get_last_day, getdate, now, today
+
+from maddati_hms.accommodation_history import get_occupancy_timeline, get_stays
+from maddati_hms.occupancy import get_expected_room_status
+
+SNAPSHOT_DOCTYPE = "Room Occupancy Snapshot"
+SNAPSHOT_FIELDS = (
+    "name", "creation", "modified", "modified_by", "owner",
+    "snapshot_date", "branch", "room", "capacity", "occupied_beds", "status",
+)
+LAST_RUN_KEY = "hms_occupancy_snapshot_last_run"
+BACKFILL_MAX_DAYS = 3 * 366
+
+
+def take_occupancy_snapshot():
+    """
+    Daily scheduler job: one snapshot row per room for today.
+    Only rooms whose Room, Tenant or accommodation history rows changed since the last run are
+    recomputed (from Active tenants, not the drifting Room.occupied_beds); the rest are carried
+    forward from the latest earlier snapshot. Rooms without a capacity have no beds to report
+    and are left out rather than counted as Full.
+    """
+    snapshot_date = getdate(today())
+    last_run = frappe.db.get_global(LAST_RUN_KEY)
+    started = now()
+
+    previous_date = frappe.db.sql(
+        f"SELECT MAX(snapshot_date) FROM `tab{SNAPSHOT_DOCTYPE}` WHERE snapshot_date < %s", snapshot_date
+    )[0][0]
+
+    if last_run and previous_date:
+        rooms = _get_rooms_changed_since(last_run)
+        if rooms:
+            _write_snapshot_rows(snapshot_date, _get_live_room_rows(rooms), replace=True)
+        _carry_forward_snapshot(previous_date, snapshot_date)
+    else:
+        _write_snapshot_rows(snapshot_date, _get_live_room_rows(), replace=True)
+
+    frappe.db.set_global(LAST_RUN_KEY, started)
+    frappe.db.commit()
+
+
+def _get_rooms_changed_since(since):
+    return frappe.db.sql_list(
+        """
+        SELECT name FROM `tabRoom` WHERE modified > %(since)s
+        UNION
+        SELECT room FROM `tabTenant` WHERE modified > %(since)s AND IFNULL(room, '') != ''
+        UNION
+        SELECT room FROM `tabTenant Accommodation History`
+        WHERE parenttype = 'Tenant' AND modified > %(since)s AND IFNULL(room, '') != ''
+        """,
+        {"since": since},
+    )
+
+
+def _get_live_room_rows(rooms=None):
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            r.name AS room,
+            r.branch,
+            COALESCE(r.capacity, 0) AS capacity,
+            COALESCE(active.count, 0) AS occupied_beds,
+            r.status
+        FROM `tabRoom` r
+        LEFT JOIN (
+            SELECT room, COUNT(*) AS count
+            FROM `tabTenant`
+            WHERE status = 'Active' AND IFNULL(room, '') != ''
+            GROUP BY room
+        ) active ON active.room = r.name
+        WHERE COALESCE(r.capacity, 0) > 0
+        {"AND r.name IN %(rooms)s" if rooms else ""}
+        """,
+        {"rooms": tuple(rooms or ())},
+        as_dict=True,
+    )
+    for row in rows:
+        row.status = get_expected_room_status(row.status, row.capacity, row.occupied_beds)
+    return rows
+
+
+def _carry_forward_snapshot(from_date, to_date):
+    """Copy rows of from_date to to_date for rooms that have no row on to_date yet"""
+    timestamp = now()
+    frappe.db.sql(
+        f"""
+        INSERT IGNORE INTO `tab{SNAPSHOT_DOCTYPE}`
+            (name, creation, modified, modified_by, owner, docstatus,
+             snapshot_date, branch, room, capacity, occupied_beds, status)
+        SELECT
+            CONCAT(s.room, '-', %(to_date)s), %(timestamp)s, %(timestamp)s, 'Administrator', 'Administrator', 0,
+            %(to_date)s, r.branch, s.room, s.capacity, s.occupied_beds, s.status
+        FROM `tab{SNAPSHOT_DOCTYPE}` s
+        INNER JOIN `tabRoom` r ON r.name = s.room
+        WHERE s.snapshot_date = %(from_date)s AND COALESCE(r.capacity, 0) > 0
+        """,
+        {"from_date": from_date, "to_date": str(to_date), "timestamp": timestamp},
+    )
+
+
+def _write_snapshot_rows(snapshot_date, rows, replace=False):
+    if not rows:
+        return
+    snapshot_date = getdate(snapshot_date)
+    names = [f"{row.room}-{snapshot_date}" for row in rows]
+    if replace:
+        frappe.db.delete(SNAPSHOT_DOCTYPE, {"name": ["in", names]})
+
+    timestamp = now()
+    frappe.db.bulk_insert(
+        SNAPSHOT_DOCTYPE,
+        SNAPSHOT_FIELDS,
+        [
+            (name, timestamp, timestamp, "Administrator", "Administrator",
+             snapshot_date, row.branch, row.room, row.capacity, row.occupied_beds, row.status)
+            for name, row in zip(names, rows, strict=True)
+        ],
+        ignore_duplicates=True,
+    )
+
+
+@frappe.whitelist()
+def backfill_occupancy_snapshots(from_date, to_date, branch=None):
+    """
+    Queue a rebuild of missing snapshot days from Tenant Accommodation History.
+    Days that already have a snapshot row for a room are kept. Historic capacity is not
+    recorded anywhere, so each room's current capacity is used.
+    """
+    frappe.only_for("System Manager")
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    if to_date < from_date:
+        frappe.throw(_("To Date cannot be before From Date"))
+    if to_date >= getdate(today()):
+        frappe.throw(_("Backfill can only cover days before today"))
+    if date_diff(to_date, from_date) >= BACKFILL_MAX_DAYS:
+        frappe.throw(_("Backfill at most {0} days at a time").format(BACKFILL_MAX_DAYS))
+
+    frappe.enqueue(
+        "maddati_hms.occupancy_snapshot.run_backfill",
+        queue="long",
+        timeout=4 * 60 * 60,
+        enqueue_after_commit=True,
+        from_date=from_date,
+        to_date=to_date,
+        branch=branch,
+    )
+    return {"queued": True}
+
+
+def run_backfill(from_date, to_date, branch=None):
+    """Background job: sweep each room's stays and write one row per room per day, a month at a time"""
+    rooms = frappe.get_all(
+        "Room",
+        filters={"branch": branch} if branch else None,
+        fields=["name", "branch", "capacity"],
+    )
+    period_start = getdate(from_date)
+    to_date = getdate(to_date)
+    while period_start <= to_date:
+        period_end = min(get_last_day(period_start), to_date)
+        _backfill_period(rooms, period_start, period_end, branch)
+        frappe.db.commit()
+        period_start = add_days(period_end, 1)
+
+
+def _backfill_period(rooms, from_date, to_date, branch=None):
+    stays_by_room = defaultdict(list)
+    for stay in get_stays(from_date, to_date, branch=branch):
+        stays_by_room[stay.room].append(stay)
+
+    rows_by_date = defaultdict(list)
+    for room in rooms:
+        capacity = room.capacity or 0
+        if capacity <= 0:
+            continue
+        for segment in get_occupancy_timeline(stays_by_room.get(room.name, []), from_date, to_date):
+            day = segment.from_date
+            while day <= segment.to_date:
+                rows_by_date[day].append(frappe._dict(
+                    room=room.name,
+                    branch=room.branch,
+                    capacity=capacity,
+                    occupied_beds=segment.occupied,
+                    status=get_expected_room_status(None, capacity, segment.occupied),
+                ))
+                day = add_days(day, 1)
+
+    for snapshot_date, rows in rows_by_date.items():
+        _write_snapshot_rows(snapshot_date, rows)
+
+
+@frappe.whitelist()
+def get_occupancy_trend(from_date, to_date, branch=None, group_by="Day"):
+    """Occupied beds, capacity and occupancy rate per day or month, read from the snapshot table"""
+    frappe.has_permission(SNAPSHOT_DOCTYPE, "read", throw=True)
+    period = "DATE_FORMAT(snapshot_date, '%%Y-%%m')" if group_by == "Month" else "snapshot_date"
+
+    rows = frappe.db.sql(
+        f"""
+        SELECT
+            {period} AS period,
+            COUNT(DISTINCT snapshot_date) AS days,
+            SUM(occupied_beds) AS bed_nights,
+            SUM(capacity) AS capacity_nights
+        FROM `tab{SNAPSHOT_DOCTYPE}`
+        WHERE snapshot_date BETWEEN %(from_date)s AND %(to_date)s
+        {"AND branch = %(branch)s" if branch else ""}
+        GROUP BY period
+        ORDER BY period
+        """,
+        {"from_date": getdate(from_date), "to_date": getdate(to_date), "branch": branch},
+        as_dict=True,
+    )
+    for row in rows:
+        row.occupancy_rate = round(row.bed_nights * 100.0 / row.capacity_nights, 2) if row.capacity_nights else 0
+    return rows
@@ -0,0 +1,65 @@
+import base64
+import json
+
+import frappe
+from frappe import _
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last row of a page into an opaque token"""
+    payload = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    """Decode a token produced by encode_cursor, expecting `size` sort-key values"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        frappe.throw(_("Invalid pagination cursor"))
+    return values
+
+
+def get_keyset_condition(columns, cursor_values, prefix="cursor"):
+    """
+    Build a `WHERE` fragment that selects rows strictly after cursor_values when
+    ordered ascending by columns, e.g. for (room_number, name):
+        room_number > %(cursor_0)s OR (room_number = %(cursor_0)s AND name > %(cursor_1)s)
+    Returns (sql, params); sql is "1=1" when there is no cursor.
+    """
+    if not cursor_values:
+        return "1=1", {}
+
+    params = {f"{prefix}_{i}": value for i, value in enumerate(cursor_values)}
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [f"{columns[j]} = %({prefix}_{j})s" for j in range(i)]
+        clauses.append("(" + " AND ".join([*equal, f"{column} > %({prefix}_{i})s"]) + ")")
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def get_page_len(page_len, default=20, maximum=500):
+    page_len = frappe.utils.cint(page_len) or default
+    return max(1, min(page_len, maximum))
+
+
+def split_page(rows, page_len, key):
+    """
+    For queries that fetched page_len + 1 rows: returns (page, next_cursor), where
+    next_cursor encodes key(last row of the page) and is None on the last page.
+    """
+    if len(rows) <= page_len:
+        return rows, None
+    page = rows[:page_len]
+    return page, encode_cursor(key(page[-1]))
+
+
+def set_response_cursor(next_cursor):
+    """Expose the continuation token as `next_cursor` next to `message` without changing the return value"""
+    if getattr(frappe.local, "response", None) is not None:
+        frappe.response["next_cursor"] = next_cursor
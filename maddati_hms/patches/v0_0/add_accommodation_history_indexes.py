@@ -0,0 +1,7 @@
+import frappe
+
+
+def execute():
+    # interval lookups by room or branch, see maddati_hms.accommodation_history
+    frappe.db.add_index("Tenant Accommodation History", ["room", "from_date", "to_date"])
+    frappe.db.add_index("Tenant Accommodation History", ["branch", "from_date", "to_date"])
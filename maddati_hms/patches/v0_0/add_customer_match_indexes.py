@@ -0,0 +1,8 @@
+import frappe
+
+
+def execute():
+    # custom_tenant and customer_email_address are indexed through their Custom Field fixtures;
+    # tenant matching also probes these standard Customer columns
+    frappe.db.add_index("Customer", ["email_id"])
+    frappe.db.add_index("Customer", ["customer_name"])
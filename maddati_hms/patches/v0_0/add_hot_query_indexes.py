@@ -0,0 +1,17 @@
+import frappe
+
+# (doctype, columns, index name); Customer(email_id) and Customer(custom_tenant) are covered
+# by add_customer_match_indexes and the Custom Field fixtures
+HOT_QUERY_INDEXES = (
+    ("Tenant", ["room", "status"], "hms_room_status"),
+    ("Tenant", ["customer"], "hms_customer"),
+    ("Sales Invoice", ["customer", "docstatus", "outstanding_amount", "due_date"], "hms_customer_open_due"),
+    ("Room", ["branch", "room_number"], "hms_branch_room_number"),
+    ("Visitor Log", ["branch", "status", "visit_datetime"], "hms_branch_status_visit"),
+)
+
+
+def execute():
+    # add_index skips indexes that already exist, so the patch can run again safely
+    for doctype, columns, index_name in HOT_QUERY_INDEXES:
+        frappe.db.add_index(doctype, columns, index_name)
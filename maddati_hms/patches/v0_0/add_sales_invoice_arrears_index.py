@@ -0,0 +1,7 @@
+import frappe
+
+
+def execute():
+    # grouped aging query per branch, see maddati_hms.arrears
+    if frappe.db.has_column("Sales Invoice", "custom_branch"):
+        frappe.db.add_index("Sales Invoice", ["custom_branch", "docstatus", "outstanding_amount"])
@@ -0,0 +1,313 @@
+import csv
+import re
+from collections import defaultdict
+from itertools import islice
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate
+
+from maddati_hms.company_defaults import get_branch_company
+from maddati_hms.maddati_hms.doctype.payment.payment import allocate_fifo
+
+PAYMENT_IMPORT_CHUNK_SIZE = 200
+PAYMENT_IMPORT_KEY = "maddati_hms:payment_import:{0}"
+PAYMENT_IMPORT_EXPIRY = 7 * 24 * 60 * 60
+MAX_RECORDED_RESULTS = 5000
+
+# normalised header -> Payment field; the first matching column wins
+COLUMN_ALIASES = {
+    "payment_date": ("payment_date", "date", "value_date", "transaction_date", "posting_date"),
+    "amount": ("amount", "credit", "credit_amount", "deposit", "paid_amount"),
+    "reference_no": ("reference_no", "reference", "ref", "utr", "transaction_id", "cheque_no"),
+    "tenant": ("tenant", "tenant_id", "tenant_name"),
+    "phone": ("phone", "mobile", "mobile_no", "contact_number"),
+    "invoice": ("invoice", "sales_invoice"),
+}
+
+
+@frappe.whitelist()
+def start_payment_import(file_url, branch=None, mode_of_payment="Bank Transfer"):
+    """
+    Queue an import of a CSV bank statement (one credit per row).
+    Rows are matched to tenants by tenant ID/name, by a reference equal to the tenant
+    ID/name, or by phone number; each match becomes a submitted Payment with FIFO
+    allocations and its Payment Entry. Listen to `hms_payment_import_progress` or poll
+    get_payment_import for per-row results.
+    """
+    frappe.has_permission("Payment", "create", throw=True)
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+    # Payment create does not grant access to someone else's private statement
+    file_doc.check_permission("read")
+    path = file_doc.get_full_path()
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), None)
+    columns = _map_columns(header or [])
+    if "amount" not in columns:
+        frappe.throw(_("The file needs an Amount (or Credit) column"))
+    if not ({"tenant", "reference_no", "phone"} & set(columns)):
+        frappe.throw(_("The file needs a Tenant, Reference or Phone column to match payments"))
+
+    run_id = frappe.generate_hash(length=10)
+    state = frappe._dict({
+        "run_id": run_id,
+        "file_url": file_url,
+        "path": path,
+        "branch": branch or None,
+        "mode_of_payment": mode_of_payment,
+        "status": "Queued",
+        "started_by": frappe.session.user,
+        "processed": 0,
+        "created": 0,
+        "unmatched": 0,
+        "skipped": 0,
+        "failed": 0,
+        "results": [],
+    })
+    _save_payment_import(state)
+    _enqueue_payment_import(run_id)
+    return state
+
+
+@frappe.whitelist()
+def resume_payment_import(run_id):
+    """Continue a failed or interrupted import after the last fully committed chunk"""
+    frappe.has_permission("Payment", "create", throw=True)
+    state = _load_payment_import(run_id)
+    if state.status == "Completed":
+        return state
+    state.status = "Queued"
+    _save_payment_import(state)
+    _enqueue_payment_import(run_id)
+    return state
+
+
+@frappe.whitelist()
+def get_payment_import(run_id):
+    frappe.has_permission("Payment", "read", throw=True)
+    return _load_payment_import(run_id)
+
+
+def _load_payment_import(run_id):
+    state = frappe.cache().get_value(PAYMENT_IMPORT_KEY.format(run_id))
+    if not state:
+        frappe.throw(_("Payment import {0} not found").format(run_id), frappe.DoesNotExistError)
+    return frappe._dict(state)
+
+
+def run_payment_import(run_id):
+    """Background job: stream the file and import it in chunks, committing after each chunk"""
+    state = _load_payment_import(run_id)
+    state.status = "Running"
+    _save_payment_import(state)
+    phone_index = _get_tenant_phone_index(state.branch)
+
+    try:
+        with open(state.path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            columns = _map_columns(next(reader, None) or [])
+            # rows before state.processed were committed by an earlier attempt
+            rows = enumerate(islice(reader, state.processed, None), start=state.processed + 2)
+            while True:
+                chunk = list(islice(rows, PAYMENT_IMPORT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                _import_payment_chunk(state, columns, chunk, phone_index)
+                state.processed += len(chunk)
+                frappe.db.commit()
+                _save_payment_import(state)
+                frappe.publish_realtime("hms_payment_import_progress", state, user=state.started_by)
+    except Exception:
+        frappe.db.rollback()
+        state.status = "Failed"
+        _save_payment_import(state)
+        frappe.log_error(f"Payment import {run_id} failed after row {state.processed + 1}", "Payment Import Failed")
+        raise
+
+    state.status = "Completed"
+    _save_payment_import(state)
+    frappe.publish_realtime("hms_payment_import_progress", state, user=state.started_by)
+
+
+def _import_payment_chunk(state, columns, chunk, phone_index):
+    entries = []
+    for line, row in chunk:
+        entry = frappe._dict({field: (row[i].strip() if i < len(row) else "") for field, i in columns.items()})
+        entry.line = line
+        entry.amount = flt(re.sub(r"[^0-9.\-]", "", entry.amount or ""))
+        entries.append(entry)
+
+    tenants = _match_tenants(entries, phone_index, state.branch)
+    already_imported = set(frappe.get_all(
+        "Payment",
+        filters={
+            "reference_no": ["in", [e.reference_no for e in entries if e.reference_no] or [""]],
+            "docstatus": ["<", 2],
+        },
+        pluck="reference_no",
+    ))
+    open_invoices = _get_open_invoices_by_customer({t.customer for t in tenants.values() if t.customer})
+
+    for entry in entries:
+        tenant = tenants.get(entry.line)
+        if entry.amount <= 0:
+            _record_result(state, entry, "Skipped", _("Not a credit"))
+        elif entry.reference_no and entry.reference_no in already_imported:
+            _record_result(state, entry, "Skipped", _("Reference {0} already imported").format(entry.reference_no))
+        elif not tenant:
+            _record_result(state, entry, "Unmatched", _("No tenant matches this row"))
+        elif not tenant.customer:
+            _record_result(state, entry, "Unmatched", _("Tenant {0} has no Customer").format(tenant.name))
+        else:
+            _create_payment(state, entry, tenant, open_invoices[tenant.customer])
+            if entry.reference_no:
+                already_imported.add(entry.reference_no)
+
+
+def _create_payment(state, entry, tenant, open_invoices):
+    frappe.db.savepoint("hms_payment_import_row")
+    try:
+        if entry.invoice:
+            invoices = [i for i in open_invoices if i.name == entry.invoice]
+            if not invoices:
+                frappe.throw(_("Invoice {0} is not open for {1}").format(entry.invoice, tenant.customer))
+        else:
+            invoices = open_invoices
+        references, _unallocated = allocate_fifo(entry.amount, invoices)
+        references = [ref for ref in references if ref["allocated_amount"] > 0]
+
+        payment = frappe.get_doc({
+            "doctype": "Payment",
+            "branch": tenant.branch,
+            "room": tenant.room,
+            "tenant": tenant.name,
+            "company": get_branch_company(tenant.branch),
+            "linked_customer": tenant.customer,
+            "amount": entry.amount,
+            "payment_type": "Receive",
+            "payment_date": getdate(entry.payment_date) if entry.payment_date else None,
+            "mode_of_payment": state.mode_of_payment,
+            "reference_no": entry.reference_no,
+            "status": "Accepted",
+            "payment_references": references,
+        })
+        payment.flags.defer_payment_entry = True
+        payment.insert()
+        payment.submit()
+        payment_entry = payment.post_payment_entry()
+    except Exception as e:
+        frappe.db.rollback(save_point="hms_payment_import_row")
+        _record_result(state, entry, "Failed", str(e), tenant=tenant.name)
+        return
+
+    # later rows of the same customer allocate against what is left
+    for ref in references:
+        for invoice in open_invoices:
+            if invoice.name == ref["reference_name"]:
+                invoice.outstanding_amount = flt(invoice.outstanding_amount) - ref["allocated_amount"]
+    _record_result(state, entry, "Created", tenant=tenant.name, payment=payment.name, payment_entry=payment_entry.name)
+
+
+def _match_tenants(entries, phone_index, branch=None):
+    """{line: tenant} using the tenant column, a reference equal to a tenant ID/name, then phone"""
+    candidates = {value for e in entries for value in (e.tenant, e.reference_no) if value}
+    by_name = {}
+    if candidates:
+        rows = frappe.db.sql(
+            f"""
+            SELECT name, tenant_name, customer, branch, room, status
+            FROM `tabTenant`
+            WHERE (name IN %(values)s OR tenant_name IN %(values)s)
+            {"AND branch = %(branch)s" if branch else ""}
+            ORDER BY status = 'Active'
+            """,
+            {"values": tuple(candidates), "branch": branch},
+            as_dict=True,
+        )
+        # Active tenants are read last, so they win on duplicate keys
+        for row in rows:
+            by_name[row.name.lower()] = row
+            by_name[(row.tenant_name or "").lower()] = row
+
+    matches = {}
+    for entry in entries:
+        for value in (entry.tenant, entry.reference_no):
+            if value and value.lower() in by_name:
+                matches[entry.line] = by_name[value.lower()]
+                break
+        else:
+            phone = _normalize_phone(entry.phone)
+            if phone and phone in phone_index:
+                matches[entry.line] = phone_index[phone]
+    return matches
+
+
+def _get_tenant_phone_index(branch=None):
+    """Last ten digits of the contact number -> tenant, built once per import"""
+    filters = {"contact_number": ["is", "set"]}
+    if branch:
+        filters["branch"] = branch
+    rows = frappe.get_all(
+        "Tenant", filters=filters, fields=["name", "tenant_name", "customer", "branch", "room", "status", "contact_number"]
+    )
+    index = {}
+    # Active tenants are indexed last, so they win on shared numbers
+    for row in sorted(rows, key=lambda row: row.status == "Active"):
+        phone = _normalize_phone(row.contact_number)
+        if phone:
+            index[phone] = row
+    return index
+
+
+def _get_open_invoices_by_customer(customers):
+    invoices = defaultdict(list)
+    if not customers:
+        return invoices
+    for invoice in frappe.get_all(
+        "Sales Invoice",
+        filters={"customer": ["in", list(customers)], "docstatus": 1, "outstanding_amount": [">", 0]},
+        fields=["name", "customer", "grand_total", "outstanding_amount", "due_date", "posting_date"],
+        order_by="due_date asc, name asc",
+    ):
+        invoices[invoice.customer].append(invoice)
+    return invoices
+
+
+def _map_columns(header):
+    normalized = [re.sub(r"[^a-z0-9]+", "_", (column or "").strip().lower()).strip("_") for column in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    return columns
+
+
+def _normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def _record_result(state, entry, status, message=None, **values):
+    state[status.lower()] += 1
+    if len(state.results) < MAX_RECORDED_RESULTS:
+        state.results.append(dict(
+            row=entry.line, status=status, message=message,
+            reference_no=entry.reference_no, amount=entry.amount, **values
+        ))
+
+
+def _save_payment_import(state):
+    frappe.cache().set_value(PAYMENT_IMPORT_KEY.format(state.run_id), state, expires_in_sec=PAYMENT_IMPORT_EXPIRY)
+
+
+def _enqueue_payment_import(run_id):
+    frappe.enqueue(
+        "maddati_hms.payment_import.run_payment_import",
+        queue="long",
+        timeout=4 * 60 * 60,
+        enqueue_after_commit=True,
+        run_id=run_id,
+    )
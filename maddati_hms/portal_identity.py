@@ -0,0 +1,90 @@
+import frappe
+
+PORTAL_IDENTITY_KEY = "maddati_hms:portal_identity"
+# users without a Customer are remembered for a while only, so a Customer created or
+# re-pointed by a path that skips the hooks below is still picked up
+UNKNOWN_USER_KEY = "maddati_hms:portal_identity_unknown:{0}"
+UNKNOWN_USER_EXPIRY = 5 * 60
+
+
+def get_portal_identity(user=None):
+    """
+    Resolve the portal user to {customer, customer_name, tenant, room, branch, company}
+    with one joined query, cached per user until a linked Customer/Tenant changes.
+    Missing links are returned as None; a user without a Customer gets an empty dict.
+    """
+    user = user or frappe.session.user
+    if not user or user == "Guest":
+        return frappe._dict()
+    identity = frappe.cache().hget(PORTAL_IDENTITY_KEY, user)
+    if identity is None:
+        if frappe.cache().get_value(UNKNOWN_USER_KEY.format(user)):
+            return frappe._dict()
+        identity = _load_portal_identity(user)
+        if identity:
+            frappe.cache().hset(PORTAL_IDENTITY_KEY, user, identity)
+        else:
+            frappe.cache().set_value(UNKNOWN_USER_KEY.format(user), 1, expires_in_sec=UNKNOWN_USER_EXPIRY)
+    return frappe._dict(identity)
+
+
+def _load_portal_identity(user):
+    rows = frappe.db.sql(
+        """
+        SELECT
+            c.name AS customer,
+            c.customer_name,
+            t.name AS tenant,
+            t.room,
+            r.branch,
+            b.company
+        FROM `tabCustomer` c
+        LEFT JOIN `tabTenant` t ON t.customer = c.name
+        LEFT JOIN `tabRoom` r ON r.name = t.room
+        LEFT JOIN `tabBranch` b ON b.name = r.branch
+        WHERE c.email_id = %s
+        ORDER BY t.status = 'Active' DESC, t.creation DESC
+        LIMIT 1
+        """,
+        user,
+        as_dict=True,
+    )
+    return dict(rows[0]) if rows else {}
+
+
+def clear_portal_identity(users=None):
+    """
+    Drop cached identities of the given users, or of everyone when users is None.
+    Cleared again after commit so a concurrent request cannot re-cache the old links.
+    """
+    users = None if users is None else {user for user in users if user}
+
+    def clear():
+        if users is None:
+            frappe.cache().delete_value(PORTAL_IDENTITY_KEY)
+            frappe.cache().delete_keys(UNKNOWN_USER_KEY.format(""))
+            return
+        for user in users:
+            frappe.cache().hdel(PORTAL_IDENTITY_KEY, user)
+            frappe.cache().delete_value(UNKNOWN_USER_KEY.format(user))
+
+    clear()
+    frappe.db.after_commit.add(clear)
+
+
+def clear_portal_identity_for_customers(customers):
+    customers = [c for c in set(customers) if c]
+    if not customers:
+        return
+    clear_portal_identity(
+        frappe.get_all("Customer", filters={"name": ["in", customers]}, pluck="email_id")
+    )
+
+
+def on_customer_change(doc, method=None, *args):
+    """doc_events hook for Customer: email_id or tenant link may have changed"""
+    users = [doc.email_id]
+    doc_before_save = doc.get_doc_before_save()
+    if doc_before_save:
+        users.append(doc_before_save.email_id)
+    clear_portal_identity(users)
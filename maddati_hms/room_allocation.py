@@ -0,0 +1,276 @@
+"""
+Room allocation planner for bulk admissions.
+
+Pending tenants are packed into free beds best-fit: each tenant, or group of tenants that
+must share a room, goes to the compatible room with the fewest free beds that still fit,
+the cheapest of those. Rooms are kept in one heap (by monthly rent) per branch, room type,
+occupant group and free-bed count, so a placement looks at no more than one heap top per
+possible free count. The plan is only a preview; nothing is locked or written. Pass its
+`admissions` to maddati_hms.bulk_accommodation.bulk_admit to apply it.
+"""
+import heapq
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from maddati_hms.instrumentation import instrument
+
+MAX_PLANNED_TENANTS = 5000
+ROOM_TYPES = ("Single", "Double", "Dormitory")
+# label of a room whose Active tenants already differ on the separate_by field
+MIXED = "__mixed__"
+
+
+@frappe.whitelist()
+@instrument
+def plan_room_allocation(tenants=None, branch=None, room_type=None, max_monthly_rent=None, separate_by=None):
+    """
+    Propose rooms for Pending tenants: the given `tenants` (names, or rows of {tenant, branch,
+    room_type, max_monthly_rent, group}) or else every Pending tenant of `branch`.
+    Tenants sharing a `group` are placed in one room. With `separate_by` (a Tenant field such
+    as gender) a room only takes tenants with the same value as its current occupants.
+    """
+    frappe.has_permission("Tenant", "read", throw=True)
+    frappe.has_permission("Room", "read", throw=True)
+    if room_type and room_type not in ROOM_TYPES:
+        frappe.throw(_("Room Type must be one of {0}").format(", ".join(ROOM_TYPES)))
+    if separate_by and (separate_by == "name" or not frappe.get_meta("Tenant").has_field(separate_by)):
+        frappe.throw(_("Tenant has no field {0}").format(separate_by))
+
+    requests = _get_requests(tenants, branch, room_type, max_monthly_rent, separate_by)
+    units, unassigned = _get_units(requests)
+    rooms = _get_rooms({unit.branch for unit in units}, separate_by)
+    heaps = _RoomHeaps(rooms)
+
+    # largest groups first, then the tightest fee limits
+    units.sort(key=lambda unit: (-unit.size, unit.max_rent is None, unit.max_rent or 0, unit.order))
+    assignments = []
+    for unit in units:
+        room = heaps.find(unit)
+        if not room:
+            unassigned.extend(
+                _unassigned(request, _("No compatible room has {0} free beds").format(unit.size))
+                for request in unit.members
+            )
+            continue
+        heaps.take(room, unit)
+        for request in unit.members:
+            assignments.append(frappe._dict(
+                order=request.order,
+                tenant=request.tenant,
+                tenant_name=request.tenant_name,
+                group=request.group,
+                branch=room.branch,
+                room=room.name,
+                room_number=room.room_number,
+                room_type=room.room_type,
+                monthly_rent=room.monthly_rent,
+            ))
+
+    assignments.sort(key=lambda row: row.order)
+    unassigned.sort(key=lambda row: row.order)
+    return frappe._dict(
+        assignments=assignments,
+        unassigned=unassigned,
+        admissions=[{"tenant": row.tenant, "branch": row.branch, "room": row.room} for row in assignments],
+        rooms=[
+            {
+                "room": room.name,
+                "room_number": room.room_number,
+                "branch": room.branch,
+                "free_beds": room.free + room.assigned,
+                "assigned": room.assigned,
+            }
+            for room in sorted(rooms, key=lambda room: (room.branch, room.room_number or "", room.name))
+            if room.assigned
+        ],
+        requested=len(requests),
+        assigned=len(assignments),
+        free_beds_left=sum(room.free for room in rooms),
+    )
+
+
+def _get_requests(tenants, branch, room_type, max_monthly_rent, separate_by):
+    tenants = frappe.parse_json(tenants) if isinstance(tenants, str) else tenants
+    if tenants:
+        rows = [frappe._dict(row) if isinstance(row, dict) else frappe._dict(tenant=row) for row in tenants]
+    elif branch:
+        rows = [
+            frappe._dict(tenant=name)
+            for name in frappe.get_all(
+                "Tenant", filters={"branch": branch, "status": "Pending"}, order_by="creation asc", pluck="name"
+            )
+        ]
+    else:
+        frappe.throw(_("Select the tenants or a branch to plan for"))
+    if len(rows) > MAX_PLANNED_TENANTS:
+        frappe.throw(_("At most {0} tenants can be planned at once").format(MAX_PLANNED_TENANTS))
+
+    fields = ["name", "tenant_name", "status", "branch"]
+    if separate_by:
+        fields.append(separate_by)
+    names = [row.tenant for row in rows if row.tenant]
+    stored = {
+        tenant.name: tenant
+        for tenant in frappe.get_all("Tenant", filters={"name": ["in", names]}, fields=fields)
+    } if names else {}
+
+    for order, row in enumerate(rows):
+        tenant = stored.get(row.tenant)
+        row.order = order
+        row.tenant_name = tenant and tenant.tenant_name
+        row.branch = row.branch or branch or (tenant and tenant.branch)
+        row.room_type = row.room_type or room_type
+        row.max_rent = flt(row.max_monthly_rent or max_monthly_rent) or None
+        row.label = (tenant.get(separate_by) or None) if tenant and separate_by else None
+        if not tenant:
+            row.error = _("Tenant {0} not found").format(row.tenant)
+        elif tenant.status != "Pending":
+            row.error = _("Tenant {0} is {1}, not Pending").format(tenant.name, tenant.status)
+        elif row.room_type and row.room_type not in ROOM_TYPES:
+            row.error = _("Unknown Room Type {0}").format(row.room_type)
+        else:
+            row.error = None
+    return rows
+
+
+def _get_units(requests):
+    """One unit per ungrouped tenant and per group; a group must agree on branch, room type and label"""
+    units = []
+    unassigned = []
+    groups = {}
+    for request in requests:
+        if request.error:
+            unassigned.append(_unassigned(request, request.error))
+        elif request.group:
+            groups.setdefault(request.group, []).append(request)
+        else:
+            units.append(_make_unit([request]))
+
+    for group, members in groups.items():
+        if len({(m.branch, m.label) for m in members}) > 1 or len({m.room_type for m in members if m.room_type}) > 1:
+            unassigned.extend(
+                _unassigned(m, _("Group {0} mixes branches, room types or occupant groups").format(group))
+                for m in members
+            )
+        else:
+            units.append(_make_unit(members))
+    return units, unassigned
+
+
+def _make_unit(members):
+    limits = [m.max_rent for m in members if m.max_rent]
+    return frappe._dict(
+        members=members,
+        size=len(members),
+        order=members[0].order,
+        branch=members[0].branch,
+        room_type=next((m.room_type for m in members if m.room_type), None),
+        max_rent=min(limits) if limits else None,
+        label=members[0].label,
+    )
+
+
+def _unassigned(request, reason):
+    return frappe._dict(order=request.order, tenant=request.tenant, group=request.group, reason=reason)
+
+
+def _get_rooms(branches, separate_by):
+    if not branches:
+        return []
+    rooms = frappe.db.sql(
+        """
+        SELECT
+            name,
+            room_number,
+            branch,
+            room_type,
+            COALESCE(capacity, 0) - COALESCE(occupied_beds, 0) AS free,
+            COALESCE(monthly_rent, 0) AS monthly_rent
+        FROM `tabRoom`
+        WHERE branch IN %(branches)s
+        AND IFNULL(status, '') != 'Maintenance'
+        AND COALESCE(capacity, 0) > COALESCE(occupied_beds, 0)
+        """,
+        {"branches": tuple(branches)},
+        as_dict=True,
+    )
+
+    labels = {}
+    if separate_by and rooms:
+        # separate_by was checked against the Tenant meta
+        for room, value, values in frappe.db.sql(
+            f"""
+            SELECT room, MIN(`{separate_by}`), COUNT(DISTINCT IFNULL(`{separate_by}`, ''))
+            FROM `tabTenant`
+            WHERE status = 'Active' AND room IN %(rooms)s
+            GROUP BY room
+            """,
+            {"rooms": tuple(room.name for room in rooms)},
+        ):
+            labels[room] = (value or None) if values == 1 else MIXED
+
+    for room in rooms:
+        room.free = int(room.free)
+        room.assigned = 0
+        room.label = labels.get(room.name)
+    return rooms
+
+
+class _RoomHeaps:
+    """Rooms with free beds in heaps of (monthly_rent, room_number, name) keyed by (branch, room_type, label, free)"""
+
+    def __init__(self, rooms):
+        self.rooms = {room.name: room for room in rooms}
+        # current heap key of every room; entries under any other key are stale
+        self.keys = {}
+        self.heaps = defaultdict(list)
+        self.room_types = defaultdict(set)
+        self.max_free = defaultdict(int)
+        for room in rooms:
+            self._push(room)
+
+    def find(self, unit):
+        """The compatible room with the fewest free beds that fit the unit, cheapest first"""
+        branch, max_rent = unit.branch, unit.max_rent
+        room_types = [unit.room_type] if unit.room_type else self.room_types[branch]
+        # an unlabelled room has no occupants that constrain who joins
+        labels = (unit.label, None) if unit.label else (None,)
+        for free in range(unit.size, self.max_free[branch] + 1):
+            best = None
+            for room_type in room_types:
+                for label in labels:
+                    top = self._peek((branch, room_type, label, free))
+                    if top and (max_rent is None or top[0] <= max_rent) and (best is None or top < best):
+                        best = top
+            if best:
+                return self.rooms[best[2]]
+        return None
+
+    def take(self, room, unit):
+        room.free -= unit.size
+        room.assigned += unit.size
+        if unit.label:
+            room.label = unit.label
+        self._push(room)
+
+    def _push(self, room):
+        if room.free <= 0:
+            self.keys.pop(room.name, None)
+            return
+        key = (room.branch, room.room_type, room.label, room.free)
+        self.keys[room.name] = key
+        heapq.heappush(self.heaps[key], (room.monthly_rent, room.room_number or "", room.name))
+        self.room_types[room.branch].add(room.room_type)
+        self.max_free[room.branch] = max(self.max_free[room.branch], room.free)
+
+    def _peek(self, key):
+        heap = self.heaps.get(key)
+        while heap:
+            # free beds only go down and a label is set once, so a room is never pushed twice under one key
+            if self.keys.get(heap[0][2]) == key:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
@@ -0,0 +1,129 @@
+from bisect import bisect_right
+
+import frappe
+
+from maddati_hms.availability import clear_availability_snapshot, get_availability_snapshot
+from maddati_hms.pagination import decode_cursor, encode_cursor
+
+ROOM_SEARCH_INDEX_KEY = "maddati_hms:room_search_index"
+ALL_BRANCHES = "__all__"
+
+
+def search_rooms(branch=None, txt=None, start=0, page_len=10, cursor=None):
+    """
+    Search the cached room index of a branch.
+    Rooms are ordered by (room_number, name); `txt` matches case-insensitively anywhere in
+    the room number or name (so prefixes match too). With a cursor, the page starts right
+    after the (room_number, name) it encodes, otherwise `start` is used as an offset.
+    Returns (rows, next_cursor).
+    """
+    index = get_room_search_index(branch)
+    entries = index["entries"]
+    txt = (txt or "").strip().lower()
+
+    cursor_values = decode_cursor(cursor, 2)
+    position = bisect_right(index["keys"], tuple(cursor_values)) if cursor_values else 0
+    skip = 0 if cursor_values else max(int(start or 0), 0)
+
+    rows = []
+    last = None
+    for i in range(position, len(entries)):
+        entry = entries[i]
+        if txt and txt not in entry["search_text"]:
+            continue
+        if skip:
+            skip -= 1
+            continue
+        if len(rows) == page_len:
+            # at least one more match exists beyond this page
+            return rows, encode_cursor([last["room_number"], last["name"]])
+        rows.append(entry)
+        last = entry
+
+    return rows, None
+
+
+def get_room_search_index(branch=None):
+    return frappe.cache().hget(
+        ROOM_SEARCH_INDEX_KEY, branch or ALL_BRANCHES, generator=lambda: build_room_search_index(branch)
+    )
+
+
+def build_room_search_index(branch=None):
+    # built from the availability snapshot, which is already in room picker order
+    rooms = [frappe._dict(room) for room in get_availability_snapshot(branch)["rooms"]]
+
+    entries = []
+    for room in rooms:
+        desk_description, web_description = render_room_descriptions(room)
+        entries.append({
+            "name": room.name,
+            "room_number": room.room_number or "",
+            "search_text": f"{room.room_number or ''}\n{room.name}".lower(),
+            "desk_description": desk_description,
+            "web_description": web_description,
+        })
+
+    return {
+        "entries": entries,
+        "keys": [(entry["room_number"], entry["name"]) for entry in entries],
+    }
+
+
+def render_room_descriptions(room):
+    """Plain description for Desk and badge + muted HTML description for Web"""
+    status = room.status
+    capacity = room.capacity
+    occupied_beds = room.occupied_beds
+    monthly_str = frappe.utils.fmt_money((room.monthly_rent or 0), currency=None, precision=0)
+    # Plain description (works for Desk)
+    plain_desc = f"({status}) - (Capacity-{capacity}) - (Occupied Beds -{occupied_beds}) - (Monthly Rent - {monthly_str})"
+
+    # Build small badge + muted description for Web
+    status_lower = (status or "").lower()
+    if status_lower == "available":
+        status_fg = "#1e7e34"  # green text
+        status_bg = "#e6f4ea"  # green light bg
+    elif status_lower == "full":
+        status_fg = "#b02a37"  # red text
+        status_bg = "#fdecea"  # red light bg
+    elif status_lower == "maintenance":
+        status_fg = "#b8860b"  # yellow text
+        status_bg = "#fff8e1"  # yellow light bg
+    else:
+        status_fg = "#6c757d"
+        status_bg = "#f1f3f5"
+
+    is_unavailable = status_lower in ("full", "maintenance")
+    muted_style = "color: #6c757d;" if is_unavailable else ""
+
+    esc_status = frappe.utils.escape_html(status or "")
+    esc_details = frappe.utils.escape_html(
+        f"(Capacity-{capacity}) - (Occupied Beds -{occupied_beds}) - (Monthly Rent - {monthly_str})"
+    )
+    badge_html = (
+        f"<span style=\"display:inline-block;margin-right:8px;padding:2px 8px;border-radius:999px;"
+        f"font-size:11px;line-height:1;background-color:{status_bg};color:{status_fg};\">{esc_status}</span>"
+    )
+    web_desc_html = f"<span style=\"{muted_style}\">{badge_html}<span class=\"small\">{esc_details}</span></span>"
+
+    return plain_desc, web_desc_html
+
+
+def clear_room_search_index(branches=None):
+    """
+    Drop the cached index of the given branches (and the all-branches index), together
+    with their availability snapshots. Without branches every index is dropped. Cleared
+    again after commit so that a concurrent request cannot re-cache rows from before this
+    transaction.
+    """
+    def clear():
+        if branches is None:
+            frappe.cache().delete_value(ROOM_SEARCH_INDEX_KEY)
+            return
+        for branch in {*branches, ALL_BRANCHES}:
+            frappe.cache().hdel(ROOM_SEARCH_INDEX_KEY, branch or ALL_BRANCHES)
+
+    clear_availability_snapshot(branches)
+    clear()
+    frappe.db.after_commit.add(clear)
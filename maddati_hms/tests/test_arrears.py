@@ -0,0 +1,125 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days
+
+from maddati_hms.arrears import (
+	ARREARS_KEY,
+	get_branch_arrears,
+	on_journal_entry_change,
+	on_payment_reconciliation,
+)
+
+BRANCH = "_Test Arrears Branch"
+AS_OF = "2026-06-30"
+
+
+class IntegrationTestArrears(IntegrationTestCase):
+	"""Aging of raw Sales Invoice rows, so only the grouped query and its cache are exercised"""
+
+	def setUp(self):
+		self.cleanup()
+		self.invoices = 0
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		frappe.db.delete("Sales Invoice", {"custom_branch": BRANCH})
+		frappe.cache().delete_keys(ARREARS_KEY.format(BRANCH, ""))
+		frappe.db.commit()
+
+	def add_invoice(self, tenant, days_overdue, outstanding=100):
+		"""Submitted invoice due `days_overdue` days before AS_OF (negative: not yet due); returns its name"""
+		self.invoices += 1
+		name = f"_T-ARR-{self.invoices:04d}"
+		due_date = add_days(AS_OF, -days_overdue)
+		frappe.get_doc({
+			"doctype": "Sales Invoice",
+			"name": name,
+			"customer": tenant,
+			"posting_date": add_days(due_date, -7),
+			"due_date": due_date,
+			"docstatus": 1,
+			"grand_total": 100,
+			"outstanding_amount": outstanding,
+			"custom_branch": BRANCH,
+			"custom_tenant": tenant,
+			"custom_invoice_type": "Monthly Fee",
+		}).db_insert()
+		frappe.db.commit()
+		return name
+
+	def get_buckets(self):
+		return {
+			row.tenant: (row.bucket_0_30, row.bucket_31_60, row.bucket_61_90, row.bucket_90_plus)
+			for row in get_branch_arrears(BRANCH, AS_OF)
+		}
+
+	def test_bucket_boundaries(self):
+		for days in (-5, 0, 30, 31, 60, 61, 90, 91):
+			self.add_invoice(f"_Test Arrears Tenant {days}", days)
+
+		buckets = self.get_buckets()
+
+		# invoices not yet due age as 0-30
+		self.assertEqual(buckets["_Test Arrears Tenant -5"], (100, 0, 0, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 0"], (100, 0, 0, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 30"], (100, 0, 0, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 31"], (0, 100, 0, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 60"], (0, 100, 0, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 61"], (0, 0, 100, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 90"], (0, 0, 100, 0))
+		self.assertEqual(buckets["_Test Arrears Tenant 91"], (0, 0, 0, 100))
+
+	def test_invoices_of_one_tenant_are_summed_per_bucket(self):
+		for days, outstanding in ((10, 40), (20, 60), (45, 25), (120, 80)):
+			self.add_invoice("_Test Arrears Tenant", days, outstanding)
+		self.add_invoice("_Test Arrears Tenant", 15, outstanding=0)
+
+		(row,) = get_branch_arrears(BRANCH, AS_OF)
+		self.assertEqual((row.bucket_0_30, row.bucket_31_60, row.bucket_61_90, row.bucket_90_plus), (100, 25, 0, 80))
+		self.assertEqual((row.total, row.invoices), (205, 4))
+
+	def test_write_off_clears_the_cached_aging(self):
+		invoice = self.add_invoice("_Test Arrears Tenant", 45)
+		self.assertEqual(self.get_buckets()["_Test Arrears Tenant"], (0, 100, 0, 0))
+
+		# a write-off Journal Entry lowers the outstanding amount outside the Sales Invoice hooks
+		frappe.db.set_value("Sales Invoice", invoice, "outstanding_amount", 30)
+		self.assertEqual(self.get_buckets()["_Test Arrears Tenant"], (0, 100, 0, 0))
+
+		on_journal_entry_change(
+			frappe._dict(accounts=[
+				frappe._dict(reference_type=None, reference_name=None),
+				frappe._dict(reference_type="Sales Invoice", reference_name=invoice),
+			]),
+			"on_submit",
+		)
+		self.assertEqual(self.get_buckets()["_Test Arrears Tenant"], (0, 30, 0, 0))
+
+	def test_reconciliation_clears_the_cached_aging(self):
+		invoice = self.add_invoice("_Test Arrears Tenant", 5)
+		self.get_buckets()
+
+		frappe.db.set_value("Sales Invoice", invoice, "outstanding_amount", 0)
+		on_payment_reconciliation(
+			frappe._dict(allocation=[
+				frappe._dict(invoice_type="Sales Invoice", invoice_number=invoice, reference_type="Payment Entry"),
+			]),
+			"reconcile",
+		)
+		self.assertEqual(self.get_buckets(), {})
+
+	def test_hooks_are_registered(self):
+		doc_events = frappe.get_hooks("doc_events")
+		for doctype, event, method in (
+			("Sales Invoice", "on_submit", "on_sales_invoice_change"),
+			("Payment Entry", "on_submit", "on_payment_entry_change"),
+			("Journal Entry", "on_submit", "on_journal_entry_change"),
+			("Journal Entry", "on_cancel", "on_journal_entry_change"),
+			("Payment Reconciliation", "reconcile", "on_payment_reconciliation"),
+		):
+			self.assertIn(f"maddati_hms.arrears.{method}", doc_events[doctype][event])
@@ -0,0 +1,149 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from maddati_hms.billing import (
+	BILLING_RUN_KEY,
+	build_tenant_invoice,
+	get_billing_key,
+	resume_billing_run,
+	run_billing,
+	start_billing_run,
+)
+
+BRANCH = "_Test Billing Branch"
+PERIOD = "2026-01"
+TENANTS = ("_Test Billing Tenant 1", "_Test Billing Tenant 2", "_Test Billing Tenant 3")
+DEFAULTS = frappe._dict(
+	company="_Test Company",
+	receivable_account="Debtors - _TC",
+	income_account="Sales - _TC",
+	cost_center="Main - _TC",
+)
+
+
+class IntegrationTestBilling(IntegrationTestCase):
+	"""Billing runs with the Sales Invoice build stubbed to a bare row, so only the run logic is exercised"""
+
+	def setUp(self):
+		self.cleanup()
+		for name in TENANTS:
+			frappe.get_doc({
+				"doctype": "Tenant",
+				"name": name,
+				"tenant_name": name,
+				"email": f"{frappe.scrub(name)}@example.com",
+				"branch": BRANCH,
+				"status": "Active",
+				"customer": name,
+				"monthly_fee": 100,
+			}).db_insert()
+		frappe.db.commit()
+		self.failing_tenants = set()
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		frappe.db.delete("Sales Invoice", {"custom_tenant": ["in", TENANTS]})
+		frappe.db.delete("Tenant", {"branch": BRANCH})
+		frappe.db.commit()
+
+	def fake_build(self, tenant, customer_name, defaults, item_code, amount, invoice_type, posting_date=None, billing_key=None):
+		test = self
+
+		class Invoice:
+			def insert(self, ignore_permissions=False):
+				frappe.get_doc({
+					"doctype": "Sales Invoice",
+					"name": f"_T-BILL-{tenant.name}",
+					"customer": tenant.customer,
+					"company": defaults.company,
+					"custom_tenant": tenant.name,
+					"custom_invoice_type": invoice_type,
+					"custom_billing_key": billing_key,
+					"docstatus": 1,
+				}).db_insert()
+
+			def submit(self):
+				if tenant.name in test.failing_tenants:
+					frappe.throw("Submit failed")
+
+		return Invoice()
+
+	def run(self):
+		with (
+			patch("maddati_hms.billing._enqueue_billing_run"),
+			patch("maddati_hms.billing.get_branch_defaults", return_value=DEFAULTS),
+			patch("maddati_hms.billing.build_tenant_invoice", side_effect=self.fake_build),
+		):
+			run_id = start_billing_run(branch=BRANCH, period=PERIOD).run_id
+			run_billing(run_id)
+		return self.get_run(run_id)
+
+	def get_run(self, run_id):
+		return frappe._dict(frappe.cache().get_value(BILLING_RUN_KEY.format(run_id)))
+
+	def get_billed(self):
+		return frappe.get_all(
+			"Sales Invoice", filters={"custom_tenant": ["in", TENANTS]}, order_by="custom_tenant", pluck="custom_billing_key"
+		)
+
+	def test_rerun_for_the_same_period_bills_nobody_twice(self):
+		state = self.run()
+		self.assertEqual((state.created, state.skipped, state.status), (3, 0, "Completed"))
+
+		state = self.run()
+		self.assertEqual((state.created, state.skipped), (0, 3))
+		self.assertEqual(self.get_billed(), [get_billing_key(name, PERIOD, "Monthly Fee") for name in TENANTS])
+
+	def test_failed_tenant_is_rolled_back_alone(self):
+		self.failing_tenants = {TENANTS[1]}
+
+		state = self.run()
+
+		self.assertEqual((state.created, state.failed, state.status), (2, 1, "Completed"))
+		self.assertEqual([error["tenant"] for error in state.errors], [TENANTS[1]])
+		# the row inserted before the failed submit went with the savepoint
+		self.assertEqual(
+			self.get_billed(), [get_billing_key(name, PERIOD, "Monthly Fee") for name in (TENANTS[0], TENANTS[2])]
+		)
+
+	def test_resume_continues_after_the_last_committed_chunk(self):
+		calls = []
+
+		def defaults(branch):
+			calls.append(branch)
+			# first tenant of the second chunk: the whole chunk fails
+			if len(calls) == 3:
+				raise RuntimeError("connection lost")
+			return DEFAULTS
+
+		with (
+			patch("maddati_hms.billing.BILLING_CHUNK_SIZE", 2),
+			patch("maddati_hms.billing._enqueue_billing_run"),
+			patch("maddati_hms.billing.get_branch_defaults", side_effect=defaults),
+			patch("maddati_hms.billing.build_tenant_invoice", side_effect=self.fake_build),
+		):
+			run_id = start_billing_run(branch=BRANCH, period=PERIOD).run_id
+			with self.assertRaises(RuntimeError):
+				run_billing(run_id)
+			state = self.get_run(run_id)
+			self.assertEqual((state.status, state.last_tenant, state.created), ("Failed", TENANTS[1], 2))
+			self.assertEqual(len(self.get_billed()), 2)
+
+			resume_billing_run(run_id)
+			run_billing(run_id)
+
+		state = self.get_run(run_id)
+		self.assertEqual((state.status, state.processed, state.created, state.skipped), ("Completed", 3, 3, 0))
+		self.assertEqual(len(self.get_billed()), 3)
+
+	def test_ad_hoc_invoice_has_no_billing_key(self):
+		tenant = frappe._dict(name=TENANTS[0], tenant_name=TENANTS[0], customer=TENANTS[0], branch=BRANCH, room=None)
+		invoice = build_tenant_invoice(tenant, TENANTS[0], DEFAULTS, "Tenant Monthly Fee", 100, "Monthly Fee")
+		self.assertIsNone(invoice.custom_billing_key)
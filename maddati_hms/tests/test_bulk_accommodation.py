@@ -0,0 +1,169 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from maddati_hms.bulk_accommodation import bulk_admit, bulk_transfer
+from maddati_hms.occupancy import get_room_occupancy_diff
+
+BRANCH = "_Test Bulk Branch"
+SINGLE_1 = "_Test Bulk Single 1"
+SINGLE_2 = "_Test Bulk Single 2"
+DOUBLE = "_Test Bulk Double"
+# admitted tenants already have a Customer name, so no Customer is created or matched
+CUSTOMER = "_Test Bulk Customer"
+
+
+class IntegrationTestBulkAccommodation(IntegrationTestCase):
+	"""Admissions and transfers on raw Room/Tenant rows, checked against history and occupancy"""
+
+	def setUp(self):
+		self.cleanup()
+		for name, room_type, capacity in ((SINGLE_1, "Single", 1), (SINGLE_2, "Single", 1), (DOUBLE, "Double", 2)):
+			frappe.get_doc({
+				"doctype": "Room",
+				"name": name,
+				"room_number": name,
+				"branch": BRANCH,
+				"room_type": room_type,
+				"capacity": capacity,
+				"occupied_beds": 0,
+				"status": "Available",
+				"monthly_rent": 100,
+			}).db_insert()
+		self.tenants = 0
+		frappe.db.commit()
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		tenants = frappe.get_all("Tenant", filters={"branch": BRANCH}, pluck="name")
+		if tenants:
+			frappe.db.delete("Tenant Accommodation History", {"parenttype": "Tenant", "parent": ["in", tenants]})
+		frappe.db.delete("Tenant", {"branch": BRANCH})
+		frappe.db.delete("Room", {"branch": BRANCH})
+		frappe.db.commit()
+
+	def add_tenant(self, room=None):
+		"""Active tenant in `room` (its bed counted, one open history row), or a Left one without a room"""
+		self.tenants += 1
+		name = f"_Test Bulk Tenant {self.tenants}"
+		frappe.get_doc({
+			"doctype": "Tenant",
+			"name": name,
+			"tenant_name": name,
+			"email": f"{frappe.scrub(name)}@example.com",
+			"branch": BRANCH,
+			"room": room,
+			"status": "Active" if room else "Left",
+			"customer": None if room else CUSTOMER,
+		}).db_insert()
+		if room:
+			frappe.get_doc({
+				"doctype": "Tenant Accommodation History",
+				"name": f"_TBH-{self.tenants:04d}",
+				"parent": name,
+				"parenttype": "Tenant",
+				"parentfield": "accommodation_history",
+				"idx": 1,
+				"branch": BRANCH,
+				"room": room,
+				"from_date": "2026-01-01",
+				"status": "Active",
+			}).db_insert()
+			occupied = frappe.db.get_value("Room", room, "occupied_beds") + 1
+			status = "Full" if occupied >= frappe.db.get_value("Room", room, "capacity") else "Available"
+			frappe.db.set_value("Room", room, {"occupied_beds": occupied, "status": status})
+		frappe.db.commit()
+		return name
+
+	def get_room(self, room):
+		return tuple(frappe.db.get_value("Room", room, ["occupied_beds", "status"]))
+
+	def get_statuses(self, summary):
+		return [(row["tenant"], row["status"]) for row in summary.results]
+
+	def assertConsistent(self):
+		"""occupied_beds counts the Active tenants and each Active tenant has one open history row for its room"""
+		_rooms, changes = get_room_occupancy_diff(BRANCH)
+		self.assertEqual(changes, [])
+		for tenant in frappe.get_all("Tenant", filters={"branch": BRANCH, "status": "Active"}, fields=["name", "room"]):
+			open_rows = frappe.get_all(
+				"Tenant Accommodation History",
+				filters={"parenttype": "Tenant", "parent": tenant.name, "status": "Active"},
+				fields=["room", "to_date"],
+			)
+			self.assertEqual([(row.room, row.to_date) for row in open_rows], [(tenant.room, None)])
+
+	def test_admission_over_capacity_fails_the_overflow_only(self):
+		self.add_tenant(DOUBLE)
+		first, second = self.add_tenant(), self.add_tenant()
+
+		summary = bulk_admit([{"tenant": first, "room": DOUBLE}, {"tenant": second, "room": DOUBLE}])
+
+		self.assertEqual(self.get_statuses(summary), [(first, "Admitted"), (second, "Failed")])
+		self.assertIn("no free bed", summary.results[1]["message"])
+		self.assertEqual(summary.rooms, {DOUBLE: {"old_occupied_beds": 1, "new_occupied_beds": 2}})
+		self.assertEqual(self.get_room(DOUBLE), (2, "Full"))
+		self.assertEqual(frappe.db.get_value("Tenant", second, "status"), "Left")
+		self.assertConsistent()
+
+	def test_atomic_admission_over_capacity_changes_nothing(self):
+		first, second, third = self.add_tenant(), self.add_tenant(), self.add_tenant()
+
+		summary = bulk_admit(
+			[{"tenant": first, "room": DOUBLE}, {"tenant": second, "room": DOUBLE}, {"tenant": third, "room": DOUBLE}],
+			atomic=True,
+		)
+
+		self.assertEqual(self.get_statuses(summary), [(first, "Skipped"), (second, "Skipped"), (third, "Failed")])
+		self.assertEqual(self.get_room(DOUBLE), (0, "Available"))
+		self.assertFalse(frappe.db.exists("Tenant", {"branch": BRANCH, "status": "Active"}))
+		self.assertConsistent()
+
+	def test_transfer_between_full_rooms_nets_out(self):
+		first, second = self.add_tenant(SINGLE_1), self.add_tenant(SINGLE_2)
+
+		summary = bulk_transfer([{"tenant": first, "room": SINGLE_2}, {"tenant": second, "room": SINGLE_1}])
+
+		self.assertEqual(self.get_statuses(summary), [(first, "Transferred"), (second, "Transferred")])
+		# every room loses and gains one bed: nothing to write
+		self.assertEqual(summary.rooms, {})
+		self.assertEqual(self.get_room(SINGLE_1), (1, "Full"))
+		self.assertEqual(self.get_room(SINGLE_2), (1, "Full"))
+		self.assertEqual(frappe.db.get_value("Tenant", first, "room"), SINGLE_2)
+		self.assertEqual(frappe.db.get_value("Tenant", second, "room"), SINGLE_1)
+		history = frappe.get_all(
+			"Tenant Accommodation History",
+			filters={"parenttype": "Tenant", "parent": first},
+			fields=["room", "status", "idx"],
+			order_by="idx",
+		)
+		self.assertEqual(
+			[(row.room, row.status, row.idx) for row in history], [(SINGLE_1, "Left", 1), (SINGLE_2, "Active", 2)]
+		)
+		self.assertConsistent()
+
+	def test_non_atomic_batch_applies_the_valid_rows(self):
+		moving, staying = self.add_tenant(SINGLE_1), self.add_tenant(SINGLE_2)
+
+		summary = bulk_transfer([
+			{"tenant": moving, "room": DOUBLE},
+			{"tenant": staying, "room": "_Test Bulk Missing Room"},
+		])
+
+		self.assertEqual(self.get_statuses(summary), [(moving, "Transferred"), (staying, "Failed")])
+		self.assertIn("not found", summary.results[1]["message"])
+		self.assertEqual(
+			summary.rooms,
+			{
+				SINGLE_1: {"old_occupied_beds": 1, "new_occupied_beds": 0},
+				DOUBLE: {"old_occupied_beds": 0, "new_occupied_beds": 1},
+			},
+		)
+		self.assertEqual(self.get_room(SINGLE_1), (0, "Available"))
+		self.assertEqual(self.get_room(SINGLE_2), (1, "Full"))
+		self.assertEqual(frappe.db.get_value("Tenant", staying, "room"), SINGLE_2)
+		self.assertConsistent()
@@ -0,0 +1,53 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from maddati_hms.pagination import decode_cursor, encode_cursor, get_keyset_condition, split_page
+
+
+def room_key(row):
+	return (row["room_number"], row["name"])
+
+
+class IntegrationTestPagination(IntegrationTestCase):
+	"""Keyset cursors shared by the room picker, occupancy report and invoice queries"""
+
+	def test_cursor_round_trip(self):
+		cursor = encode_cursor(["101", "ROOM-0001"])
+		self.assertNotIn("=", cursor)
+		self.assertEqual(decode_cursor(cursor, 2), ["101", "ROOM-0001"])
+		self.assertIsNone(decode_cursor(None, 2))
+
+	def test_decode_cursor_rejects_bad_tokens(self):
+		for token in ("not a cursor", encode_cursor(["101"]), encode_cursor({"a": 1})):
+			with self.assertRaises(frappe.ValidationError):
+				decode_cursor(token, 2)
+
+	def test_keyset_condition_breaks_ties_on_the_first_column(self):
+		rows = [("101", "ROOM-1"), ("101", "ROOM-2"), ("101", "ROOM-3"), ("102", "ROOM-0"), ("100", "ROOM-9")]
+		derived = " UNION ALL ".join(
+			f"SELECT {frappe.db.escape(number)} AS room_number, {frappe.db.escape(name)} AS name"
+			for number, name in rows
+		)
+		condition, params = get_keyset_condition(["room_number", "name"], ["101", "ROOM-2"])
+		self.assertEqual(params, {"cursor_0": "101", "cursor_1": "ROOM-2"})
+		after = frappe.db.sql(
+			f"SELECT room_number, name FROM ({derived}) rooms WHERE {condition} ORDER BY room_number, name",
+			params,
+		)
+		self.assertEqual([tuple(row) for row in after], [("101", "ROOM-3"), ("102", "ROOM-0")])
+		self.assertEqual(get_keyset_condition(["room_number", "name"], None), ("1=1", {}))
+
+	def test_split_page_uses_the_extra_row(self):
+		rows = [{"room_number": "101", "name": f"ROOM-{i}"} for i in range(4)]
+
+		page, cursor = split_page(rows, 3, room_key)
+		self.assertEqual(page, rows[:3])
+		self.assertEqual(decode_cursor(cursor, 2), ["101", "ROOM-2"])
+
+		# exactly page_len rows: the last page
+		page, cursor = split_page(rows[:3], 3, room_key)
+		self.assertEqual(page, rows[:3])
+		self.assertIsNone(cursor)
@@ -0,0 +1,144 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from maddati_hms.payment_import import (
+	_get_tenant_phone_index,
+	_import_payment_chunk,
+	_map_columns,
+	_match_tenants,
+	start_payment_import,
+)
+
+BRANCH = "_Test Import Branch"
+HEADER = ["Date", "Credit", "Reference", "Tenant", "Mobile"]
+IMPORT_USER = "_test_hms_payment_import@example.com"
+
+
+class IntegrationTestPaymentImport(IntegrationTestCase):
+	"""Row matching and duplicate detection; Payment creation itself is stubbed"""
+
+	def setUp(self):
+		self.cleanup()
+		for name, tenant_name, phone, status in (
+			("_Test Import Tenant 1", "Asha Rao", "+91 98450 11111", "Active"),
+			("_Test Import Tenant 2", "Ravi Kumar", "9845022222", "Active"),
+			# a former tenant sharing Ravi's number loses to the Active one
+			("_Test Import Tenant 3", "Old Tenant", "098450-22222", "Left"),
+		):
+			frappe.get_doc({
+				"doctype": "Tenant",
+				"name": name,
+				"tenant_name": tenant_name,
+				"email": f"{frappe.scrub(name)}@example.com",
+				"contact_number": phone,
+				"branch": BRANCH,
+				"status": status,
+				"customer": f"{name} Customer",
+			}).db_insert()
+		frappe.db.commit()
+
+	def tearDown(self):
+		frappe.set_user("Administrator")
+		self.cleanup()
+
+	def cleanup(self):
+		frappe.db.delete("Payment", {"reference_no": ["like", "_TIMP-%"]})
+		frappe.db.delete("Tenant", {"branch": BRANCH})
+		frappe.db.commit()
+
+	def import_rows(self, rows):
+		"""Run one chunk of rows; returns the state and the (line, tenant) pairs that became Payments"""
+		state = frappe._dict(
+			branch=BRANCH, processed=0, created=0, unmatched=0, skipped=0, failed=0, results=[]
+		)
+		created = []
+
+		def create_payment(state, entry, tenant, open_invoices):
+			created.append((entry.line, tenant.name))
+			state.created += 1
+
+		with patch("maddati_hms.payment_import._create_payment", side_effect=create_payment):
+			_import_payment_chunk(
+				state, _map_columns(HEADER), list(enumerate(rows, start=2)), _get_tenant_phone_index(BRANCH)
+			)
+		return state, created
+
+	def test_rows_match_by_tenant_reference_and_phone(self):
+		entries = [
+			frappe._dict(line=2, tenant="_Test Import Tenant 1"),
+			# tenant names match case-insensitively
+			frappe._dict(line=3, tenant="asha rao"),
+			frappe._dict(line=4, reference_no="Ravi Kumar"),
+			frappe._dict(line=5, phone="98450 22222"),
+			frappe._dict(line=6, phone="+91-98450-11111"),
+			frappe._dict(line=7, tenant="Nobody", phone="12345"),
+		]
+
+		matches = _match_tenants(entries, _get_tenant_phone_index(BRANCH), BRANCH)
+
+		self.assertEqual(
+			{line: tenant.name for line, tenant in matches.items()},
+			{
+				2: "_Test Import Tenant 1",
+				3: "_Test Import Tenant 1",
+				4: "_Test Import Tenant 2",
+				5: "_Test Import Tenant 2",
+				6: "_Test Import Tenant 1",
+			},
+		)
+
+	def test_duplicate_references_are_skipped(self):
+		# imported by an earlier run
+		frappe.get_doc({
+			"doctype": "Payment",
+			"name": "_TIMP-PAY-1",
+			"reference_no": "_TIMP-OLD",
+			"amount": 100,
+			"docstatus": 1,
+		}).db_insert()
+		frappe.db.commit()
+
+		state, created = self.import_rows([
+			["2026-01-05", "100", "_TIMP-OLD", "_Test Import Tenant 1", ""],
+			["2026-01-05", "1,200.00", "_TIMP-NEW", "_Test Import Tenant 2", ""],
+			# the same transaction twice in one statement
+			["2026-01-06", "1,200.00", "_TIMP-NEW", "_Test Import Tenant 2", ""],
+			["2026-01-06", "-50", "_TIMP-DEBIT", "_Test Import Tenant 1", ""],
+			["2026-01-07", "300", "_TIMP-X", "Nobody", ""],
+		])
+
+		self.assertEqual(created, [(3, "_Test Import Tenant 2")])
+		self.assertEqual((state.created, state.skipped, state.unmatched), (1, 3, 1))
+		self.assertEqual(
+			[(result["row"], result["status"]) for result in state.results],
+			[(2, "Skipped"), (4, "Skipped"), (5, "Skipped"), (6, "Unmatched")],
+		)
+
+	def test_private_file_of_another_user_cannot_be_imported(self):
+		statement = frappe.get_doc({
+			"doctype": "File",
+			"file_name": f"_test_statement_{frappe.generate_hash(length=6)}.csv",
+			"is_private": 1,
+			"content": "Date,Credit,Reference\n2026-01-05,100,_TIMP-1\n",
+		}).insert(ignore_permissions=True)
+		if not frappe.db.exists("User", IMPORT_USER):
+			frappe.get_doc({
+				"doctype": "User",
+				"email": IMPORT_USER,
+				"first_name": "Payment Import",
+				"send_welcome_email": 0,
+				"roles": [{"role": "Customer"}],
+			}).insert(ignore_permissions=True)
+
+		frappe.set_user(IMPORT_USER)
+		try:
+			with self.assertRaises(frappe.PermissionError):
+				start_payment_import(statement.file_url)
+		finally:
+			frappe.set_user("Administrator")
+			statement.delete(ignore_permissions=True)
@@ -0,0 +1,80 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from maddati_hms.room_allocation import _RoomHeaps
+
+
+def make_room(name, free, room_type="Double", monthly_rent=100, branch="_Test Branch", label=None):
+	return frappe._dict(
+		name=name,
+		room_number=name,
+		branch=branch,
+		room_type=room_type,
+		free=free,
+		monthly_rent=monthly_rent,
+		assigned=0,
+		label=label,
+	)
+
+
+def make_unit(size=1, room_type=None, max_rent=None, branch="_Test Branch", label=None):
+	return frappe._dict(size=size, room_type=room_type, max_rent=max_rent, branch=branch, label=label)
+
+
+class IntegrationTestRoomAllocation(IntegrationTestCase):
+	"""Room choice of the allocation planner: tightest compatible room first, then cheapest"""
+
+	def test_allocation_picks_the_tightest_room(self):
+		heaps = _RoomHeaps([
+			make_room("ROOM-3", 3, monthly_rent=50),
+			make_room("ROOM-1", 1, monthly_rent=200),
+			make_room("ROOM-2", 2, monthly_rent=80),
+		])
+		self.assertEqual(heaps.find(make_unit(1)).name, "ROOM-1")
+		self.assertEqual(heaps.find(make_unit(2)).name, "ROOM-2")
+		self.assertEqual(heaps.find(make_unit(3)).name, "ROOM-3")
+		self.assertIsNone(heaps.find(make_unit(4)))
+
+	def test_allocation_prefers_the_cheaper_of_equally_tight_rooms(self):
+		heaps = _RoomHeaps([make_room("ROOM-1", 1, monthly_rent=150), make_room("ROOM-2", 1, monthly_rent=90)])
+		self.assertEqual(heaps.find(make_unit()).name, "ROOM-2")
+		# over the unit's rent limit the next tightest room that fits is used
+		heaps = _RoomHeaps([make_room("ROOM-1", 1, monthly_rent=150), make_room("ROOM-2", 2, monthly_rent=90)])
+		self.assertEqual(heaps.find(make_unit(max_rent=100)).name, "ROOM-2")
+		self.assertIsNone(heaps.find(make_unit(max_rent=80)))
+
+	def test_allocation_respects_room_type(self):
+		heaps = _RoomHeaps([
+			make_room("SINGLE-1", 1, room_type="Single", monthly_rent=300),
+			make_room("DOUBLE-1", 2, room_type="Double", monthly_rent=200),
+			make_room("DORM-1", 1, room_type="Dormitory", monthly_rent=100),
+		])
+		self.assertEqual(heaps.find(make_unit(room_type="Single")).name, "SINGLE-1")
+		self.assertEqual(heaps.find(make_unit(room_type="Double")).name, "DOUBLE-1")
+		self.assertEqual(heaps.find(make_unit(room_type="Dormitory")).name, "DORM-1")
+		self.assertIsNone(heaps.find(make_unit(2, room_type="Single")))
+		# without a room type any room fits, tightest and then cheapest first
+		self.assertEqual(heaps.find(make_unit()).name, "DORM-1")
+
+	def test_allocation_take_moves_the_room_down(self):
+		room = make_room("ROOM-2", 2)
+		heaps = _RoomHeaps([room, make_room("ROOM-3", 3)])
+		heaps.take(room, make_unit())
+		self.assertEqual((room.free, room.assigned), (1, 1))
+		self.assertEqual(heaps.find(make_unit(2)).name, "ROOM-3")
+		heaps.take(room, make_unit())
+		self.assertEqual(heaps.find(make_unit()).name, "ROOM-3")
+
+	def test_allocation_keeps_labelled_rooms_apart(self):
+		room = make_room("ROOM-2", 2)
+		heaps = _RoomHeaps([room, make_room("ROOM-9", 1, label="Boys", monthly_rent=10)])
+		self.assertEqual(heaps.find(make_unit(label="Girls")).name, "ROOM-2")
+		# the first labelled occupant decides who may join the room
+		heaps.take(room, make_unit(label="Girls"))
+		self.assertEqual(room.label, "Girls")
+		self.assertEqual(heaps.find(make_unit(label="Girls")).name, "ROOM-2")
+		self.assertEqual(heaps.find(make_unit(label="Boys")).name, "ROOM-9")
+		self.assertIsNone(heaps.find(make_unit()))
@@ -0,0 +1,63 @@
+# Copyright (c) 2026, Maddati Tech and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+from frappe.tests import IntegrationTestCase
+
+from maddati_hms.room_search import search_rooms
+
+
+def make_search_index(rooms):
+	"""Room search index over (room_number, name) pairs, in room picker order"""
+	entries = [
+		{"name": name, "room_number": room_number, "search_text": f"{room_number}\n{name}".lower()}
+		for room_number, name in sorted(rooms)
+	]
+	return {"entries": entries, "keys": [(entry["room_number"], entry["name"]) for entry in entries]}
+
+
+class IntegrationTestRoomSearch(IntegrationTestCase):
+	"""search_rooms over an in-memory room search index"""
+
+	def search(self, rooms, **kwargs):
+		with patch("maddati_hms.room_search.get_room_search_index", return_value=make_search_index(rooms)):
+			return search_rooms(**kwargs)
+
+	def test_search_rooms_cursor_round_trip(self):
+		# two rooms share a room number, so the cursor must carry the name as well
+		rooms = [
+			("101", "ROOM-1"),
+			("101", "ROOM-2"),
+			("102", "ROOM-3"),
+			("103", "ROOM-4"),
+			("104", "ROOM-5"),
+		]
+		seen, cursor, pages = [], None, 0
+		while True:
+			rows, cursor = self.search(rooms, page_len=2, cursor=cursor)
+			seen.extend(row["name"] for row in rows)
+			pages += 1
+			if not cursor:
+				break
+		self.assertEqual(seen, [name for _number, name in rooms])
+		self.assertEqual(pages, 3)
+
+	def test_search_rooms_matches_substrings(self):
+		rooms = [("A-101", "ROOM-1"), ("A-102", "ROOM-2"), ("B-102", "ROOM-3"), ("B-201", "ROOM-4")]
+		rows, cursor = self.search(rooms, txt="02", page_len=10)
+		self.assertEqual([row["name"] for row in rows], ["ROOM-2", "ROOM-3"])
+		self.assertIsNone(cursor)
+		# case-insensitive, and the name matches too
+		rows, _cursor = self.search(rooms, txt="room-4", page_len=10)
+		self.assertEqual([row["name"] for row in rows], ["ROOM-4"])
+		rows, _cursor = self.search(rooms, txt=" a-1", page_len=10)
+		self.assertEqual([row["name"] for row in rows], ["ROOM-1", "ROOM-2"])
+
+	def test_search_rooms_cursor_skips_non_matching_rooms(self):
+		rooms = [("A-101", "ROOM-1"), ("B-101", "ROOM-2"), ("A-102", "ROOM-3"), ("A-103", "ROOM-4")]
+		rows, cursor = self.search(rooms, txt="a-", page_len=2)
+		self.assertEqual([row["name"] for row in rows], ["ROOM-1", "ROOM-3"])
+		rows, cursor = self.search(rooms, txt="a-", page_len=2, cursor=cursor)
+		self.assertEqual([row["name"] for row in rows], ["ROOM-4"])
+		self.assertIsNone(cursor)
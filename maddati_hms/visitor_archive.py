@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import os
+
+import frappe
+from frappe.utils import add_days, get_datetime, get_first_day, getdate, today
+
+ARCHIVE_DOCTYPE = "Visitor Log Archive"
+ARCHIVE_FOLDER = "visitor_log_archive"
+ARCHIVE_CHUNK_SIZE = 1000
+DEFAULT_RETENTION_DAYS = 180
+ARCHIVED_FIELDS = (
+    "name", "visit_datetime", "check_out", "visitor_name", "branch", "room", "contact_number",
+    "id_proof", "purpose", "status", "related_person_type", "related_person", "remarks",
+    "owner", "creation",
+)
+
+
+def archive_visitor_logs():
+    """
+    Daily scheduler job: move closed visits of whole months older than the retention period
+    (`hms_visitor_log_retention_days` in site config, default 180) into one gzipped JSON-lines
+    file per branch and month, indexed by Visitor Log Archive.
+    """
+    retention = frappe.conf.get("hms_visitor_log_retention_days") or DEFAULT_RETENTION_DAYS
+    # only months that ended before the cutoff, so a month is archived as a whole
+    before = get_first_day(add_days(today(), -retention))
+
+    for branch, month in frappe.db.sql(
+        """
+        SELECT branch, DATE_FORMAT(visit_datetime, '%%Y-%%m') AS month
+        FROM `tabVisitor Log`
+        WHERE status = 'Left' AND visit_datetime < %s AND IFNULL(branch, '') != ''
+        GROUP BY branch, month
+        ORDER BY month, branch
+        """,
+        before,
+    ):
+        archive_month(branch, month)
+
+
+@frappe.whitelist()
+def run_visitor_log_archive():
+    """Queue the archive job now instead of waiting for the scheduler"""
+    frappe.only_for("System Manager")
+    frappe.enqueue("maddati_hms.visitor_archive.archive_visitor_logs", queue="long", timeout=4 * 60 * 60)
+
+
+def archive_month(branch, month):
+    """
+    Stream the closed visits of a branch/month into its archive file chunk by chunk.
+    Each chunk is appended (a new gzip member), then deleted from Visitor Log and committed.
+    """
+    start = get_datetime(f"{month}-01")
+    end = get_datetime(get_first_day(add_days(getdate(start), 32)))
+    archive = _get_or_create_archive(branch, month)
+    path = _get_archive_path(archive)
+
+    while True:
+        rows = frappe.db.sql(
+            f"""
+            SELECT {", ".join(f"`{field}`" for field in ARCHIVED_FIELDS)}
+            FROM `tabVisitor Log`
+            WHERE branch = %(branch)s AND status = 'Left'
+            AND visit_datetime >= %(start)s AND visit_datetime < %(end)s
+            ORDER BY visit_datetime, name
+            LIMIT %(limit)s
+            """,
+            {"branch": branch, "start": start, "end": end, "limit": ARCHIVE_CHUNK_SIZE},
+            as_dict=True,
+        )
+        if not rows:
+            break
+
+        with open(path, "ab") as raw:
+            with gzip.open(raw, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str, separators=(",", ":")) + "\n")
+            # the member is complete on disk before its rows are deleted
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        names = [row.name for row in rows]
+        # ID proofs stay on disk; their File records now belong to the archive
+        frappe.db.sql(
+            """
+            UPDATE `tabFile`
+            SET attached_to_doctype = %(doctype)s, attached_to_name = %(archive)s
+            WHERE attached_to_doctype = 'Visitor Log' AND attached_to_name IN %(names)s
+            """,
+            {"doctype": ARCHIVE_DOCTYPE, "archive": archive.name, "names": tuple(names)},
+        )
+        frappe.db.delete("Visitor Log", {"name": ["in", names]})
+
+        archive.record_count = (archive.record_count or 0) + len(rows)
+        if not archive.from_datetime or get_datetime(archive.from_datetime) > rows[0].visit_datetime:
+            archive.from_datetime = rows[0].visit_datetime
+        if not archive.to_datetime or get_datetime(archive.to_datetime) < rows[-1].visit_datetime:
+            archive.to_datetime = rows[-1].visit_datetime
+        archive.db_update()
+        frappe.db.commit()
+
+
+def _get_or_create_archive(branch, month):
+    name = frappe.db.get_value(ARCHIVE_DOCTYPE, {"branch": branch, "month": month})
+    if name:
+        return frappe.get_doc(ARCHIVE_DOCTYPE, name)
+
+    archive = frappe.get_doc({"doctype": ARCHIVE_DOCTYPE, "branch": branch, "month": month, "record_count": 0})
+    archive.insert(ignore_permissions=True)
+    # scrub() maps "Main Branch" and "Main-Branch" alike; the archive name keeps them apart
+    suffix = hashlib.md5(archive.name.encode()).hexdigest()[:8]
+    file_name = f"{frappe.scrub(branch)}-{month}-{suffix}.jsonl.gz"
+    archive.archive_file = f"/private/files/{ARCHIVE_FOLDER}/{file_name}"
+    path = _get_archive_path(archive)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # an empty file reads as an empty archive; gzip members are appended per chunk
+    open(path, "ab").close()
+    frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": archive.archive_file,
+        "is_private": 1,
+        "attached_to_doctype": ARCHIVE_DOCTYPE,
+        "attached_to_name": archive.name,
+        "attached_to_field": "archive_file",
+    }).insert(ignore_permissions=True)
+    archive.db_update()
+    return archive
+
+
+def _get_archive_path(archive):
+    return frappe.get_site_path(archive.archive_file.lstrip("/"))
+
+
+@frappe.whitelist()
+def search_archived_visitors(branch=None, from_date=None, to_date=None, txt=None, limit=100):
+    """
+    Search archived visits by branch and check-in date range; `txt` matches visitor name,
+    contact number, related person or the original Visitor Log name. Archive files are
+    read line by line, newest month first, until `limit` matches are found.
+    """
+    frappe.has_permission("Visitor Log", "read", throw=True)
+    limit = max(1, min(frappe.utils.cint(limit) or 100, 1000))
+    start = get_datetime(from_date) if from_date else None
+    end = get_datetime(add_days(getdate(to_date), 1)) if to_date else None
+    txt = (txt or "").strip().lower()
+
+    filters = {}
+    if branch:
+        filters["branch"] = branch
+    if from_date and to_date:
+        filters["month"] = ["between", [getdate(from_date).strftime("%Y-%m"), getdate(to_date).strftime("%Y-%m")]]
+    elif from_date:
+        filters["month"] = [">=", getdate(from_date).strftime("%Y-%m")]
+    elif to_date:
+        filters["month"] = ["<=", getdate(to_date).strftime("%Y-%m")]
+
+    results = []
+    seen = set()
+    for archive in frappe.get_all(ARCHIVE_DOCTYPE, filters=filters, fields=["name", "archive_file"], order_by="month desc"):
+        path = _get_archive_path(archive)
+        if not os.path.exists(path):
+            continue
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                # a chunk appended twice after an interrupted run is reported once
+                if row["name"] in seen:
+                    continue
+                # files written before archives were named apart may hold another branch's rows
+                if branch and row.get("branch") != branch:
+                    continue
+                visit = get_datetime(row["visit_datetime"])
+                if (start and visit < start) or (end and visit >= end):
+                    continue
+                if txt and not any(
+                    txt in (row.get(field) or "").lower()
+                    for field in ("name", "visitor_name", "contact_number", "related_person")
+                ):
+                    continue
+                seen.add(row["name"])
+                results.append(dict(row, archive=archive.name))
+                if len(results) >= limit:
+                    return results
+    return results